@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import instrumentation
+
+# Seconds to wait for an API before giving up
+REQUEST_TIMEOUT = 10
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries go stale after `ttl` seconds.
+
+    Stale entries are kept for another `stale_ttl` seconds so they can be
+    served while a fresh copy is fetched in the background.
+    """
+
+    def __init__(self, ttl, maxsize=128, stale_ttl=None):
+        self.ttl = ttl
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def get(self, key):
+        """Return (value, is_fresh), or None if the key is missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            age = now - stored_at
+            if age > self.ttl + self.stale_ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value, age <= self.ttl
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ApiClient:
+    """JSON client over one pooled keep-alive session with optional TTL caching."""
+
+    def __init__(self, pool_size=10, timeout=REQUEST_TIMEOUT, retries=2):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=retries, backoff_factor=0.2, status_forcelist=(502, 503, 504)),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        self._revalidator = ThreadPoolExecutor(max_workers=2, thread_name_prefix="api-revalidate")
+
+    def get_json(self, url, params=None, cache=None, cache_key=None):
+        """GET `url` and return the decoded JSON body.
+
+        With a `cache`, fresh entries are returned without a request, and
+        stale ones are returned immediately while a background request
+        refreshes them. Only successful responses are cached.
+        """
+        if cache is None:
+            return self._fetch(url, params)
+
+        key = cache_key if cache_key is not None else (url, tuple(sorted((params or {}).items())))
+        cached = cache.get(key)
+        if cached is not None:
+            value, fresh = cached
+            instrumentation.count("api_cache", result="hit" if fresh else "stale")
+            if not fresh:
+                self._revalidate(cache, key, url, params)
+            return value
+
+        instrumentation.count("api_cache", result="miss")
+        value = self._fetch(url, params)
+        cache.set(key, value)
+        return value
+
+    def _fetch(self, url, params):
+        with instrumentation.span("http_request", host=urlsplit(url).netloc):
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _revalidate(self, cache, key, url, params):
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._revalidator.submit(self._refresh, cache, key, url, params)
+
+    def _refresh(self, cache, key, url, params):
+        try:
+            cache.set(key, self._fetch(url, params))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Background refresh of {url} failed: {e}")
+        finally:
+            with self._refreshing_lock:
+                self._refreshing.discard(key)
+
+    def close(self):
+        self._revalidator.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,50 @@
+"""Wall-clock time to render N metric charts serially and across a process pool.
+
+Also times drawing the same columns as small multiples on one canvas.
+
+Run from the repository root:
+
+    python -m benchmarks.chart_rendering [column counts...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from chart_renderer import ChartJob, render_charts, render_small_multiples
+
+COLUMN_COUNTS = (10, 100, 500)
+DAYS = 90
+
+
+def make_jobs(count, rng):
+    dates = np.datetime64("2024-01-01") + np.arange(DAYS).astype("timedelta64[D]")
+    jobs = []
+    for index in range(count):
+        values = rng.normal(50, 10, DAYS).cumsum()
+        jobs.append(ChartJob(f"metric_{index}", dates, values, f"Graph of metric_{index} grouped by DATE", "Date", f"metric_{index}"))
+    return jobs
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main(counts):
+    rng = np.random.default_rng(1234)
+    workers = os.cpu_count() or 1
+    print(f"{workers} CPUs")
+    print(f"{'columns':>8} {'serial s':>10} {'pool s':>10} {'speedup':>8} {'multiples s':>12}")
+    for count in counts:
+        jobs = make_jobs(count, rng)
+        serial = timed(lambda: list(render_charts(jobs, workers=1)))
+        pooled = timed(lambda: list(render_charts(jobs, workers=workers)))
+        multiples = timed(lambda: render_small_multiples(jobs[:min(count, 60)], ncols=6))
+        print(f"{count:>8} {serial:>10.2f} {pooled:>10.2f} {serial / pooled:>8.2f} {multiples:>12.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or COLUMN_COUNTS)
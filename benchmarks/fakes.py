@@ -0,0 +1,386 @@
+"""In-process stand-ins for the external services the entry points talk to.
+
+Used by benchmarks.run_all so every scenario runs offline and reproducibly:
+a stub HTTP server for the weather/search/news APIs, a null TTS engine, a
+gspread-like client over in-memory rows, an in-process Pub/Sub subscriber,
+synthetic WAV commands and a fake speech recognizer.
+"""
+import json
+import queue
+import sys
+import threading
+import time
+import types
+import uuid
+import wave
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from gspread.utils import a1_range_to_grid_range
+
+from speech_backends import RecognitionResult
+
+
+# -- HTTP APIs -------------------------------------------------------------
+
+def _weather(params):
+    city = params.get("q", ["nowhere"])[0]
+    return {"name": city.title(), "weather": [{"description": "clear sky"}], "main": {"temp": 21.5}}
+
+
+def _search(params):
+    query = params.get("q", [""])[0]
+    return {"items": [{"snippet": f"Result {i} for {query}."} for i in range(3)]}
+
+
+def _news(params):
+    return {"articles": [{"title": f"Headline number {i}"} for i in range(5)]}
+
+
+ROUTES = {"/weather": _weather, "/search": _search, "/news": _news}
+
+
+class StubHTTPServer:
+    """Threaded local HTTP server answering the weather, search and news APIs with canned JSON.
+
+    Every response is delayed by `latency` seconds to stand in for the network.
+    Use as a context manager; `url(path)` gives the endpoint to configure.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                route = ROUTES.get(parts.path)
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if route is None:
+                    body, status = b'{"error": "not found"}', 404
+                else:
+                    body, status = json.dumps(route(parse_qs(parts.query))).encode("utf-8"), 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-http", daemon=True)
+
+    def url(self, path):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._server.shutdown()
+        self._server.server_close()
+        return False
+
+
+# -- Text to speech ----------------------------------------------------------
+
+class NullTTS:
+    """pyttsx3 engine that speaks nothing; `seconds_per_word` simulates speaking time.
+
+    Like pyttsx3 it calls 'started-word' callbacks before each word, and
+    `stop()` from such a callback ends the current runAndWait. Only fully
+    spoken utterances are added to `spoken`.
+    """
+
+    def __init__(self, seconds_per_word=0.0):
+        self.seconds_per_word = seconds_per_word
+        self.spoken = []
+        self._pending = []
+        self._callbacks = {}
+        self._stopped = False
+        self._properties = {
+            "voices": [types.SimpleNamespace(id="male", name="Null Male"),
+                       types.SimpleNamespace(id="female", name="Null Female")],
+            "voice": "male", "rate": 200, "volume": 1.0,
+        }
+
+    def say(self, text):
+        self._pending.append(text)
+
+    def connect(self, topic, callback):
+        self._callbacks.setdefault(topic, []).append(callback)
+        return topic, callback
+
+    def runAndWait(self):
+        pending, self._pending = self._pending, []
+        self._stopped = False
+        for text in pending:
+            location = 0
+            for word in text.split():
+                for callback in self._callbacks.get("started-word", []):
+                    callback(None, location, len(word))
+                if self._stopped:
+                    return
+                if self.seconds_per_word:
+                    time.sleep(self.seconds_per_word)
+                location += len(word) + 1
+            self.spoken.append(text)
+
+    def stop(self):
+        self._pending = []
+        self._stopped = True
+
+    def getProperty(self, name):
+        return self._properties[name]
+
+    def setProperty(self, name, value):
+        self._properties[name] = value
+
+
+def install_null_tts(engine=None):
+    """Make `import pyttsx3` return a module whose init() hands out `engine`."""
+    engine = engine or NullTTS()
+    sys.modules["pyttsx3"] = types.SimpleNamespace(init=lambda *args, **kwargs: engine)
+    return engine
+
+
+# -- Google Sheets -------------------------------------------------------------
+
+TICKET_HEADER = ["WEEK", "DATE", "Tickets raised", "Preplanned Tickets", "Tickets solved",
+                 "Percentage of solved tickets", "Tickets recurring", "Recurring Tickets solved",
+                 "Average time spent on tickets", "Total Issues", "Total Tasks"]
+
+
+def ticket_rows(count, days=365, seed=0, start=date(2024, 1, 1)):
+    """Synthetic rows shaped like the ticket sheet: a header row and `count` rows over `days` dates."""
+    rng = np.random.default_rng(seed)
+    rows = [list(TICKET_HEADER)]
+    for index in range(count):
+        day = start + timedelta(days=index * days // max(count, 1))
+        raised = int(rng.integers(10, 60))
+        solved = int(rng.integers(0, raised + 1))
+        recurring = int(rng.integers(0, 15))
+        issues = int(rng.integers(0, raised + 1))
+        rows.append([f"week {(day - start).days // 7 + 1}", f"{day.month}/{day.day}/{day.year}", str(raised),
+                     str(int(rng.integers(0, raised + 1))), str(solved), f"{solved / raised:.2%}",
+                     str(recurring), str(int(rng.integers(0, recurring + 1))),
+                     f"{int(rng.integers(5, 40))} min", str(issues), str(raised - issues)])
+    return rows
+
+
+class FakeWorksheet:
+    """The parts of gspread.Worksheet the fetch code uses, over a list of value rows."""
+
+    def __init__(self, rows, title="Sheet1", row_count=None, latency=0.0):
+        self.rows = rows
+        self.title = title
+        self.row_count = row_count or max(len(rows), 1000)
+        self.latency = latency
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def row_values(self, row):
+        self._call()
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def get_values(self, range_name):
+        self._call()
+        grid = a1_range_to_grid_range(range_name)
+        values = [list(row[grid["startColumnIndex"]:grid["endColumnIndex"]])
+                  for row in self.rows[grid["startRowIndex"]:grid["endRowIndex"]]]
+        # Like the API, trailing empty rows are not returned
+        while values and not any(values[-1]):
+            values.pop()
+        return values
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheets):
+        self._worksheets = {sheet.title: sheet for sheet in worksheets}
+
+    def worksheet(self, title):
+        import gspread
+        try:
+            return self._worksheets[title]
+        except KeyError:
+            raise gspread.WorksheetNotFound(title) from None
+
+
+class FakeSheetsClient:
+    """gspread client stand-in: `open_by_key(id)` returns the FakeSpreadsheet registered under id."""
+
+    def __init__(self, spreadsheets):
+        self._spreadsheets = spreadsheets
+
+    def open_by_key(self, key):
+        import gspread
+        try:
+            return self._spreadsheets[key]
+        except KeyError:
+            raise gspread.SpreadsheetNotFound(key) from None
+
+
+# -- Pub/Sub -------------------------------------------------------------------
+
+class FakeMessage:
+    """A received Pub/Sub message; ack/nack settle it with the subscriber that delivered it."""
+
+    def __init__(self, subscriber, data, message_id=None, delivery_attempt=1, publish_time=None, attributes=None):
+        self._subscriber = subscriber
+        self.data = data
+        self.message_id = message_id or uuid.uuid4().hex
+        self.delivery_attempt = delivery_attempt
+        self.publish_time = publish_time or datetime.now(timezone.utc)
+        self.attributes = attributes or {}
+
+    def ack(self):
+        self._subscriber._settle(self, acked=True)
+
+    def nack(self):
+        self._subscriber._settle(self, acked=False)
+
+
+class FakeSubscriber:
+    """In-process SubscriberClient: a queue pumped into the callback under flow control.
+
+    At most `flow_control.max_messages` messages are outstanding (delivered
+    but not acked or nacked), like the real streaming pull. Nacked messages
+    are redelivered with `delivery_attempt` incremented.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self._outstanding = None
+        self.published = 0
+        self.acked = 0
+        self.nacked = 0
+
+    def subscription_path(self, project, subscription):
+        return f"projects/{project}/subscriptions/{subscription}"
+
+    def publish(self, data, message_id=None, publish_time=None, **attributes):
+        """Queue a message; reusing a message_id simulates an at-least-once redelivery."""
+        if isinstance(data, (dict, list)):
+            data = json.dumps(data).encode("utf-8")
+        with self._lock:
+            self.published += 1
+        self._queue.put(FakeMessage(self, data, message_id, publish_time=publish_time, attributes=attributes))
+
+    def _settle(self, message, acked):
+        with self._settled:
+            if acked:
+                self.acked += 1
+            else:
+                self.nacked += 1
+            self._settled.notify_all()
+        self._outstanding.release()
+        if not acked:
+            self._queue.put(FakeMessage(self, message.data, message.message_id, message.delivery_attempt + 1,
+                                        message.publish_time, message.attributes))
+
+    def wait_acked(self, count, timeout=None):
+        """Block until `count` messages have been acked; returns False on timeout."""
+        with self._settled:
+            return self._settled.wait_for(lambda: self.acked >= count, timeout)
+
+    def subscribe(self, subscription_path, callback, flow_control=None):
+        max_messages = getattr(flow_control, "max_messages", None) or 1000
+        self._outstanding = threading.BoundedSemaphore(max_messages)
+        future = Future()
+
+        def pump():
+            while not future.cancelled():
+                try:
+                    message = self._queue.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                while not self._outstanding.acquire(timeout=0.05):
+                    if future.cancelled():
+                        return
+                callback(message)
+
+        threading.Thread(target=pump, name="fake-pubsub", daemon=True).start()
+        return future
+
+
+# -- Speech --------------------------------------------------------------------
+
+SAMPLE_RATE = 16000
+
+
+def write_command_wav(path, seconds, frequency=220.0, amplitude=6000, sample_rate=SAMPLE_RATE, seed=0):
+    """Write a 16-bit mono WAV of a voiced-sounding tone with a little noise, `seconds` long."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    # A few harmonics with a slow envelope, so the VAD sees speech-like energy
+    signal = sum(np.sin(2 * np.pi * frequency * k * t) / k for k in (1, 2, 3))
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 3 * t) ** 2
+    samples = amplitude * envelope * signal / 1.8 + rng.normal(0, 30, len(t))
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.clip(samples, -32768, 32767).astype("<i2").tobytes())
+    return path
+
+
+class FakeStream:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def accept(self, chunk):
+        if self._backend.chunk_cost:
+            time.sleep(self._backend.chunk_cost)
+
+    def finish(self, audio=None):
+        return self._backend._result()
+
+
+class FakeRecognizer:
+    """Speech backend returning `transcripts` in turn after `delay` seconds.
+
+    With `streaming` it also offers `open_stream`, costing `chunk_cost` per
+    chunk while speech is captured and `delay` at the end, like a local decoder.
+    """
+
+    name = "fake"
+
+    def __init__(self, transcripts, delay=0.0, chunk_cost=0.0, streaming=False, confidence=0.9):
+        self.transcripts = list(transcripts)
+        self.delay = delay
+        self.chunk_cost = chunk_cost
+        self.confidence = confidence
+        self.calls = 0
+        if streaming:
+            self.open_stream = lambda sample_rate=None: FakeStream(self)
+
+    def _result(self):
+        if self.delay:
+            time.sleep(self.delay)
+        text = self.transcripts[self.calls % len(self.transcripts)]
+        self.calls += 1
+        return RecognitionResult(text, self.confidence, self.name)
+
+    def recognize(self, audio):
+        return self._result()
@@ -0,0 +1,78 @@
+"""Routing latency of IntentRouter as the number of registered intents grows.
+
+For comparison, a linear chain that tries one compiled regex per intent is
+timed on the same utterances.
+
+Run from the repository root:
+
+    python -m benchmarks.intent_router
+"""
+import random
+import re
+import time
+
+from intent_router import IntentRouter
+
+INTENT_COUNTS = (10, 100, 250, 500, 1000)
+UTTERANCES = 2000
+SEED = 1234
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+
+
+def build_intents(count, vocabulary, rng):
+    intents = []
+    for index in range(count):
+        phrases = [" ".join(rng.sample(vocabulary, rng.randint(1, 2))) for _ in range(3)]
+        intents.append((f"intent_{index}", phrases))
+    return intents
+
+
+def make_utterances(intents, vocabulary, rng):
+    utterances = []
+    for _ in range(UTTERANCES):
+        _, phrases = rng.choice(intents)
+        words = rng.sample(vocabulary, 6)
+        words.insert(rng.randint(0, len(words)), rng.choice(phrases))
+        utterances.append(" ".join(words))
+    return utterances
+
+
+def time_per_call(func, utterances):
+    start = time.perf_counter()
+    for utterance in utterances:
+        func(utterance)
+    return (time.perf_counter() - start) / len(utterances) * 1e6
+
+
+def main():
+    rng = random.Random(SEED)
+    vocabulary = make_vocabulary(5000, rng)
+    print(f"{'intents':>8} {'router us/call':>15} {'linear us/call':>15}")
+    for count in INTENT_COUNTS:
+        intents = build_intents(count, vocabulary, rng)
+        utterances = make_utterances(intents, vocabulary, rng)
+
+        router = IntentRouter()
+        for name, phrases in intents:
+            router.register(name, lambda: None, phrases)
+        router.compile()
+
+        chain = [re.compile("|".join(r"\b%s\b" % re.escape(p) for p in phrases)) for _, phrases in intents]
+
+        def linear(utterance):
+            for pattern in chain:
+                if pattern.search(utterance):
+                    return pattern
+            return None
+
+        routed = time_per_call(router.route, utterances)
+        scanned = time_per_call(linear, utterances)
+        print(f"{count:>8} {routed:>15.2f} {scanned:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Latency and word error rate of the speech recognition backends on recorded commands.
+
+The fixture directory holds 16-bit mono WAV files and a manifest,
+`transcripts.csv` (columns `file,text`) or `transcripts.json` (a list of
+{"file", "text"} objects), with the expected transcript of each file.
+
+For every backend it reports the mean/p50/p90 latency of recognizing a whole
+clip, the word error rate against the manifest, and how often a fallback
+backend had to ask the cloud. Backends with streaming decoders are also timed
+the way the listener uses them: the clip is fed in 30 ms chunks first and only
+the final flush (end of speech -> text) is timed.
+
+Run from the repository root:
+
+    python -m benchmarks.recognition <fixture dir> [google] [vosk] [vosk+google] [--model PATH] [--grammar]
+
+Local backends need `pip install vosk` and a model directory.
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import time
+
+import speech_recognition as sr
+
+from intent_router import tokenize
+from speech_backends import FallbackBackend, create_backend
+
+CHUNK_BYTES = 960
+
+
+def load_fixtures(fixture_dir):
+    csv_path = os.path.join(fixture_dir, "transcripts.csv")
+    if os.path.exists(csv_path):
+        with open(csv_path, "r", encoding="utf-8", newline="") as file:
+            entries = list(csv.DictReader(file))
+    else:
+        with open(os.path.join(fixture_dir, "transcripts.json"), "r", encoding="utf-8") as file:
+            entries = json.load(file)
+    fixtures = []
+    for entry in entries:
+        with sr.AudioFile(os.path.join(fixture_dir, entry["file"])) as source:
+            audio = sr.Recognizer().record(source)
+        fixtures.append((entry["file"], entry["text"], audio))
+    return fixtures
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance between two transcripts, and the reference length."""
+    ref, hyp = tokenize(reference), tokenize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else 0.0
+
+
+def run_backend(backend, fixtures):
+    latencies, tail_latencies, errors, words, failures, fallbacks = [], [], 0, 0, 0, 0
+    for name, reference, audio in fixtures:
+        start = time.perf_counter()
+        try:
+            result = backend.recognize(audio)
+            text = result.text
+            if isinstance(backend, FallbackBackend) and result.backend == backend.fallback.name:
+                fallbacks += 1
+        except (sr.UnknownValueError, sr.RequestError) as e:
+            text = ""
+            failures += 1
+            print(f"  {name}: {type(e).__name__}")
+        latencies.append(time.perf_counter() - start)
+
+        if hasattr(backend, "open_stream"):
+            frames = audio.get_raw_data(convert_rate=16000, convert_width=2)
+            stream = backend.open_stream(16000)
+            for offset in range(0, len(frames), CHUNK_BYTES):
+                stream.accept(frames[offset:offset + CHUNK_BYTES])
+            start = time.perf_counter()
+            try:
+                stream.finish(audio)
+            except (sr.UnknownValueError, sr.RequestError):
+                pass
+            tail_latencies.append(time.perf_counter() - start)
+
+        wrong, total = word_errors(reference, text)
+        errors += wrong
+        words += total
+    return {
+        "clips": len(fixtures),
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "stream_tail_ms": statistics.mean(tail_latencies) * 1000 if tail_latencies else None,
+        "wer": errors / words if words else 0.0,
+        "failures": failures,
+        "fallbacks": fallbacks,
+    }
+
+
+def command_vocabulary():
+    # Same vocabulary the assistant uses for VOSK_GRAMMAR=1; importing remiander has no side effects
+    import remiander
+    return remiander.intent_router.vocabulary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fixture_dir")
+    parser.add_argument("backends", nargs="*", default=["google"])
+    parser.add_argument("--model", default=os.getenv("VOSK_MODEL_PATH"), help="Vosk model directory")
+    parser.add_argument("--grammar", action="store_true", help="limit local decoding to the intent vocabulary")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixture_dir)
+    grammar = command_vocabulary() if args.grammar else None
+    print(f"{len(fixtures)} clips from {args.fixture_dir}")
+    print(f"{'backend':<12} {'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8} {'tail ms':>8} {'WER':>6} {'failed':>7} {'fallback':>9}")
+    for kind in args.backends:
+        start = time.perf_counter()
+        backend = create_backend(kind, model_path=args.model, grammar=grammar)
+        load_s = time.perf_counter() - start
+        stats = run_backend(backend, fixtures)
+        tail = f"{stats['stream_tail_ms']:.1f}" if stats["stream_tail_ms"] is not None else "-"
+        print(f"{kind:<12} {stats['mean_ms']:>8.1f} {stats['p50_ms']:>8.1f} {stats['p90_ms']:>8.1f} {tail:>8} "
+              f"{stats['wer']:>6.1%} {stats['failures']:>7} {stats['fallbacks']:>9}   (loaded in {load_s:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""End-to-end benchmarks of the three entry points against local fakes.
+
+Scenarios, each run at several scales:
+
+  assistant  remiander.process_command over a mix of weather/search/news/voice
+             commands, against a stub HTTP server and a null TTS engine
+  listener   synthetic WAV commands played through StreamingListener (VAD +
+             a fake streaming recognizer): end of speech -> text latency
+  report     data.py fetch from a fake worksheet, then build_report (CSV,
+             aggregates, charts, PDF) cold and again with a warm cache
+  pubsub     meet_pipeline MessagePipeline and BatchingPipeline over an
+             in-process subscriber with duplicates and per-meeting updates
+
+Per-stage timings come from the instrumentation spans in the code under
+test. Every scenario is run --repeat times and reported as the median of
+the runs. Results can be saved as JSON and compared with an earlier run,
+which fails (exit status 1) when median throughput drops or latency grows by
+more than the tolerance. p99 is only gated when each run has at least
+MIN_P99_SAMPLES latencies; with fewer it is mostly noise:
+
+    python -m benchmarks.run_all [--scenario NAME ...] [--scale small|medium|large] [--repeat 5]
+                                 [--save results.json] [--compare baseline.json] [--tolerance 0.2]
+                                 [--metrics metrics.prom] [--profile stats.prof]
+
+Run from the repository root. Nothing touches the network or the real sheet.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import instrumentation
+from benchmarks import fakes
+
+SCALES = {
+    "small": {"assistant": (20, 100), "listener": (3, 8), "report": (500, 5000), "pubsub": (500, 2000)},
+    "medium": {"assistant": (100, 500), "listener": (8, 20), "report": (5000, 50000), "pubsub": (2000, 10000)},
+    "large": {"assistant": (500, 2000), "listener": (20, 50), "report": (50000, 200000), "pubsub": (10000, 50000)},
+}
+
+SEED = 1234
+
+# Stub API round trip, and time spent per message by the Pub/Sub handlers
+HTTP_LATENCY = 0.002
+HANDLER_COST = 0.0005
+
+# Runs of every scenario; results are the median over the runs
+REPEAT = 5
+
+# Metrics compared by --compare, and whether larger is better
+COMPARED = {"per_s": True, "p50_ms": False, "p99_ms": False}
+
+# Latencies per run below which a p99 change is reported but never fails the comparison
+MIN_P99_SAMPLES = 100
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else 0.0
+
+
+def span_totals():
+    """(count, total seconds) of every span recorded so far, keyed by name and labels."""
+    return {(span["name"], tuple(sorted(span["labels"].items()))): (span["count"], span["total_s"])
+            for span in instrumentation.registry.to_json()["spans"]}
+
+
+def span_means(before, after, name):
+    """Mean ms per label set of span `name` between two span_totals() snapshots."""
+    means = {}
+    for key, (count, total) in after.items():
+        if key[0] != name:
+            continue
+        old_count, old_total = before.get(key, (0, 0.0))
+        if count > old_count:
+            label = ",".join(str(value) for _, value in key[1]) or name
+            means[label] = (total - old_total) / (count - old_count) * 1000
+    return means
+
+
+def result(scenario, scale, variant, operations, elapsed, latencies, **details):
+    return {
+        "scenario": scenario, "scale": scale, "variant": variant, "operations": operations,
+        "seconds": elapsed, "per_s": operations / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000, "p99_ms": percentile(latencies, 99) * 1000,
+        "samples": len(latencies), "details": details,
+    }
+
+
+def summarize(runs):
+    """Merge repeated runs of each scenario, scale and variant into one entry of medians.
+
+    The details are those of the run with the median throughput.
+    """
+    grouped = {}
+    for entry in runs:
+        grouped.setdefault((entry["scenario"], entry["scale"], entry["variant"]), []).append(entry)
+    merged = []
+    for entries in grouped.values():
+        entries = sorted(entries, key=lambda entry: entry["per_s"])
+        summary = dict(entries[len(entries) // 2])
+        for metric in ("seconds", "per_s", "p50_ms", "p99_ms"):
+            summary[metric] = statistics.median(entry[metric] for entry in entries)
+        summary["samples"] = min(entry["samples"] for entry in entries)
+        summary["runs"] = len(entries)
+        merged.append(summary)
+    return merged
+
+
+# -- assistant -------------------------------------------------------------------
+
+def assistant_commands(count, rng):
+    # Repeated cities and queries so the API caches see realistic hit rates
+    cities = [f"city{index}" for index in range(max(1, count // 5))]
+    queries = [f"python topic {index}" for index in range(max(1, count // 5))]
+    templates = [
+        lambda: f"what is the weather in {rng.choice(cities)}",
+        lambda: f"search for {rng.choice(queries)}",
+        lambda: "read me the news",
+        lambda: f"set voice {rng.choice(['male', 'female'])}",
+        lambda: "tell me something unrelated",
+    ]
+    return [rng.choice(templates)() for _ in range(count)]
+
+
+def bench_assistant(scales, repeat=1):
+    fakes.install_null_tts()
+    import remiander
+
+    results = []
+    with fakes.StubHTTPServer(latency=HTTP_LATENCY) as server:
+        os.environ.update({
+            "WEATHER_API_URL": server.url("/weather"),
+            "CUSTOM_SEARCH_API_URL": server.url("/search"),
+            "NEWS_API_URL": server.url("/news"),
+        })
+        speech_queue = remiander.speech_queue.get()
+        speech_queue.run(remiander.tts_engine.get)
+        for count in scales:
+            commands = assistant_commands(count, random.Random(SEED))
+            for _ in range(repeat):
+                for cache in (remiander.weather_cache, remiander.news_cache, remiander.search_cache):
+                    cache.clear()
+                requests_before = server.requests
+                before = span_totals()
+                latencies = []
+
+                async def run():
+                    for command in commands:
+                        start = time.perf_counter()
+                        await remiander.process_command(command)
+                        latencies.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                asyncio.run(run())
+                speech_queue.join()
+                elapsed = time.perf_counter() - start
+                after = span_totals()
+                results.append(result("assistant", count, "process_command", count, elapsed, latencies,
+                                      http_requests=server.requests - requests_before,
+                                      intent_ms=span_means(before, after, "process_command"),
+                                      speak_ms=span_means(before, after, "speak")))
+        speech_queue.stop()
+    if remiander.api_client.built:
+        remiander.api_client.get().close()
+    return results
+
+
+# -- listener --------------------------------------------------------------------
+
+def bench_listener(scales, workdir, repeat=1):
+    from speech_io import StreamingListener, WavFileSource
+
+    results = []
+    rng = random.Random(SEED)
+    for count in scales:
+        paths = []
+        speech_seconds = 0.0
+        for index in range(count):
+            seconds = rng.uniform(0.6, 1.6)
+            speech_seconds += seconds
+            paths.append(fakes.write_command_wav(os.path.join(workdir, f"command_{count}_{index}.wav"), seconds,
+                                                 frequency=rng.uniform(120, 260), seed=index))
+        for _ in range(repeat):
+            recognizer = fakes.FakeRecognizer(["what is the weather in london"], delay=0.005, streaming=True)
+            source = WavFileSource(paths, gap_seconds=0.8)
+            audio_seconds = len(source._data) / (source.sample_rate * source.sample_width)
+            listener = StreamingListener(source, recognizer)
+            latencies = []
+            recognized = 0
+            start = time.perf_counter()
+            listener.start()
+            while True:
+                utterance = listener.next_utterance(timeout=60)
+                if utterance is None:
+                    break
+                latencies.append(utterance.recognized_at - utterance.ended_at)
+                recognized += utterance.error is None
+            elapsed = time.perf_counter() - start
+            listener.stop()
+            results.append(result("listener", count, "wav_stream", len(latencies), elapsed, latencies,
+                                  expected=count, recognized=recognized, speech_s=round(speech_seconds, 2),
+                                  realtime_factor=audio_seconds / elapsed if elapsed else 0.0))
+    return results
+
+
+# -- report ----------------------------------------------------------------------
+
+def bench_report(scales, workdir, repeat=1):
+    import data
+    from build_cache import ArtifactCache
+
+    results = []
+    for count in scales:
+        rows = fakes.ticket_rows(count, days=min(count, 730), seed=SEED)
+        client = fakes.FakeSheetsClient({"bench": fakes.FakeSpreadsheet([fakes.FakeWorksheet(rows)])})
+        for run in range(repeat):
+            # A fresh cache per run, so every "cold" build really starts cold
+            cache = ArtifactCache(root=os.path.join(workdir, f"cache_{count}_{run}"))
+            output_dir = os.path.join(workdir, f"report_{count}_{run}")
+            os.makedirs(output_dir, exist_ok=True)
+            for variant in ("cold", "warm"):
+                before = span_totals()
+                start = time.perf_counter()
+                rows_fetched = data.fetch_google_sheet_data("bench", "Sheet1", client=client)
+                data.build_report(rows_fetched, cache, output_dir=output_dir)
+                elapsed = time.perf_counter() - start
+                after = span_totals()
+                results.append(result("report", count, variant, count, elapsed, [elapsed],
+                                      stage_ms=span_means(before, after, "report_stage")))
+    return results
+
+
+# -- pubsub ----------------------------------------------------------------------
+
+def bench_pubsub(scales, repeat=1):
+    from meet_pipeline import LATENCY_SAMPLES, BatchingPipeline, MessagePipeline
+
+    def handle(data, message):
+        time.sleep(HANDLER_COST)
+
+    def handle_batch(events, messages):
+        time.sleep(HANDLER_COST * len(events))
+
+    results = []
+    for count in scales:
+        for _ in range(repeat):
+            for variant in ("per_message", "batching"):
+                rng = random.Random(SEED)
+                subscriber = fakes.FakeSubscriber()
+                if variant == "batching":
+                    pipeline = BatchingPipeline(handle_batch, max_wait=0.05, subscriber=subscriber)
+                else:
+                    pipeline = MessagePipeline(handle, subscriber=subscriber)
+                message_ids = []
+                for index in range(count):
+                    # ~2% at-least-once redeliveries; updates spread over count/10 meetings
+                    if message_ids and rng.random() < 0.02:
+                        subscriber.publish({"meetingId": "redelivered"}, message_id=rng.choice(message_ids))
+                        continue
+                    message_id = f"m{index}"
+                    message_ids.append(message_id)
+                    meeting = f"meeting{rng.randrange(max(1, count // 10))}"
+                    subscriber.publish({"meetingId": meeting, "seq": index}, message_id=message_id)
+                start = time.perf_counter()
+                pipeline.start(subscriber.subscription_path("bench", "bench"))
+                finished = subscriber.wait_acked(subscriber.published, timeout=120)
+                elapsed = time.perf_counter() - start
+                pipeline.stop()
+                snapshot = pipeline.metrics.snapshot()
+                results.append({
+                    **result("pubsub", count, variant, subscriber.published, elapsed, []),
+                    "p50_ms": snapshot["latency_p50_ms"], "p99_ms": snapshot["latency_p99_ms"],
+                    "samples": min(snapshot["received"], LATENCY_SAMPLES),
+                    "details": {"finished": finished, "acked": snapshot["acked"], "batches": snapshot["batches"],
+                                "coalesced": snapshot["coalesced"], "duplicates": snapshot["duplicates"]},
+                })
+    return results
+
+
+# -- reporting -------------------------------------------------------------------
+
+def format_details(details):
+    parts = []
+    for key, value in details.items():
+        if isinstance(value, dict):
+            value = " ".join(f"{label}={ms:.1f}" for label, ms in sorted(value.items()))
+            parts.append(f"{key}[{value}]")
+        elif isinstance(value, float):
+            parts.append(f"{key}={value:.2f}")
+        else:
+            parts.append(f"{key}={value}")
+    return " ".join(parts)
+
+
+def print_table(results):
+    print(f"{'scenario':<10} {'scale':>7} {'variant':<16} {'ops':>7} {'runs':>4} {'seconds':>8} {'ops/s':>10} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+    for entry in results:
+        print(f"{entry['scenario']:<10} {entry['scale']:>7} {entry['variant']:<16} {entry['operations']:>7} "
+              f"{entry.get('runs', 1):>4} {entry['seconds']:>8.2f} {entry['per_s']:>10.1f} "
+              f"{entry['p50_ms']:>8.1f} {entry['p99_ms']:>8.1f}")
+        print(f"{'':<10} {format_details(entry['details'])}")
+
+
+def compare(results, baseline, tolerance):
+    """Print the change of every compared median against `baseline`; return the regressions.
+
+    p99 is left out of the gate unless both sides have MIN_P99_SAMPLES latencies per run.
+    """
+    previous = {(entry["scenario"], entry["scale"], entry["variant"]): entry for entry in baseline}
+    regressions = []
+    print(f"\nAgainst baseline (medians, tolerance {tolerance:.0%}):")
+    for entry in results:
+        old = previous.get((entry["scenario"], entry["scale"], entry["variant"]))
+        if old is None:
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED.items():
+            if not old[metric]:
+                continue
+            change = entry[metric] / old[metric] - 1
+            worse = -change if higher_is_better else change
+            samples = min(entry.get("samples", 0), old.get("samples", 0))
+            flag = ""
+            if metric == "p99_ms" and samples < MIN_P99_SAMPLES:
+                flag = f" (not gated, {samples} samples)"
+            elif worse > tolerance:
+                flag = " REGRESSION"
+                regressions.append((entry["scenario"], entry["scale"], entry["variant"], metric, change))
+            changes.append(f"{metric} {change:+.1%}{flag}")
+        print(f"  {entry['scenario']:<10} {entry['scale']:>7} {entry['variant']:<16} {', '.join(changes)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=["assistant", "listener", "report", "pubsub"],
+                        help="run only these scenarios (repeatable); default all")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="runs per scenario; results are the medians")
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--metrics", help="write all instrumentation metrics (.json, otherwise Prometheus text)")
+    parser.add_argument("--profile", help="cProfile the run and dump the stats to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the code under test")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or ["assistant", "listener", "report", "pubsub"]
+    scales = SCALES[args.scale]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="jarvis-bench-") as workdir:
+        runners = {
+            "assistant": lambda: bench_assistant(scales["assistant"], args.repeat),
+            "listener": lambda: bench_listener(scales["listener"], workdir, args.repeat),
+            "report": lambda: bench_report(scales["report"], workdir, args.repeat),
+            "pubsub": lambda: bench_pubsub(scales["pubsub"], args.repeat),
+        }
+        profiler = instrumentation.profile(args.profile) if args.profile else contextlib.nullcontext()
+        with profiler:
+            for scenario in scenarios:
+                print(f"Running {scenario} at {args.scale} scale...", file=sys.stderr)
+                output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+                with output:
+                    results.extend(summarize(runners[scenario]()))
+
+    print_table(results)
+    if args.metrics:
+        instrumentation.write_metrics(args.metrics)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({"scale": args.scale, "python": sys.version.split()[0], "results": results}, file, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare rebuilding daily/weekly/monthly statistics from scratch with folding in new rows.
+
+Builds a synthetic ticket history (1M rows by default), then times:
+
+- a full pandas groupby over the whole history, as chart_jobs used to do;
+- building a TicketAggregator over the whole history once;
+- folding a batch of new rows into that aggregator;
+- a 7-day rolling mean and week-over-week deltas from the aggregated state.
+
+Run from the repository root:
+
+    python -m benchmarks.ticket_aggregates [rows] [new rows]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from ticket_aggregates import TicketAggregator
+
+ROWS = 1_000_000
+NEW_ROWS = 1_000
+METRICS = ("Tickets raised", "Tickets solved", "Percentage of solved tickets", "Average time spent on tickets")
+DAYS = 3 * 365
+
+
+def make_rows(count, rng, start_day=0):
+    days = np.sort(rng.integers(start_day, start_day + DAYS, count))
+    dates = pd.Timestamp("2022-01-03") + pd.to_timedelta(days, unit="D")
+    df = pd.DataFrame({"DATE": dates, "WEEK": [f"week {day // 7 + 1}" for day in days]})
+    for metric in METRICS:
+        df[metric] = rng.normal(30, 5, count)
+    return df
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def full_groupby(df):
+    return (df.groupby(df["DATE"].dt.normalize()).mean(numeric_only=True),
+            df.groupby("WEEK").mean(numeric_only=True),
+            df.groupby(df["DATE"].dt.to_period("M")).mean(numeric_only=True))
+
+
+def main(rows=ROWS, new_rows=NEW_ROWS):
+    rng = np.random.default_rng(1234)
+    history = make_rows(rows, rng)
+    # New rows land in the last week of the history
+    delta = make_rows(new_rows, rng, start_day=DAYS - 7)
+    delta["DATE"] = delta["DATE"].clip(upper=history["DATE"].max())
+
+    groupby_s, _ = timed(lambda: full_groupby(pd.concat([history, delta], ignore_index=True)))
+    build_s, aggregator = timed(lambda: TicketAggregator().update(history))
+    fold_s, _ = timed(lambda: aggregator.update(delta))
+    rolling_s, _ = timed(lambda: (aggregator.rolling_mean(7), aggregator.week_over_week()))
+
+    print(f"{rows} rows of history, {new_rows} new rows")
+    print(f"{'full groupby s':>15} {'initial build s':>16} {'fold new s':>11} {'rolling+wow s':>14} {'speedup':>8}")
+    print(f"{groupby_s:>15.3f} {build_s:>16.3f} {fold_s:>11.4f} {rolling_s:>14.4f} {groupby_s / fold_s:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,216 @@
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+# Default location and size limit of the artifact cache
+CACHE_DIR = '.build_cache'
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def digest(*parts):
+    """Return a stable sha256 hex digest of strings, bytes and JSON-serialisable values."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        elif isinstance(part, str):
+            data = part.encode('utf-8')
+        else:
+            data = json.dumps(part, sort_keys=True, default=str).encode('utf-8')
+        # Length-prefix every part so ("ab", "c") and ("a", "bc") differ
+        h.update(len(data).to_bytes(8, 'big'))
+        h.update(data)
+    return h.hexdigest()
+
+
+class StageStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.seconds = 0.0
+        self.saved = 0.0
+
+
+class ArtifactCache:
+    """Content-addressed artifact store for the report pipeline, in the spirit of make.
+
+    Every artifact is stored under a key that hashes the stage name and all of
+    its inputs, so an artifact is rebuilt only when one of its inputs changes.
+    The cache is capped at `max_bytes`; the least recently used artifacts are
+    evicted first. Hits, misses and the build time they saved are tracked per
+    stage for `report()`.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index_path = os.path.join(root, 'index.json')
+        self._lock = threading.Lock()
+        self._stats = OrderedDict()
+        self._index = self._load_index()
+        self._total = sum(entry['size'] for entry in self._index.values())
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as file:
+                index = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        # Drop entries whose object file has gone missing
+        return {key: entry for key, entry in index.items() if os.path.exists(self._path(key))}
+
+    def _path(self, key):
+        return os.path.join(self.root, 'objects', key[:2], key)
+
+    def key(self, stage, *inputs):
+        """Return the cache key of `stage` applied to `inputs`."""
+        return digest(stage, *inputs)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._index
+
+    def _touch(self, key):
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return False
+            entry['last_used'] = time.time()
+            return True
+
+    def get(self, key):
+        """Return the stored bytes for `key`, or None."""
+        if not self._touch(key):
+            return None
+        try:
+            with open(self._path(key), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+            return None
+
+    def put(self, key, data, stage, cost=0.0):
+        """Store `data` under `key`; `cost` is how long it took to build, in seconds."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+        self._add(key, stage, len(data), cost)
+
+    def put_file(self, key, source, stage, cost=0.0):
+        """Store a copy of the file `source` under `key` without reading it into memory."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, path)
+        self._add(key, stage, os.path.getsize(path), cost)
+
+    def _add(self, key, stage, size, cost):
+        with self._lock:
+            self._forget(key)
+            self._index[key] = {'stage': stage, 'size': size, 'cost': cost, 'last_used': time.time()}
+            self._total += size
+            self._evict()
+
+    def _forget(self, key):
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._total -= entry['size']
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            if self._total <= self.max_bytes:
+                break
+            self._forget(key)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def build(self, stage, key, compute):
+        """Return the artifact for `key`, calling `compute()` to build and store it on a miss."""
+        cached = self.get(key)
+        if cached is not None:
+            self.record(stage, hit=True, saved=self.cost(key))
+            return cached
+        start = time.perf_counter()
+        data = compute()
+        elapsed = time.perf_counter() - start
+        self.put(key, data, stage, elapsed)
+        self.record(stage, hit=False, seconds=elapsed)
+        return data
+
+    def build_file(self, stage, key, compute, path):
+        """Like build() for large artifacts that should not be held in memory.
+
+        On a miss `compute(tmp_path)` writes the artifact to a file, which is
+        stored in the cache; either way the result is copied to `path`. The
+        file is left untouched if its content is already the same. Returns
+        True if `path` was written.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        if self._touch(key) and os.path.exists(self._path(key)):
+            self.record(stage, hit=True, saved=self.cost(key))
+            if os.path.exists(path) and filecmp.cmp(self._path(key), path, shallow=False):
+                return False
+            shutil.copyfile(self._path(key), tmp_path)
+        else:
+            start = time.perf_counter()
+            compute(tmp_path)
+            elapsed = time.perf_counter() - start
+            self.put_file(key, tmp_path, stage, elapsed)
+            self.record(stage, hit=False, seconds=elapsed)
+            if os.path.exists(path) and filecmp.cmp(tmp_path, path, shallow=False):
+                os.remove(tmp_path)
+                return False
+        os.replace(tmp_path, path)
+        return True
+
+    def record(self, stage, hit, seconds=0.0, saved=0.0):
+        """Count a hit or a miss for `stage`, for stages that manage artifacts themselves."""
+        with self._lock:
+            stats = self._stats.setdefault(stage, StageStats())
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+            stats.seconds += seconds
+            stats.saved += saved
+
+    def cost(self, key):
+        """Return the recorded build time of a cached artifact (0 if unknown)."""
+        with self._lock:
+            return self._index.get(key, {}).get('cost', 0.0)
+
+    def save(self):
+        """Persist the index. Call once the pipeline run is complete."""
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            snapshot = json.dumps(self._index)
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(snapshot)
+        os.replace(tmp_path, self._index_path)
+
+    def report(self):
+        """Return a per-stage table of hits, misses, build time and time saved."""
+        with self._lock:
+            rows = list(self._stats.items())
+            total = self._total
+        lines = [f"{'stage':<8} {'hits':>6} {'misses':>7} {'built s':>9} {'saved s':>9}"]
+        for stage, stats in rows:
+            lines.append(f"{stage:<8} {stats.hits:>6} {stats.misses:>7} {stats.seconds:>9.2f} {stats.saved:>9.2f}")
+        lines.append(f"cache size: {total / 1024:.0f} KiB of {self.max_bytes / 1024:.0f} KiB")
+        return "\n".join(lines)
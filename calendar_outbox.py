@@ -0,0 +1,200 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from journal import Journal
+
+# The Calendar batch endpoint accepts at most 50 calls per request
+MAX_BATCH_SIZE = 50
+
+# Statuses worth retrying; anything else in the 4xx range is a permanent failure
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# 403 is retried only when it reports a quota; other 403s are permission or auth failures
+FORBIDDEN_STATUS = 403
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+# Failed inserts of one event before it is moved to the failed store
+MAX_ATTEMPTS = 8
+
+# 409 on insert means an event with our client-supplied id already exists
+DUPLICATE_STATUS = 409
+
+
+def _status_of(exception):
+    resp = getattr(exception, "resp", None)
+    try:
+        return int(getattr(resp, "status", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _reasons_of(exception):
+    """Error reasons ("rateLimitExceeded", ...) reported by a googleapiclient HttpError."""
+    details = getattr(exception, "error_details", None)
+    if not details:
+        try:
+            details = json.loads(exception.content)["error"]["errors"]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            details = []
+    return {detail.get("reason") for detail in details if isinstance(detail, dict)}
+
+
+def _is_retryable(exception):
+    status = _status_of(exception)
+    if status == FORBIDDEN_STATUS:
+        return bool(_reasons_of(exception) & RATE_LIMIT_REASONS)
+    return status in RETRYABLE_STATUSES or status == 0
+
+
+class CalendarOutbox:
+    """Durable outbox of Google Calendar event inserts.
+
+    `enqueue` appends the event to a local journal and returns at once. A
+    background worker sends queued events with the Calendar batch API, up to
+    `batch_size` inserts per HTTP request, and retries failures with
+    exponential backoff. Every event gets a client-supplied `id` when it is
+    queued, which makes retries idempotent: a repeat insert is answered with
+    409 and treated as delivered. An event that keeps failing is given up on
+    after `max_attempts` tries and moved to a separate failed store.
+    """
+
+    def __init__(self, service_factory, path="calendar_outbox.json", calendar_id="primary",
+                 batch_size=MAX_BATCH_SIZE, base_delay=1.0, max_delay=300.0, batch_uri=None,
+                 on_inserted=None, max_attempts=MAX_ATTEMPTS, failed_path=None):
+        self._service_factory = service_factory
+        self.calendar_id = calendar_id
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.batch_uri = batch_uri
+        self._on_inserted = on_inserted
+        self.max_attempts = max_attempts
+        self._store = Journal(path)
+        self._failed = Journal(failed_path or f"{os.path.splitext(path)[0]}.failed.json")
+        self._cond = threading.Condition()
+        self._running = False
+        self._failures = 0
+        self._retry_at = 0.0
+        self._thread = None
+
+    def __len__(self):
+        return len(self._store)
+
+    def failed(self):
+        """Records of the events that were given up on, with their last error."""
+        return self._failed.values()
+
+    def enqueue(self, event):
+        """Queue an event body for insertion and return its idempotency id."""
+        # Calendar event ids must be base32hex; a uuid4 hex string qualifies
+        event = dict(event)
+        event.setdefault("id", uuid.uuid4().hex)
+        self._store.put({"id": event["id"], "event": event, "attempts": 0})
+        with self._cond:
+            self._cond.notify()
+        return event["id"]
+
+    def start(self):
+        """Start the background flush worker."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="calendar-outbox", daemon=True)
+        self._thread.start()
+
+    def flush(self, timeout=None):
+        """Wait until the outbox is empty. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify()
+            while len(self._store):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """Stop the worker. Undelivered events stay queued for the next run."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._store.close()
+        self._failed.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    delay = self._retry_at - time.monotonic()
+                    if len(self._store) and delay <= 0:
+                        break
+                    self._cond.wait(delay if len(self._store) else None)
+                if not self._running:
+                    return
+            batch = self._store.values()[:self.batch_size]
+            try:
+                retry = self._send(batch)
+            except Exception as e:
+                # Transport failure (offline, DNS, TLS): the whole batch is retried
+                print(f"Calendar sync failed, will retry: {e}")
+                retry = True
+            with self._cond:
+                if retry:
+                    self._failures += 1
+                    backoff = min(self.max_delay, self.base_delay * 2 ** (self._failures - 1))
+                    self._retry_at = time.monotonic() + backoff * random.uniform(0.5, 1.0)
+                else:
+                    self._failures = 0
+                    self._retry_at = 0.0
+                self._cond.notify_all()
+
+    def _send(self, batch):
+        """Insert `batch` in one batch request. Returns True if anything must be retried."""
+        service = self._service_factory()
+        results = {}
+
+        def callback(request_id, response, exception):
+            results[request_id] = (response, exception)
+
+        if self.batch_uri:
+            from googleapiclient.http import BatchHttpRequest
+            request = BatchHttpRequest(callback=callback, batch_uri=self.batch_uri)
+        else:
+            request = service.new_batch_http_request(callback=callback)
+        for record in batch:
+            insert = service.events().insert(calendarId=self.calendar_id, body=record["event"])
+            request.add(insert, request_id=record["id"])
+        request.execute()
+
+        retry = False
+        for record in batch:
+            if record["id"] not in results:
+                retry = True
+                continue
+            response, exception = results[record["id"]]
+            status = _status_of(exception) if exception is not None else 200
+            if exception is None or status == DUPLICATE_STATUS:
+                self._store.delete(record["id"])
+                if self._on_inserted is not None and response is not None:
+                    self._on_inserted(response)
+            elif _is_retryable(exception) and record["attempts"] + 1 < self.max_attempts:
+                self._store.put(dict(record, attempts=record["attempts"] + 1))
+                retry = True
+            else:
+                self._give_up(dict(record, attempts=record["attempts"] + 1), exception)
+        return retry
+
+    def _give_up(self, record, exception):
+        print(f"Giving up on calendar event '{record['event'].get('summary')}' after "
+              f"{record['attempts']} attempt(s): {exception}")
+        self._failed.put(dict(record, error=str(exception), status=_status_of(exception)))
+        self._store.delete(record["id"])
@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+# OAuth tokens of every scope set, shared by the Calendar, Pub/Sub and Sheets code
+TOKEN_FILE = 'token.json'
+
+# Refresh tokens this long before they expire. google-auth itself treats a token
+# as expired 3m45s early, so this has to be larger for callers never to refresh.
+REFRESH_MARGIN = 300
+
+# Wait before retrying a failed background refresh
+RETRY_DELAY = 30
+
+# Connections kept per host by the shared HTTP transport
+POOL_SIZE = 10
+
+# Serialises token file access between threads; the file lock covers other processes
+_process_lock = threading.Lock()
+
+
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on `path`.lock (fcntl on POSIX, msvcrt on Windows)."""
+    with _process_lock, open(f"{path}.lock", 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            yield
+
+
+def scope_key(scopes):
+    return " ".join(sorted(set(scopes)))
+
+
+def _utcnow():
+    # google-auth keeps expiry as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class _Entry:
+    def __init__(self, credentials, token_key=None):
+        self.credentials = credentials
+        # Scope key under which refreshed user tokens are saved; None for service accounts
+        self.token_key = token_key
+        self.lock = threading.Lock()
+        self.retry_at = None
+
+
+class CredentialManager:
+    """Process-wide Google credentials, cached per scope set and refreshed ahead of expiry.
+
+    User (OAuth) tokens of every scope set live in one token file, keyed by
+    their scopes; writes take a file lock, merge with what other processes
+    wrote and replace the file atomically. A background thread refreshes each
+    cached credential `refresh_margin` seconds before it expires, so API calls
+    find a valid token and never refresh inline. All refreshes and authorized
+    sessions share one pooled HTTP transport.
+    """
+
+    def __init__(self, token_file=TOKEN_FILE, refresh_margin=REFRESH_MARGIN, pool_size=POOL_SIZE):
+        self.token_file = token_file
+        self.refresh_margin = refresh_margin
+        self.pool_size = pool_size
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._refresher = None
+        self._stopped = False
+        self._session = None
+        self._adapter = None
+
+    # -- shared transport ---------------------------------------------------
+
+    def session(self):
+        """Return the shared requests.Session used for token refreshes."""
+        with self._lock:
+            if self._session is None:
+                import requests
+                self._adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size,
+                                                              pool_maxsize=self.pool_size)
+                self._session = requests.Session()
+                self._session.mount('https://', self._adapter)
+            return self._session
+
+    def request(self):
+        """Return a google-auth transport Request over the shared session."""
+        from google.auth.transport.requests import Request
+        return Request(self.session())
+
+    def authorized_session(self, credentials):
+        """Return an AuthorizedSession for `credentials` that shares the pooled connections."""
+        from google.auth.transport.requests import AuthorizedSession
+        refresh_request = self.request()
+        session = AuthorizedSession(credentials, auth_request=refresh_request)
+        session.mount('https://', self._adapter)
+        return session
+
+    # -- token file -----------------------------------------------------------
+
+    def _read_tokens(self):
+        try:
+            with open(self.token_file, 'r', encoding='utf-8') as file:
+                tokens = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        if 'refresh_token' in tokens or 'token' in tokens:
+            # Old single-token layout: file it under its own scopes
+            return {scope_key(tokens.get('scopes') or []): tokens}
+        return tokens
+
+    def _save_token(self, key, credentials):
+        with _file_lock(self.token_file):
+            tokens = self._read_tokens()
+            tokens[key] = json.loads(credentials.to_json())
+            tmp_path = f"{self.token_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(tokens, file, indent=2)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.token_file)
+
+    def _load_token(self, scopes):
+        from google.oauth2.credentials import Credentials
+        with _file_lock(self.token_file):
+            tokens = self._read_tokens()
+        wanted = set(scopes)
+        info = tokens.get(scope_key(scopes))
+        if info is None:
+            # A token granted for more scopes than needed works as well
+            info = next((info for info in tokens.values() if wanted <= set(info.get('scopes') or [])), None)
+        if info is None:
+            return None
+        try:
+            return Credentials.from_authorized_user_info(info, scopes)
+        except ValueError as e:
+            print(f"Ignoring unusable token for {scope_key(scopes)}: {e}")
+            return None
+
+    # -- credentials ----------------------------------------------------------
+
+    def user_credentials(self, scopes, client_secrets_file, **flow_options):
+        """Return OAuth user credentials for `scopes`, running the consent flow only if no usable token exists.
+
+        `flow_options` are passed to InstalledAppFlow.run_local_server.
+        """
+        key = scope_key(scopes)
+
+        def load():
+            credentials = self._load_token(scopes)
+            if credentials and (credentials.valid or credentials.refresh_token):
+                return credentials
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            flow = InstalledAppFlow.from_client_secrets_file(client_secrets_file, scopes)
+            credentials = flow.run_local_server(**flow_options)
+            self._save_token(key, credentials)
+            return credentials
+
+        return self._get(('user', key), load, token_key=key)
+
+    def service_account_credentials(self, service_account_file, scopes):
+        """Return service-account credentials for `scopes`, refreshed in the background like user tokens."""
+        def load():
+            from google.oauth2.service_account import Credentials
+            return Credentials.from_service_account_file(service_account_file, scopes=scopes)
+
+        return self._get(('service_account', service_account_file, scope_key(scopes)), load)
+
+    def _get(self, cache_key, load, token_key=None):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+        if entry is None:
+            credentials = load()
+            with self._lock:
+                entry = self._entries.setdefault(cache_key, _Entry(credentials, token_key))
+        if not entry.credentials.valid:
+            # Only the first use (or a failed background refresh) refreshes inline
+            self._refresh(entry)
+        self._start_refresher()
+        with self._wakeup:
+            self._wakeup.notify()
+        return entry.credentials
+
+    def _refresh(self, entry):
+        with entry.lock:
+            if entry.credentials.valid and not self._due(entry):
+                # Refreshed elsewhere since (e.g. inline by an AuthorizedSession); a pending
+                # retry would otherwise stay due and spin the background loop
+                entry.retry_at = None
+                return
+            entry.credentials.refresh(self.request())
+            entry.retry_at = None
+            if entry.token_key is not None:
+                self._save_token(entry.token_key, entry.credentials)
+
+    def _seconds_left(self, entry):
+        expiry = entry.credentials.expiry
+        if expiry is None:
+            return None
+        return (expiry - _utcnow()).total_seconds() - self.refresh_margin
+
+    def _due(self, entry):
+        left = self._seconds_left(entry)
+        return left is not None and left <= 0
+
+    # -- background refresh ---------------------------------------------------
+
+    def _start_refresher(self):
+        with self._lock:
+            if self._refresher is None and not self._stopped:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="credential-refresh", daemon=True)
+                self._refresher.start()
+
+    def _next_wait(self, now):
+        waits = []
+        for entry in self._entries.values():
+            if entry.retry_at is not None:
+                waits.append(entry.retry_at - now)
+            else:
+                left = self._seconds_left(entry)
+                if left is not None:
+                    waits.append(left)
+        return max(0.0, min(waits)) if waits else None
+
+    def _refresh_loop(self):
+        while True:
+            with self._wakeup:
+                if self._stopped:
+                    return
+                wait = self._next_wait(time.monotonic())
+                if wait is None or wait > 0:
+                    self._wakeup.wait(wait)
+                    continue
+                now = time.monotonic()
+                due = [entry for entry in self._entries.values()
+                       if (entry.retry_at is not None and entry.retry_at <= now)
+                       or (entry.retry_at is None and self._due(entry))]
+            for entry in due:
+                try:
+                    self._refresh(entry)
+                except Exception as e:
+                    print(f"Background token refresh failed, retrying in {RETRY_DELAY}s: {e}")
+                    entry.retry_at = time.monotonic() + RETRY_DELAY
+
+    def stop(self):
+        """Stop the background refresher."""
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+        if self._refresher is not None:
+            self._refresher.join()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_credential_manager():
+    """Return the process-wide CredentialManager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = CredentialManager()
+        return _manager
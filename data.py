@@ -2,12 +2,22 @@ import os
 import traceback
 import gspread
 import csv
-import matplotlib.pyplot as plt
+import json
+import hashlib
+import threading
+from gspread.utils import numericise_all, rowcol_to_a1
 import pandas as pd
-from google.oauth2.service_account import Credentials
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
-from io import BytesIO
+from reportlab.lib.utils import ImageReader
+import time
+from io import BytesIO, StringIO
+from chart_renderer import RENDERER_VERSION, ChartJob, render_chart, render_charts
+from build_cache import ArtifactCache
+from snapshot_store import SNAPSHOT_DIR, save_snapshot
+from ticket_aggregates import TicketAggregator
+from credentials import get_credential_manager
+import instrumentation
 
 # Define the path to your service account credentials JSON file
 SERVICE_ACCOUNT_FILE = 'creds1.json'
@@ -18,21 +28,229 @@ SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
 # Directory for storing images and PDF
 OUTPUT_DIR = 'output_files'
 
-# Authenticate with Google Sheets API
+# Number of rows requested per A1 range when streaming a worksheet
+CHUNK_SIZE = 1000
+
+# PDF layout: charts per page, margins and spacing in points
+CHARTS_PER_PAGE = 2
+PAGE_MARGIN = 50
+HEADER_HEIGHT = 20
+CHART_GAP = 20
+CHART_ASPECT = 0.6  # height / width of a rendered chart
+
+# Column types of the ticket-metrics sheet; columns not listed here are inferred
+TICKET_SCHEMA = {
+    'WEEK': 'category',
+    'DATE': 'date',
+    'Percentage of solved tickets': 'percent',
+    'Average time spent on tickets': 'duration',
+}
+
+# Dates in the sheet are written as month/day/year
+DATE_FORMAT = '%m/%d/%Y'
+
+# Duration units understood by the parser, as multiples of a minute
+DURATION_UNITS = {'s': 1 / 60, 'sec': 1 / 60, 'm': 1, 'min': 1, 'h': 60, 'hr': 60, 'hour': 60}
+DURATION_PATTERN = r'^\s*(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>sec|min|hour|hr|s|m|h)s?\s*$'
+
+# Incremental sync bookkeeping: how far each worksheet has been synced
+SYNC_STATE_FILE = os.path.join(OUTPUT_DIR, 'sync_state.json')
+
+# Edits to already-synced rows are only found by re-reading the whole sheet; do that at least this often (seconds)
+FULL_CHECK_INTERVAL = 24 * 60 * 60
+
+# Authenticate with Google Sheets API. The credential manager keeps the service-account
+# token fresh in the background and the client reuses its pooled HTTP connections.
 def authenticate_google_sheets():
     try:
-        credentials = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-        client = gspread.authorize(credentials)
+        manager = get_credential_manager()
+        credentials = manager.service_account_credentials(SERVICE_ACCOUNT_FILE, SCOPES)
+        client = gspread.authorize(credentials, session=manager.authorized_session(credentials))
         return client
     except Exception as e:
         print(f"Authentication failed: {e}")
         return None
 
-# Fetch data from Google Sheets
-def fetch_google_sheet_data(sheet_id, sheet_name):
+# Column letter of the last column of a header of the given width ("K" for 11 columns)
+def last_column_letter(width):
+    return rowcol_to_a1(1, max(width, 1))[:-1]
+
+# Yield raw row values in windows of `chunk_size` rows, starting at `start_row`.
+# The API trims blank rows from the end of every range, so a short window does not mean
+# the sheet has ended: the trimmed rows are held back and yielded if data follows them.
+# Reading stops at the first window that comes back empty, or at the sheet's last row.
+def iter_value_windows(sheet, width, chunk_size=CHUNK_SIZE, start_row=2):
+    last_col = last_column_letter(width)
+    row = start_row
+    blank_rows = 0
+    while row <= sheet.row_count:
+        end = min(row + chunk_size - 1, sheet.row_count)
+        values = sheet.get_values(f"A{row}:{last_col}{end}")
+        if not values:
+            break
+        # The API drops trailing empty cells, so pad every row to the header width
+        window = [[""] * width for _ in range(blank_rows)]
+        window.extend(list(value) + [""] * (width - len(value)) for value in values)
+        yield window
+        blank_rows = end - row + 1 - len(values)
+        row = end + 1
+
+# Stream a worksheet as batches of typed records (numbers converted like get_all_records)
+def iter_sheet_batches(sheet, chunk_size=CHUNK_SIZE, start_row=2, header=None):
+    header = header or sheet.row_values(1)
+    for window in iter_value_windows(sheet, len(header), chunk_size, start_row):
+        yield [dict(zip(header, numericise_all(values, default_blank=""))) for values in window]
+
+# Stable fingerprint of a row of raw cell values
+def row_hash(values):
+    return hashlib.sha1(json.dumps([str(value) for value in values]).encode('utf-8')).hexdigest()
+
+_sync_state_lock = threading.Lock()
+
+def load_sync_state(state_file=SYNC_STATE_FILE):
+    try:
+        with open(state_file, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_sync_state(state, state_file=SYNC_STATE_FILE):
+    os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+    tmp_file = f"{state_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+    os.replace(tmp_file, state_file)
+
+# Local copy of the already-synced rows of one worksheet
+def row_cache_file(state_key):
+    digest = hashlib.sha1(state_key.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(OUTPUT_DIR, f'sheet_rows_{digest}.jsonl')
+
+def load_row_cache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            return [json.loads(line) for line in file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def write_row_cache(cache_file, records):
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+    os.replace(tmp_file, cache_file)
+
+# Running ticket statistics of one worksheet, saved next to its row cache
+def aggregator_file(state_key):
+    return f"{os.path.splitext(row_cache_file(state_key))[0]}.aggregates.pkl"
+
+# The saved statistics cannot take back an edited row, so they are rebuilt on the next run
+def discard_aggregates(state_key):
+    try:
+        os.remove(aggregator_file(state_key))
+    except FileNotFoundError:
+        pass
+
+# Re-read every synced row window by window and compare it with the row cache.
+# Returns the (old, new) pairs of edited records and the updated cache rows.
+def check_synced_rows(sheet, header, last_row, cache_file, chunk_size=CHUNK_SIZE):
+    cached = load_row_cache(cache_file)
+    changed = []
+    index = 0
+    for window in iter_value_windows(sheet, len(header), chunk_size):
+        for values in window:
+            if index >= len(cached) or index + 2 > last_row:
+                break
+            record = dict(zip(header, numericise_all(values, default_blank="")))
+            if record != cached[index]:
+                changed.append((cached[index], record))
+                cached[index] = record
+            index += 1
+        if index + 2 > last_row:
+            break
+    return changed, cached
+
+# Fetch only the rows appended since the last sync of this worksheet and add them to
+# its row cache. At least every FULL_CHECK_INTERVAL seconds (or with full_check=True)
+# the synced rows are re-read as well, so edits to earlier rows are picked up.
+# Returns (records, changed, full_resync): the new records, (old, new) pairs of edited
+# rows, and whether the header or the last synced row changed, in which case every
+# row is fetched again.
+def fetch_new_rows(sheet, state_key, state_file=SYNC_STATE_FILE, chunk_size=CHUNK_SIZE, full_check=None):
+    state = load_sync_state(state_file)
+    entry = state.get(state_key)
+    header = sheet.row_values(1)
+    header_hash = row_hash(header)
+    width = len(header)
+
+    full_resync = entry is None or entry.get('header_hash') != header_hash
+    if not full_resync and entry['last_row'] >= 2:
+        # If the last row we synced was edited or removed, earlier rows may have moved too
+        last_col = last_column_letter(width)
+        tail = sheet.get_values(f"A{entry['last_row']}:{last_col}{entry['last_row']}")
+        tail_values = list(tail[0]) + [""] * (width - len(tail[0])) if tail else None
+        full_resync = tail_values is None or row_hash(tail_values) != entry['tail_hash']
+
+    cache_file = row_cache_file(state_key)
+    changed = []
+    checked_at = time.time() if full_resync else entry.get('checked_at', 0)
+    if full_check is None:
+        full_check = time.time() - checked_at >= FULL_CHECK_INTERVAL
+    if full_check and not full_resync:
+        changed, cached = check_synced_rows(sheet, header, entry['last_row'], cache_file, chunk_size)
+        checked_at = time.time()
+        if changed:
+            # Drop the saved aggregates before the cache changes, so they never outlive it
+            discard_aggregates(state_key)
+            write_row_cache(cache_file, cached)
+    if full_resync:
+        discard_aggregates(state_key)
+
+    start_row = 2 if full_resync else entry['last_row'] + 1
+    last_row = start_row - 1 if full_resync else entry['last_row']
+    tail_hash = None if full_resync else entry['tail_hash']
+    records = []
+    for window in iter_value_windows(sheet, width, chunk_size, start_row):
+        records.extend(dict(zip(header, numericise_all(values, default_blank=""))) for values in window)
+        last_row += len(window)
+        tail_hash = row_hash(window[-1])
+
+    # Write the rows before the state so a crash can only cause a re-fetch, never a gap
+    os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+    with open(cache_file, 'w' if full_resync else 'a', encoding='utf-8') as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+    # Several worksheets may sync at once; re-read the state so their entries are kept
+    with _sync_state_lock:
+        state = load_sync_state(state_file)
+        state[state_key] = {'header_hash': header_hash, 'last_row': last_row, 'tail_hash': tail_hash,
+                            'checked_at': checked_at}
+        save_sync_state(state, state_file)
+    return records, changed, full_resync
+
+# Key of a worksheet in the sync state
+def sync_state_key(sheet_id, sheet_name):
+    return f"{sheet_id}/{sheet_name}"
+
+_client = None
+_client_lock = threading.Lock()
+
+# Authenticate once and reuse the same client (and token) for every fetch
+def get_sheets_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = authenticate_google_sheets()
+        return _client
+
+# Fetch data from Google Sheets. With incremental=True only rows added since the
+# previous run are downloaded; earlier rows come from the local row cache.
+@instrumentation.timed("report_stage", stage="fetch")
+def fetch_google_sheet_data(sheet_id, sheet_name, incremental=False, chunk_size=CHUNK_SIZE, client=None):
     try:
-        # Authenticate the Google Sheets client
-        client = authenticate_google_sheets()
+        # Reuse the shared Google Sheets client unless one is passed in
+        client = client or get_sheets_client()
         if not client:
             raise RuntimeError("Google Sheets client authentication failed.")
         
@@ -44,15 +262,23 @@ def fetch_google_sheet_data(sheet_id, sheet_name):
         except gspread.WorksheetNotFound:
             raise ValueError(f"Worksheet '{sheet_name}' not found in the sheet. Check the sheet name.")
 
-        # Fetch all rows as a list of dictionaries
-        data = sheet.get_all_records()
-        
+        if incremental:
+            state_key = sync_state_key(sheet_id, sheet_name)
+            new_rows, changed, full_resync = fetch_new_rows(sheet, state_key, chunk_size=chunk_size)
+            data = load_row_cache(row_cache_file(state_key))
+            mode = "full resync" if full_resync else "incremental"
+            print(f"Fetched {len(new_rows)} new and {len(changed)} edited rows from the sheet ({mode}).")
+        else:
+            # Stream the rows in fixed-size windows instead of one get_all_records call
+            data = []
+            for batch in iter_sheet_batches(sheet, chunk_size):
+                data.extend(batch)
+
         if not data:
             print("The sheet is empty or contains no records.")
         else:
-            print("Fetched data from the sheet:")
-            print(data)
-        
+            print(f"Fetched {len(data)} rows from the sheet.")
+
         return data
 
     except FileNotFoundError:
@@ -70,6 +296,28 @@ def fetch_google_sheet_data(sheet_id, sheet_name):
     # Return None if any exception occurs
     return None
 
+# Serialize the rows as CSV bytes
+@instrumentation.timed("report_stage", stage="csv")
+def csv_bytes(data):
+    buffer = StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=data[0].keys())
+    writer.writeheader()  # Write the header row
+    writer.writerows(data)  # Write the data rows
+    return buffer.getvalue().encode('utf-8')
+
+# Write bytes to a file unless it already holds exactly those bytes
+def write_if_changed(filepath, content):
+    try:
+        with open(filepath, 'rb') as file:
+            if file.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    with open(filepath, 'wb') as file:
+        file.write(content)
+    return True
+
 # Save the data to a CSV file
 def save_to_csv(data, filename="sheet_data.csv"):
     if data:
@@ -79,102 +327,361 @@ def save_to_csv(data, filename="sheet_data.csv"):
             filepath = os.path.join(OUTPUT_DIR, filename)
             
             # Writing to a CSV file
-            with open(filepath, mode='w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=data[0].keys())
-                writer.writeheader()  # Write the header row
-                writer.writerows(data)  # Write the data rows
+            with open(filepath, mode='wb') as file:
+                file.write(csv_bytes(data))
             print(f"Data has been successfully saved to {filepath}.")
         except Exception as e:
             print(f"An error occurred while saving to CSV: {e}")
     else:
         print("No data to save to CSV.")
 
-# Plot graphs dynamically based on the fields in the data and group by the DATE field
-def plot_graphs(data):
-    try:
-        if not data:
-            print("No data available to plot.")
-            return
-        
-        # Convert the data into a pandas DataFrame
-        df = pd.DataFrame(data)
-
-        # Ensure that 'DATE' column is in datetime format
-        if 'DATE' in df.columns:
-            df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
-
-            # Group the data by 'DATE' and compute the mean for each group
-            grouped_df = df.groupby(df['DATE'].dt.date).mean(numeric_only=True)  # Only numeric columns
-
-            # Iterate over the columns and plot graphs for numerical fields
-            for column in grouped_df.columns:
-                try:
-                    # Plotting a simple line graph for grouped data
-                    if grouped_df[column].isnull().sum() == 0:  # Only plot if data is not null
-                        plt.figure(figsize=(10, 6))
-                        grouped_df[column].plot(kind='line', title=f"Graph of {column} grouped by DATE")
-                        plt.xlabel('Date')
-                        plt.ylabel(column)
-                        plt.grid(True)
-
-                        # Ensure the output directory exists
-                        os.makedirs(OUTPUT_DIR, exist_ok=True)
-                        image_filename = os.path.join(OUTPUT_DIR, f'{column}_grouped_by_date_plot.png')
-                        plt.savefig(image_filename)
-                        plt.close()
-                    else:
-                        print(f"Skipping column '{column}' due to invalid or missing values.")
-                except Exception as e:
-                    print(f"Error plotting {column}: {e}")
+# Save the data as a typed, WEEK-partitioned columnar snapshot (Arrow or Parquet) next to
+# the CSV. Partitions present in `data` are replaced, so reruns are idempotent and new
+# weeks are appended.
+def save_to_columnar(data, root=SNAPSHOT_DIR, fmt='arrow'):
+    if data:
+        try:
+            save_snapshot(parse_ticket_metrics(pd.DataFrame(data)), root, fmt=fmt)
+            print(f"Data has been successfully saved to {root} ({fmt}).")
+        except ImportError as e:
+            print(f"Skipping columnar snapshot: {e}")
+        except Exception as e:
+            print(f"An error occurred while saving the columnar snapshot: {e}")
+    else:
+        print("No data to save as a columnar snapshot.")
+
+# "96.67%" -> 96.67 (float32)
+def parse_percent(series):
+    text = series.astype('string').str.strip().str.rstrip('%')
+    return pd.to_numeric(text, errors='coerce').astype('float32')
+
+# "20 min" / "1.5 h" / "45 s" -> minutes (float32)
+def parse_duration(series):
+    parts = series.astype('string').str.lower().str.extract(DURATION_PATTERN)
+    minutes = pd.to_numeric(parts['value'], errors='coerce') * parts['unit'].map(DURATION_UNITS).astype('float64')
+    return minutes.astype('float32')
+
+def parse_date(series):
+    parsed = pd.to_datetime(series, format=DATE_FORMAT, errors='coerce')
+    if parsed.isna().all() and series.notna().any():
+        parsed = pd.to_datetime(series, errors='coerce')
+    return parsed
+
+# Whole numbers become int32 (nullable Int32 when cells are blank), anything else float32
+def parse_number(series):
+    numbers = pd.to_numeric(series.replace('', None), errors='coerce')
+    whole = numbers.dropna()
+    if len(whole) and (whole == whole.round()).all() and whole.abs().max() < 2 ** 31:
+        return numbers.astype('int32') if not numbers.isna().any() else numbers.astype('Int32')
+    return numbers.astype('float32')
+
+COLUMN_PARSERS = {
+    'percent': parse_percent,
+    'duration': parse_duration,
+    'date': parse_date,
+    'number': parse_number,
+    'category': lambda series: series.astype('category'),
+}
+
+# Guess the kind of a column not covered by the schema from its non-blank text
+def infer_column_kind(series):
+    text = series.astype('string').str.strip()
+    text = text[text.notna() & (text != '')]
+    if text.empty:
+        return None
+    if text.str.endswith('%').all():
+        return 'percent'
+    if text.str.lower().str.match(DURATION_PATTERN).all():
+        return 'duration'
+    if pd.to_numeric(text, errors='coerce').notna().all():
+        return 'number'
+    return None
+
+# Convert every column of the ticket-metrics DataFrame to a compact native dtype,
+# one vectorized operation per column
+def parse_ticket_metrics(df, schema=TICKET_SCHEMA):
+    parsed = {}
+    for column in df.columns:
+        kind = schema.get(column) or infer_column_kind(df[column])
+        if kind is None:
+            parsed[column] = df[column]
         else:
+            parsed[column] = COLUMN_PARSERS[kind](df[column])
+    return pd.DataFrame(parsed, index=df.index)
+
+# Fold the rows into a TicketAggregator holding per-day, per-week and per-month statistics.
+# Returns None if there is nothing to aggregate.
+@instrumentation.timed("report_stage", stage="aggregate")
+def aggregate_ticket_metrics(data):
+    if not data:
+        print("No data available to aggregate.")
+        return None
+
+    # Convert the data into a pandas DataFrame with typed columns
+    df = parse_ticket_metrics(pd.DataFrame(data))
+
+    if 'DATE' not in df.columns:
+        print("No 'DATE' field found in the data.")
+        return None
+    aggregator = TicketAggregator().update(df)
+    if not aggregator.rows:
+        print("No rows with a valid DATE to aggregate.")
+        return None
+    return aggregator
+
+# Load the saved aggregator of a worksheet, fold in only the rows of its row cache it has
+# not seen yet and save it again. Between resyncs the cache only grows at the end, and
+# fetch_new_rows discards the saved aggregates whenever earlier rows change.
+# Returns None if there is nothing to aggregate.
+@instrumentation.timed("report_stage", stage="aggregate")
+def sync_ticket_aggregates(state_key, data):
+    path = aggregator_file(state_key)
+    aggregator = None
+    if os.path.exists(path):
+        try:
+            aggregator = TicketAggregator.load(path)
+        except Exception as e:
+            print(f"Could not load the saved aggregates, rebuilding them: {e}")
+    if aggregator is None or aggregator.source_rows is None or aggregator.source_rows > len(data):
+        aggregator = TicketAggregator()
+
+    new_rows = data[aggregator.source_rows:]
+    if new_rows:
+        df = parse_ticket_metrics(pd.DataFrame(new_rows))
+        if 'DATE' not in df.columns:
             print("No 'DATE' field found in the data.")
+            return None
+        aggregator.update(df)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_file = f"{path}.tmp"
+        aggregator.save(tmp_file)
+        os.replace(tmp_file, path)
+    print(f"Folded {len(new_rows)} new rows into the aggregates of {aggregator.source_rows} rows.")
+    if not aggregator.rows:
+        print("No rows with a valid DATE to aggregate.")
+        return None
+    return aggregator
+
+# One line-chart job for every numerical field, grouped by the DATE field.
+# Pass an existing aggregator to avoid re-parsing the data.
+def chart_jobs(data, aggregator=None):
+    if aggregator is None:
+        aggregator = aggregate_ticket_metrics(data)
+    if aggregator is None:
+        return []
+
+    # Daily mean of every numeric column, from the aggregator's running sums and counts
+    grouped_df = aggregator.mean('day')
 
+    # Build one chart job per numerical field
+    jobs = []
+    for column in grouped_df.columns:
+        if grouped_df[column].isnull().sum() == 0:  # Only plot if data is not null
+            jobs.append(ChartJob(column, grouped_df.index.to_numpy(), grouped_df[column].to_numpy(),
+                                 f"Graph of {column} grouped by DATE", 'Date', column))
+        else:
+            print(f"Skipping column '{column}' due to invalid or missing values.")
+    return jobs
+
+# One summary line per numerical field: latest 7-day moving average and the change of
+# the latest weekly mean against the week before.
+def summary_lines(aggregator, window=7):
+    rolling = aggregator.rolling_mean(window)
+    weekly = aggregator.mean('week')
+    deltas = aggregator.week_over_week()
+    lines = []
+    for column in rolling.columns:
+        line = f"{column}: {window}-day avg {rolling[column].iloc[-1]:.2f}"
+        if len(weekly) > 1 and pd.notna(deltas[column].iloc[-1]):
+            line += f", {weekly.index[-1]} {deltas[column].iloc[-1]:+.2f} vs {weekly.index[-2]}"
+        lines.append(line)
+    return lines
+
+# Render the charts for `data` and yield (column, PNG bytes) as each one finishes.
+# Charts are rendered in parallel by chart_renderer and never touch the disk.
+def iter_graphs(data, workers=None):
+    yield from render_charts(chart_jobs(data), workers=workers)
+
+# Plot graphs dynamically based on the fields in the data and group by the DATE field.
+# Returns a list of (column, PNG bytes); with save_images=True each chart is also
+# written to OUTPUT_DIR.
+def plot_graphs(data, workers=None, save_images=False):
+    charts = []
+    try:
+        if save_images:
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+        for column, image in iter_graphs(data, workers):
+            if save_images:
+                image_filename = os.path.join(OUTPUT_DIR, f'{column}_grouped_by_date_plot.png')
+                with open(image_filename, 'wb') as file:
+                    file.write(image)
+            charts.append((column, image))
     except Exception as e:
         print(f"Error generating plots: {e}")
+    return charts
 
-# Generate PDF report with the graphs (this will generate even if graphs aren't plotted)
-def generate_pdf_report(pdf_filename="report.pdf"):
+# Position (x, y of the lower-left corner) of each chart slot on a page
+def chart_slots(page_width, page_height):
+    width = page_width - 2 * PAGE_MARGIN
+    height = width * CHART_ASPECT
+    top = page_height - PAGE_MARGIN - HEADER_HEIGHT
+    return [(PAGE_MARGIN, top - (index + 1) * height - index * CHART_GAP, width, height)
+            for index in range(CHARTS_PER_PAGE)]
+
+# Generate PDF report with the graphs (this will generate even if graphs aren't plotted).
+# `charts` is any iterable of (title, PNG bytes), e.g. iter_graphs(data); charts are laid
+# out across as many pages as needed and each buffer is dropped once it has been drawn.
+def generate_pdf_report(charts=(), pdf_filename="report.pdf"):
     try:
         # Ensure the output directory exists
         os.makedirs(OUTPUT_DIR, exist_ok=True)
         pdf_filepath = os.path.join(OUTPUT_DIR, pdf_filename)
-        
-        c = canvas.Canvas(pdf_filepath, pagesize=letter)
-        c.setFont("Helvetica", 12)
+        drawn, pages = write_pdf(charts, pdf_filepath)
+        print(f"PDF report with {drawn} graphs on {pages} pages saved as {pdf_filepath}")
+    
+    except Exception as e:
+        print(f"Error generating PDF: {e}")
 
-        # Title for the PDF
-        c.drawString(100, 750, "Google Sheets Data Report")
+# Lay the charts out into a PDF written to `output` (a path or binary file object),
+# followed by a page of `summary` lines if any are given. Returns (graphs drawn, pages).
+@instrumentation.timed("report_stage", stage="pdf")
+def write_pdf(charts, output, summary=()):
+    c = canvas.Canvas(output, pagesize=letter)
+    page_width, page_height = letter
+    slots = chart_slots(page_width, page_height)
 
+    def draw_header(page_number):
+        c.setFont("Helvetica", 12)
+        c.drawString(PAGE_MARGIN, page_height - PAGE_MARGIN, "Google Sheets Data Report")
+        c.setFont("Helvetica", 9)
+        c.drawRightString(page_width - PAGE_MARGIN, page_height - PAGE_MARGIN, f"Page {page_number}")
+
+    page_number = 1
+    draw_header(page_number)
+    drawn = 0
+    chart_iter = iter(charts)
+    while True:
+        try:
+            title, image = next(chart_iter)
+        except StopIteration:
+            break
+        except Exception as e:
+            print(f"Error rendering chart: {e}")
+            break
+        if drawn and drawn % CHARTS_PER_PAGE == 0:
+            # Finish the page so its images can be compressed and released
+            c.showPage()
+            page_number += 1
+            draw_header(page_number)
+        x, y, width, height = slots[drawn % CHARTS_PER_PAGE]
+        try:
+            c.drawImage(ImageReader(BytesIO(image)), x, y, width=width, height=height)
+            drawn += 1
+            # reportlab keeps only the compressed image stream; drop our copy of the PNG
+            image = None
+        except Exception as e:
+            print(f"Skipping image for {title} due to error: {e}")
+    
+    if not drawn:
         # Add a note if no graphs are generated
-        y_position = 730
-        graphs_generated = False
-
-        for column in ["Column1", "Column2"]:  # Replace with actual column names or dynamically add images
-            try:
-                image_filename = os.path.join(OUTPUT_DIR, f"{column}_plot.png")
-                c.drawImage(image_filename, 100, y_position, width=400, height=300)
-                y_position -= 310  # Adjust the position for the next plot
-                graphs_generated = True
-            except Exception as e:
-                print(f"Skipping image for {column} due to error: {e}")
-        
-        if not graphs_generated:
-            c.drawString(100, y_position, "No graphs were generated. Data is available in the sheet.")
+        c.setFont("Helvetica", 12)
+        c.drawString(PAGE_MARGIN, slots[0][1] + slots[0][3], "No graphs were generated. Data is available in the sheet.")
+
+    if summary:
+        c.showPage()
+        page_number += 1
+        draw_header(page_number)
+        y = page_height - PAGE_MARGIN - HEADER_HEIGHT - 12
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(PAGE_MARGIN, y, "Trends")
+        c.setFont("Helvetica", 9)
+        for line in summary:
+            y -= 14
+            if y < PAGE_MARGIN:
+                c.showPage()
+                page_number += 1
+                draw_header(page_number)
+                c.setFont("Helvetica", 9)
+                y = page_height - PAGE_MARGIN - HEADER_HEIGHT - 12
+            c.drawString(PAGE_MARGIN, y, line)
+
+    # Save the PDF
+    c.save()
+    return drawn, page_number
 
-        # Save the PDF
-        c.save()
+# Run the CSV -> per-column chart -> PDF stages through an ArtifactCache. Every artifact
+# is keyed by a hash of its inputs, so unchanged data rebuilds nothing and a changed
+# column re-renders only its own chart (plus the PDF that contains it).
+# Pass the worksheet's synced aggregator to skip aggregating the full history again.
+@instrumentation.timed("build_report")
+def build_report(data, cache, csv_filename="sheet_data.csv", pdf_filename="report.pdf", workers=None,
+                 output_dir=None, aggregator=None):
+    if not data:
+        print("No data to build a report from.")
+        return
+    output_dir = output_dir or OUTPUT_DIR
+
+    # CSV, keyed by the rows themselves
+    csv_data = cache.build('csv', cache.key('csv', data), lambda: csv_bytes(data))
+    write_if_changed(os.path.join(output_dir, csv_filename), csv_data)
+
+    # Charts, keyed by renderer version, labels and the plotted values of each column
+    if aggregator is None:
+        aggregator = aggregate_ticket_metrics(data)
+    jobs = chart_jobs(data, aggregator)
+    keys = [cache.key('chart', RENDERER_VERSION, job.title, job.xlabel, job.ylabel, job.x.tobytes(), job.y.tobytes())
+            for job in jobs]
+    # Images are kept in the cache, not in memory; the PDF reads them back one at a time
+    missing = []
+    for job, key in zip(jobs, keys):
+        if key in cache:
+            cache.record('chart', hit=True, saved=cache.cost(key))
+        else:
+            missing.append((job, key))
+    if missing:
+        stage_start = start = time.perf_counter()
+        rendered = render_charts([job for job, _ in missing], workers=workers)
+        for (job, key), (_, image) in zip(missing, rendered):
+            # Charts render in parallel, so charge each its share of the elapsed time
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            cache.put(key, image, 'chart', elapsed)
+            cache.record('chart', hit=False, seconds=elapsed)
+        instrumentation.observe("report_stage", time.perf_counter() - stage_start, stage="charts")
+    instrumentation.count("report_charts", len(jobs) - len(missing), result="cached")
+    instrumentation.count("report_charts", len(missing), result="rendered")
+
+    # PDF, keyed by the charts it contains, the trend summary and the page layout
+    layout = (CHARTS_PER_PAGE, PAGE_MARGIN, HEADER_HEIGHT, CHART_GAP, CHART_ASPECT)
+    summary = summary_lines(aggregator) if aggregator is not None else []
+
+    def charts():
+        for job, key in zip(jobs, keys):
+            image = cache.get(key)
+            if image is None:
+                # Evicted by a cache smaller than the report's charts; render it again
+                image = render_chart(job)
+            yield job.name, image
+
+    # The PDF is written straight to a file, then copied to the cache and the output path
+    pdf_filepath = os.path.join(output_dir, pdf_filename)
+    if cache.build_file('pdf', cache.key('pdf', layout, keys, summary),
+                        lambda path: write_pdf(charts(), path, summary), pdf_filepath):
         print(f"PDF report saved as {pdf_filepath}")
-    
-    except Exception as e:
-        print(f"Error generating PDF: {e}")
+    cache.save()
 
 # Test with your Google Sheets ID and Sheet Name
 SHEET_ID = "14Lw2-WIOPPFJaogMSrgm7SBrqszW84ZuZwjEvzYSblI"
 SHEET_NAME = "Sheet1"  # Replace with your sheet name
 
 if __name__ == "__main__":
-    data = fetch_google_sheet_data(SHEET_ID, SHEET_NAME)
+    cache = ArtifactCache()
+    start = time.perf_counter()
+    data = fetch_google_sheet_data(SHEET_ID, SHEET_NAME, incremental=True)
+    cache.record('fetch', hit=False, seconds=time.perf_counter() - start)
     if data:
-        save_to_csv(data)
-        plot_graphs(data)  # Attempt to generate plots
-        generate_pdf_report()  # Generate the PDF report regardless of plotting success
+        # Only the rows and artifacts that changed since the last run are processed again
+        aggregator = sync_ticket_aggregates(sync_state_key(SHEET_ID, SHEET_NAME), data)
+        build_report(data, cache, aggregator=aggregator)
+        save_to_columnar(data)
+        print(cache.report())
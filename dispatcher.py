@@ -0,0 +1,145 @@
+import asyncio
+import queue
+import re
+import threading
+
+# Where long answers are split so they can be interrupted between sentences
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class SpeechQueue:
+    """Speak queued utterances in order from a single worker thread.
+
+    The TTS engine is not thread-safe, so every engine call, including voice
+    changes, is funnelled through this queue. `say` only enqueues, so callers
+    never wait for speech to finish. Text is queued sentence by sentence so
+    `interrupt` can cut a long answer short (barge-in): it drops everything
+    queued for speaking and flags the current sentence as `interrupted`. The
+    engine is never touched from the interrupting thread; a callback on the
+    speech thread (e.g. pyttsx3's 'started-word') checks the flag and stops it.
+    """
+
+    def __init__(self, say_and_wait):
+        self._say_and_wait = say_and_wait
+        self._queue = queue.Queue()
+        # Speech queued before the latest interrupt() belongs to an older generation and is skipped
+        self._generation = 0
+        # Generation of the sentence being spoken
+        self._current = None
+        self._speaking = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="speech-queue", daemon=True)
+        self._thread.start()
+
+    def say(self, text):
+        """Queue `text` to be spoken after everything queued before it."""
+        generation = self._generation
+        for sentence in SENTENCE_END.split(text.strip()) or [text]:
+            if sentence:
+                self._queue.put((self._speak, (sentence, generation)))
+
+    def run(self, func, *args):
+        """Queue an arbitrary engine call to run on the speech thread."""
+        self._queue.put((func, args))
+
+    @property
+    def speaking(self):
+        """True while a sentence is being spoken."""
+        return self._speaking.is_set()
+
+    @property
+    def interrupted(self):
+        """True while the sentence being spoken has been interrupted and should stop."""
+        return self._speaking.is_set() and self._current != self._generation
+
+    def interrupt(self):
+        """Drop all queued speech and flag the current sentence to stop; other queued calls still run."""
+        self._generation += 1
+
+    def join(self):
+        """Block until everything queued so far has been spoken."""
+        self._queue.join()
+
+    def stop(self):
+        """Finish the queued speech and stop the worker."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _speak(self, text, generation):
+        if generation != self._generation:
+            return
+        self._current = generation
+        self._speaking.set()
+        try:
+            self._say_and_wait(text)
+        finally:
+            self._speaking.clear()
+            self._current = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                func, args = item
+                func(*args)
+            except Exception as e:
+                print(f"Speech error: {e}")
+            finally:
+                self._queue.task_done()
+
+
+class CommandDispatcher:
+    """Run command coroutines concurrently on a background asyncio loop.
+
+    `submit` hands a command to the loop and returns straight away, so the
+    caller can go back to listening while earlier commands are still waiting
+    on the network.
+    """
+
+    def __init__(self, handler):
+        self._handler = handler
+        self._loop = asyncio.new_event_loop()
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="command-dispatcher", daemon=True)
+
+    def start(self):
+        """Start the event loop thread."""
+        self._thread.start()
+
+    def submit(self, command):
+        """Schedule `command` and return a concurrent.futures.Future for it."""
+        future = asyncio.run_coroutine_threadsafe(self._run(command), self._loop)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def pending(self):
+        """Return the number of commands still in flight."""
+        with self._pending_lock:
+            return len(self._pending)
+
+    def _discard(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    async def _run(self, command):
+        try:
+            await self._handler(command)
+        except Exception as e:
+            print(f"Error handling command '{command}': {e}")
+
+    def stop(self, timeout=None):
+        """Wait for in-flight commands, then stop the event loop."""
+        with self._pending_lock:
+            pending = list(self._pending)
+        for future in pending:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop.close()
@@ -0,0 +1,263 @@
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Set JARVIS_INSTRUMENTATION=0 to turn every span and counter into a no-op
+ENABLED = os.getenv("JARVIS_INSTRUMENTATION", "1") != "0"
+
+# Prefix of every exported metric name
+PREFIX = "jarvis_"
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Recent durations kept per span for the percentiles in the JSON export
+SAMPLES = 2048
+
+
+class Timing:
+    """Running histogram of one span name and label set."""
+
+    __slots__ = ("count", "total", "min", "max", "buckets", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.samples = deque(maxlen=SAMPLES)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                break
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else 0.0
+
+
+class Registry:
+    """Thread-safe store of span timings and counters, keyed by name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._counters = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = Timing()
+            timing.add(seconds)
+
+    def count(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def timing(self, name, **labels):
+        """Return the Timing of one span, or None if it has not been recorded."""
+        with self._lock:
+            return self._timings.get(self._key(name, labels))
+
+    def to_json(self):
+        """Return every span and counter as plain dicts, with p50/p90/p99 of recent samples in ms."""
+        with self._lock:
+            timings = list(self._timings.items())
+            counters = list(self._counters.items())
+        return {
+            "spans": [{
+                "name": name, "labels": dict(labels), "count": timing.count,
+                "total_s": timing.total, "mean_ms": timing.total / timing.count * 1000,
+                "min_ms": timing.min * 1000, "max_ms": timing.max * 1000,
+                "p50_ms": timing.percentile(50) * 1000, "p90_ms": timing.percentile(90) * 1000,
+                "p99_ms": timing.percentile(99) * 1000,
+            } for (name, labels), timing in sorted(timings)],
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(counters)],
+        }
+
+    def to_prometheus(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            timings = sorted(self._timings.items())
+            counters = sorted(self._counters.items())
+        lines = []
+        seen = set()
+        for (name, labels), timing in timings:
+            metric = f"{PREFIX}{name}_seconds"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, hits in zip(BUCKETS, timing.buckets):
+                cumulative += hits
+                lines.append(f"{metric}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{metric}_bucket{_labels(labels, le='+Inf')} {timing.count}")
+            lines.append(f"{metric}_sum{_labels(labels)} {timing.total}")
+            lines.append(f"{metric}_count{_labels(labels)} {timing.count}")
+        for (name, labels), value in counters:
+            metric = f"{PREFIX}{name}_total"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+# Process-wide registry used by the module-level helpers
+registry = Registry()
+
+
+class span:
+    """Time the enclosed block: `with span("report_stage", stage="pdf"): ...`"""
+
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if ENABLED:
+            registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def timed(name=None, **labels):
+    """Decorator timing every call of a function or coroutine function as a span."""
+    def decorate(func):
+        span_name = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe(name, seconds, **labels):
+    """Record a duration measured elsewhere, e.g. end of speech to recognized text."""
+    if ENABLED:
+        registry.observe(name, seconds, **labels)
+
+
+def count(name, amount=1, **labels):
+    if ENABLED:
+        registry.count(name, amount, **labels)
+
+
+def write_metrics(path):
+    """Write the registry to `path`: JSON for .json files, Prometheus text otherwise."""
+    content = json.dumps(registry.to_json(), indent=2) if path.endswith(".json") else registry.to_prometheus()
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(content)
+
+
+@contextmanager
+def profile(output=None, sort="cumulative", limit=30):
+    """Run the block under cProfile.
+
+    A cProfile profiler only sees the thread that enabled it, so every thread
+    started inside the block (through `threading`) gets a profiler of its own
+    and their stats are merged with the calling thread's when the block ends.
+    Threads that were already running when the block started are not covered.
+
+    Stats are dumped to `output` (for snakeviz/pstats) if given, otherwise the
+    top `limit` entries are printed.
+    """
+    profiler = cProfile.Profile()
+    thread_profilers = []
+    lock = threading.Lock()
+
+    def profile_thread(frame, event, arg):
+        thread_profiler = cProfile.Profile()
+        try:
+            thread_profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler, and it already sees every thread
+            sys.setprofile(None)
+            return
+        with lock:
+            thread_profilers.append(thread_profiler)
+
+    threading.setprofile(profile_thread)
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        threading.setprofile(None)
+        stats = pstats.Stats(profiler)
+        with lock:
+            for thread_profiler in thread_profilers:
+                try:
+                    stats.add(thread_profiler)
+                except TypeError:
+                    # The thread made no calls worth recording
+                    pass
+        if output:
+            stats.dump_stats(output)
+        else:
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats(sort).print_stats(limit)
+            print(stream.getvalue())
+
+
+@contextmanager
+def profile_from_env(variable="JARVIS_PROFILE"):
+    """Profile the block if `variable` is set; its value is the stats file ("-" prints instead)."""
+    output = os.getenv(variable)
+    if not output:
+        yield None
+        return
+    with profile(None if output == "-" else output) as profiler:
+        yield profiler
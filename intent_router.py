@@ -0,0 +1,116 @@
+import inspect
+import re
+from collections import namedtuple
+
+# Words are lowercased runs of letters, digits, apostrophes and colons ("12:30")
+TOKEN_PATTERN = re.compile(r"[\w':]+")
+
+# Trie key holding the intents whose keyword phrase ends at a node
+_END = "\0"
+
+Intent = namedtuple("Intent", "name handler keywords slot_pattern slots_required min_score priority vocabulary")
+RouteMatch = namedtuple("RouteMatch", "intent handler score slots")
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class IntentRouter:
+    """Route utterances to registered intents by weighted keyword matching.
+
+    Every keyword phrase of every intent is compiled into one token trie, so a
+    single left-to-right pass over the utterance scores all intents at once.
+    The cost depends on the utterance length, not on how many intents are
+    registered. Only the winning intent's slot pattern is then run to pull out
+    its arguments; if a required slot pattern does not match, the next best
+    intent is tried.
+    """
+
+    def __init__(self):
+        self._intents = []
+        self._trie = None
+
+    def __len__(self):
+        return len(self._intents)
+
+    def register(self, name, handler, keywords, slots=None, slots_required=False, min_score=1, priority=0,
+                 vocabulary=()):
+        """Register an intent.
+
+        `keywords` maps keyword phrases to weights (a plain list gives every
+        phrase weight 1). `slots` is a regex whose named groups become the
+        handler's keyword arguments. Ties on score go to the higher `priority`.
+        `vocabulary` lists the words the slots may be spoken with (e.g. the
+        number words of a time) so a speech grammar can include them.
+        """
+        if not isinstance(keywords, dict):
+            keywords = {phrase: 1 for phrase in keywords}
+        slot_pattern = re.compile(slots) if slots else None
+        self._intents.append(Intent(name, handler, keywords, slot_pattern, slots_required, min_score, priority,
+                                    tuple(vocabulary)))
+        self._trie = None
+
+    def intent(self, name, keywords, **options):
+        """Decorator form of `register`."""
+        def decorator(handler):
+            self.register(name, handler, keywords, **options)
+            return handler
+        return decorator
+
+    def compile(self):
+        """Build the keyword trie. Called lazily by `route` after registration."""
+        trie = {}
+        for index, intent in enumerate(self._intents):
+            for phrase, weight in intent.keywords.items():
+                node = trie
+                for token in tokenize(phrase):
+                    node = node.setdefault(token, {})
+                node.setdefault(_END, []).append((index, weight))
+        self._trie = trie
+
+    def vocabulary(self):
+        """Return the set of words used by any keyword phrase or slot vocabulary."""
+        return {token for intent in self._intents for phrase in (*intent.keywords, *intent.vocabulary)
+                for token in tokenize(phrase)}
+
+    def route(self, text):
+        """Return the best RouteMatch for `text`, or None if no intent applies."""
+        if self._trie is None:
+            self.compile()
+
+        tokens = tokenize(text)
+        scores = {}
+        for start in range(len(tokens)):
+            node = self._trie
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                for index, weight in node.get(_END, ()):
+                    scores[index] = scores.get(index, 0) + weight
+
+        ranked = sorted(scores.items(), key=lambda item: (item[1], self._intents[item[0]].priority, -item[0]), reverse=True)
+        for index, score in ranked:
+            intent = self._intents[index]
+            if score < intent.min_score:
+                continue
+            slots = {}
+            if intent.slot_pattern is not None:
+                match = intent.slot_pattern.search(text)
+                if match:
+                    slots = {key: value for key, value in match.groupdict().items() if value is not None}
+                elif intent.slots_required:
+                    continue
+            return RouteMatch(intent.name, intent.handler, score, slots)
+        return None
+
+    async def dispatch(self, text):
+        """Route `text` and run the matched handler. Returns the RouteMatch or None."""
+        match = self.route(text)
+        if match is not None:
+            result = match.handler(**match.slots)
+            if inspect.isawaitable(result):
+                await result
+        return match
@@ -0,0 +1,239 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+
+# How long appended records may sit in the OS cache before they are fsynced
+FSYNC_INTERVAL_SECONDS = 0.05
+
+# Number of log records after which the log is folded into the snapshot
+COMPACT_THRESHOLD = 1000
+
+
+class Journal:
+    """Record store backed by a JSON snapshot and an append-only JSON-lines log.
+
+    Every mutation appends one line to the log, so writes cost O(1) bytes.
+    Appends are fsynced in batches by a background thread, and once the log
+    grows past `compact_threshold` records it is folded into a new snapshot in
+    the background. On startup the snapshot is loaded and the log replayed; a
+    torn final line is discarded, so a crash loses at most the last record.
+    """
+
+    def __init__(self, snapshot_path, log_path=None, key="id",
+                 fsync_interval=FSYNC_INTERVAL_SECONDS, compact_threshold=COMPACT_THRESHOLD):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or f"{snapshot_path}.log"
+        self.key = key
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+
+        self._records = {}
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._flush_cond = threading.Condition(self._lock)
+        self._dirty = False
+        self._closed = False
+        self._compacting = False
+        self._log_records = 0
+
+        needs_snapshot = self._replay()
+        self._log = open(self.log_path, "a", encoding="utf-8")
+        self._flusher = threading.Thread(target=self._flush_loop, name="journal-fsync", daemon=True)
+        self._flusher.start()
+        if needs_snapshot:
+            # Persist generated ids before any log entry refers to them, and finish an
+            # interrupted compaction before the next rotation
+            self.compact()
+
+    # Reading
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+    def __contains__(self, record_id):
+        with self._lock:
+            return record_id in self._records
+
+    def get(self, record_id, default=None):
+        with self._lock:
+            return self._records.get(record_id, default)
+
+    def values(self):
+        """Return a list of all records in insertion order."""
+        with self._lock:
+            return list(self._records.values())
+
+    # Writing
+
+    def put(self, record):
+        """Insert or replace a record, keyed by its `key` field."""
+        with self._lock:
+            self._records[record[self.key]] = record
+            self._append({"op": "put", "record": record})
+
+    def delete(self, record_id):
+        """Remove a record. Returns True if it existed."""
+        with self._lock:
+            if self._records.pop(record_id, None) is None:
+                return False
+            self._append({"op": "delete", "id": record_id})
+            return True
+
+    def _append(self, entry):
+        if self._closed:
+            raise RuntimeError("Journal is closed.")
+        self._log.write(json.dumps(entry) + "\n")
+        self._log.flush()
+        self._log_records += 1
+        self._dirty = True
+        self._flush_cond.notify()
+        if self._log_records >= self.compact_threshold and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._compact_in_background, name="journal-compact", daemon=True).start()
+
+    def flush(self):
+        """Fsync every appended record now."""
+        with self._lock:
+            self._fsync_locked()
+
+    def _fsync_locked(self):
+        if self._dirty and not self._log.closed:
+            os.fsync(self._log.fileno())
+            self._dirty = False
+
+    def _flush_loop(self):
+        with self._lock:
+            while not self._closed:
+                if not self._dirty:
+                    self._flush_cond.wait()
+                    continue
+                # Give concurrent writers a short window to join this fsync
+                self._flush_cond.wait(self.fsync_interval)
+                self._fsync_locked()
+
+    # Compaction
+
+    def compact(self):
+        """Write a fresh snapshot and truncate the log."""
+        with self._compact_lock:
+            self._compact_locked()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Error compacting {self.log_path}: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def _compact_locked(self):
+        retired_path = f"{self.log_path}.compacting"
+        with self._lock:
+            if self._closed:
+                return
+            # Rotate the log so new appends carry on while the snapshot is written
+            self._fsync_locked()
+            self._log.close()
+            os.replace(self.log_path, retired_path)
+            self._log = open(self.log_path, "a", encoding="utf-8")
+            self._log_records = 0
+            records = list(self._records.values())
+
+        _write_json_atomic(self.snapshot_path, records)
+        os.remove(retired_path)
+
+    # Startup
+
+    def _replay(self):
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            snapshot = []
+        migrated = False
+        for record in snapshot:
+            # Snapshots written before records were keyed lack an id
+            if self.key not in record:
+                record[self.key] = uuid.uuid4().hex
+                migrated = True
+            self._records[record[self.key]] = record
+
+        # A rotated log is left behind if compaction was interrupted
+        retired_path = f"{self.log_path}.compacting"
+        recovered = os.path.exists(retired_path)
+        if recovered:
+            self._recover_retired_log(retired_path)
+        self._log_records = self._replay_log(self.log_path)
+        return migrated or recovered
+
+    def _recover_retired_log(self, retired_path):
+        """Put the records of an interrupted compaction's retired log back in front of the live log.
+
+        Otherwise the next rotation would replace the retired log before a
+        snapshot holds its records. Replaying twice is harmless, so a crash
+        part way through leaves both files readable.
+        """
+        # Cut off a torn tail first, so it does not end up in the middle of the merged log
+        self._replay_log(retired_path)
+        with open(retired_path, "ab") as retired:
+            try:
+                with open(self.log_path, "rb") as log:
+                    shutil.copyfileobj(log, retired)
+            except FileNotFoundError:
+                pass
+            retired.flush()
+            os.fsync(retired.fileno())
+        os.replace(retired_path, self.log_path)
+
+    def _replay_log(self, path):
+        applied = 0
+        valid_bytes = 0
+        try:
+            with open(path, "rb") as file:
+                for line in file:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("torn write")
+                        entry = json.loads(line)
+                    except ValueError:
+                        print(f"Discarding truncated record at byte {valid_bytes} of {path}")
+                        break
+                    if entry["op"] == "put":
+                        record = entry["record"]
+                        self._records[record[self.key]] = record
+                    elif entry["op"] == "delete":
+                        self._records.pop(entry["id"], None)
+                    valid_bytes += len(line)
+                    applied += 1
+        except FileNotFoundError:
+            return 0
+        # Cut off the torn tail so the next append starts on a clean line
+        if os.path.getsize(path) != valid_bytes:
+            with open(path, "r+b") as file:
+                file.truncate(valid_bytes)
+        return applied
+
+    def close(self):
+        """Fsync pending records and stop the background flusher."""
+        with self._compact_lock, self._lock:
+            if self._closed:
+                return
+            self._fsync_locked()
+            self._closed = True
+            self._log.close()
+            self._flush_cond.notify_all()
+        self._flusher.join()
+
+
+def _write_json_atomic(path, data):
+    """Write JSON to `path` via a fsynced temporary file and an atomic rename."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
@@ -1,72 +1,66 @@
-import json
 from google.cloud import pubsub_v1
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
+from credentials import get_credential_manager
+from meet_pipeline import BatchingPipeline, PermanentError, parse_json, topic_dead_letter
 
 # Constants
 PROJECT_ID = ""
 TOPIC_NAME = ""
 SUBSCRIPTION_NAME = ""
+DEAD_LETTER_TOPIC = ""
 SCOPES = ['https://www.googleapis.com/auth/pubsub']
 
-# Authenticate with Google Pub/Sub API
+# Authenticate with Google Pub/Sub API. The token is shared with the other modules through
+# the credential manager, which saves it safely and refreshes it before it expires.
 def authenticate_google_pubsub():
-    creds = None
     try:
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file('creds1.json', SCOPES)
-                creds = flow.run_local_server(port=0)
-            # Save the credentials
-            with open('token.json', 'w') as token:
-                token.write(creds.to_json())
+        return get_credential_manager().user_credentials(SCOPES, 'creds1.json', port=0)
     except Exception as e:
         print(f"Authentication error: {e}")
         return None
-    return creds
 
-# Fetch messages from Pub/Sub topic
-def subscribe_to_topic(project_id, subscription_name):
-    subscriber = pubsub_v1.SubscriberClient()
-    subscription_path = subscriber.subscription_path(project_id, subscription_name)
+# Meeting events are JSON objects; anything else can never be processed, so it is
+# dead-lettered (or dropped) straight away instead of failing the batch it arrives in.
+def parse_meeting_event(message):
+    data = parse_json(message)
+    if not isinstance(data, dict):
+        raise PermanentError(f"Expected a JSON object, got {type(data).__name__}")
+    return data
 
-    def callback(message):
-        print(f"Received message: {message}")
-        message.ack()
+# Process one meeting event. Raising makes the pipeline nack (or dead-letter) the message.
+def handle_meeting_event(data, message):
+    # Placeholder: Process meeting data (e.g., extract meeting ID, date, and other relevant info)
+    meeting_id = data.get('meetingId', None)
+    if meeting_id:
+        print(f"Meeting ID: {meeting_id}")
+        # Add logic to fetch other relevant meeting details if necessary
 
-        # Process message data (assuming JSON payload)
-        try:
-            data = json.loads(message.data)
-            print(f"Message data: {data}")
-            
-            # Placeholder: Process meeting data (e.g., extract meeting ID, date, and other relevant info)
-            meeting_id = data.get('meetingId', None)
-            if meeting_id:
-                print(f"Meeting ID: {meeting_id}")
-                # Add logic to fetch other relevant meeting details if necessary
+# Process one micro-batch: the latest event of each meeting, duplicates already removed
+def handle_meeting_events(events, messages):
+    for data, message in zip(events, messages):
+        handle_meeting_event(data, message)
 
-        except Exception as e:
-            print(f"Error processing message: {e}")
+# Fetch messages from Pub/Sub topic and process them in micro-batches on a bounded worker pool.
+# Updates to the same meeting within a batch are coalesced and redelivered messages are dropped.
+# Messages are acked only after handle_meeting_events succeeds. Messages that can never
+# succeed or keep failing are republished to DEAD_LETTER_TOPIC, or logged and dropped if unset.
+def subscribe_to_topic(project_id, subscription_name, subscriber=None, timeout=None, credentials=None,
+                       **pipeline_options):
+    subscriber = subscriber or pubsub_v1.SubscriberClient(credentials=credentials)
+    subscription_path = subscriber.subscription_path(project_id, subscription_name)
 
-    streaming_pull_future = subscriber.subscribe(subscription_path, callback=callback)
-    print(f"Listening for messages on {subscription_path}")
+    if DEAD_LETTER_TOPIC and 'dead_letter' not in pipeline_options:
+        publisher = pubsub_v1.PublisherClient(credentials=credentials)
+        pipeline_options['dead_letter'] = topic_dead_letter(publisher, publisher.topic_path(project_id, DEAD_LETTER_TOPIC))
 
-    try:
-        streaming_pull_future.result()
-    except Exception as e:
-        print(f"Stream error: {e}")
-        streaming_pull_future.cancel()
-        subscriber.close()
+    pipeline_options.setdefault('parse', parse_meeting_event)
+    pipeline = BatchingPipeline(handle_meeting_events, subscriber=subscriber, **pipeline_options)
+    return pipeline.run(subscription_path, timeout=timeout)
 
 # Main entry point to authenticate and start listening to Pub/Sub
 def authenticate_and_subscribe():
     creds = authenticate_google_pubsub()
     if creds:
-        subscribe_to_topic(PROJECT_ID, SUBSCRIPTION_NAME)
+        subscribe_to_topic(PROJECT_ID, SUBSCRIPTION_NAME, credentials=creds)
 
 if __name__ == "__main__":
     authenticate_and_subscribe()
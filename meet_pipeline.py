@@ -0,0 +1,463 @@
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import instrumentation
+
+# Flow control: how many received-but-unacked messages the subscriber may hold.
+# Messages are acked only after processing, so this bounds the work queue too.
+MAX_MESSAGES = 100
+MAX_BYTES = 10 * 1024 * 1024
+
+# Processing threads; also the most messages handled at once
+WORKERS = 8
+
+# After this many deliveries a failing message is dead-lettered (or dropped) instead of nacked
+MAX_DELIVERY_ATTEMPTS = 5
+
+# Failure counts kept per message id when Pub/Sub does not report delivery_attempt
+FAILURES_MAXSIZE = 100000
+
+# Number of recent latencies kept for the percentiles
+LATENCY_SAMPLES = 10000
+
+# Seconds between metric reports while running
+REPORT_INTERVAL = 60
+
+# Micro-batching: a batch is handed off when it holds this many messages or its
+# oldest message has waited this long, whichever comes first
+MAX_BATCH = 100
+MAX_BATCH_WAIT = 0.2
+
+# Processed message ids remembered to drop redeliveries
+SEEN_MAXSIZE = 100000
+SEEN_TTL = 3600
+
+
+class PermanentError(Exception):
+    """A message that will never process successfully, e.g. an unparseable payload."""
+
+
+def parse_json(message):
+    try:
+        return json.loads(message.data)
+    except (TypeError, ValueError) as e:
+        raise PermanentError(f"Invalid JSON payload: {e}") from e
+
+
+class PipelineMetrics:
+    """Thread-safe throughput, latency and queue depth counters for a MessagePipeline."""
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=samples)
+        self.started = time.monotonic()
+        self.received = 0
+        self.acked = 0
+        self.nacked = 0
+        self.dead_lettered = 0
+        # Given up on without a dead-letter sink: acked and logged
+        self.dropped = 0
+        # Batching only: batches handled, messages superseded within a batch, redeliveries dropped
+        self.batches = 0
+        self.coalesced = 0
+        self.duplicates = 0
+
+    def count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record_received(self):
+        with self._lock:
+            self.received += 1
+
+    def record_done(self, outcome, latency):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self._latencies.append(latency)
+        instrumentation.observe("pubsub_message", latency, outcome=outcome)
+
+    @property
+    def queue_depth(self):
+        """Messages received but not yet acked, nacked, dead-lettered or dropped."""
+        with self._lock:
+            return self.received - self.acked - self.nacked - self.dead_lettered - self.dropped
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            done = self.acked + self.nacked + self.dead_lettered + self.dropped
+            elapsed = time.monotonic() - self.started
+
+            def percentile(p):
+                if not latencies:
+                    return 0.0
+                return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+            return {
+                "received": self.received,
+                "acked": self.acked,
+                "nacked": self.nacked,
+                "dead_lettered": self.dead_lettered,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "coalesced": self.coalesced,
+                "duplicates": self.duplicates,
+                "queue_depth": self.received - done,
+                "msgs_per_s": done / elapsed if elapsed else 0.0,
+                "latency_p50_ms": percentile(50) * 1000,
+                "latency_p90_ms": percentile(90) * 1000,
+                "latency_p99_ms": percentile(99) * 1000,
+            }
+
+    def format(self):
+        s = self.snapshot()
+        line = (f"{s['msgs_per_s']:.1f} msgs/s, depth {s['queue_depth']}, "
+                f"latency p50/p90/p99 {s['latency_p50_ms']:.1f}/{s['latency_p90_ms']:.1f}/{s['latency_p99_ms']:.1f} ms, "
+                f"acked {s['acked']}, nacked {s['nacked']}, dead-lettered {s['dead_lettered']}, dropped {s['dropped']}")
+        if s['batches']:
+            line += f", {s['batches']} batches, coalesced {s['coalesced']}, duplicates {s['duplicates']}"
+        return line
+
+
+def topic_dead_letter(publisher, topic_path):
+    """Return a dead-letter function that republishes failed messages to `topic_path`.
+
+    The original attributes are kept and the error is added as `error`.
+    """
+    def dead_letter(message, error):
+        attributes = dict(message.attributes or {})
+        attributes["error"] = str(error)[:1024]
+        attributes["original_message_id"] = message.message_id
+        publisher.publish(topic_path, message.data, **attributes).result()
+    return dead_letter
+
+
+class MessagePipeline:
+    """Parse and handle Pub/Sub messages on a bounded worker pool, acking only on success.
+
+    The subscriber streams messages under `FlowControl(max_messages, max_bytes)`;
+    each one is parsed with `parse(message)` and passed to `handler(data, message)`
+    on one of `workers` threads. A message is acked once the handler returns. If
+    parsing or handling fails it is nacked for redelivery, unless the error is a
+    PermanentError or the message has been delivered `max_attempts` times. Such
+    a message goes to `dead_letter(message, error)` and is acked; without a
+    dead-letter sink it is acked and logged as dropped, since redelivering it
+    would only fail again.
+
+    `delivery_attempt` is only set when the subscription has a dead-letter
+    policy; otherwise failures are counted per message id here.
+
+    `subscriber` is anything with a `subscribe(path, callback, flow_control=...)`
+    returning a streaming pull future, so the local Pub/Sub emulator
+    (PUBSUB_EMULATOR_HOST) or an in-process fake can stand in for the real client.
+    """
+
+    def __init__(self, handler, subscriber=None, parse=parse_json, workers=WORKERS, max_messages=MAX_MESSAGES,
+                 max_bytes=MAX_BYTES, dead_letter=None, max_attempts=MAX_DELIVERY_ATTEMPTS):
+        self.handler = handler
+        self.parse = parse
+        self.workers = workers
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.dead_letter = dead_letter
+        self.max_attempts = max_attempts
+        self.metrics = PipelineMetrics()
+        self._subscriber = subscriber
+        self._executor = None
+        self._future = None
+        self._failures = OrderedDict()
+        self._failures_lock = threading.Lock()
+
+    @property
+    def subscriber(self):
+        if self._subscriber is None:
+            from google.cloud import pubsub_v1
+            self._subscriber = pubsub_v1.SubscriberClient()
+        return self._subscriber
+
+    def flow_control(self):
+        from google.cloud import pubsub_v1
+        return pubsub_v1.types.FlowControl(max_messages=self.max_messages, max_bytes=self.max_bytes)
+
+    def _callback(self, message):
+        # Runs on the subscriber's thread; hand the message to the worker pool right away
+        self.metrics.record_received()
+        self._executor.submit(self._process, message, time.monotonic())
+
+    def _process(self, message, received):
+        try:
+            data = self.parse(message)
+            with instrumentation.span("pubsub_handler"):
+                self.handler(data, message)
+        except Exception as e:
+            self._fail(message, e, received)
+        else:
+            message.ack()
+            self.metrics.record_done("acked", time.monotonic() - received)
+
+    def _delivery_attempt(self, message):
+        attempt = getattr(message, "delivery_attempt", None)
+        if attempt:
+            return attempt
+        with self._failures_lock:
+            attempt = self._failures.pop(message.message_id, 0) + 1
+            self._failures[message.message_id] = attempt
+            while len(self._failures) > FAILURES_MAXSIZE:
+                self._failures.popitem(last=False)
+        return attempt
+
+    def _fail(self, message, error, received):
+        attempts = self._delivery_attempt(message)
+        if isinstance(error, PermanentError) or attempts >= self.max_attempts:
+            with self._failures_lock:
+                self._failures.pop(message.message_id, None)
+            if not self.dead_letter:
+                message.ack()
+                self.metrics.record_done("dropped", time.monotonic() - received)
+                print(f"Dropped message {message.message_id} after {attempts} attempt(s), "
+                      f"no dead-letter topic is set: {error}")
+                return
+            try:
+                self.dead_letter(message, error)
+            except Exception as e:
+                print(f"Error dead-lettering message {message.message_id}: {e}")
+            else:
+                message.ack()
+                self.metrics.record_done("dead_lettered", time.monotonic() - received)
+                print(f"Dead-lettered message {message.message_id}: {error}")
+                return
+        message.nack()
+        self.metrics.record_done("nacked", time.monotonic() - received)
+        print(f"Error processing message {message.message_id} (attempt {attempts}): {error}")
+
+    def start(self, subscription_path):
+        """Open the streaming pull and return its future."""
+        self.metrics = PipelineMetrics()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pubsub-worker")
+        self._future = self.subscriber.subscribe(subscription_path, callback=self._callback,
+                                                 flow_control=self.flow_control())
+        return self._future
+
+    def _cancel_stream(self):
+        if self._future is not None:
+            self._future.cancel()
+            try:
+                self._future.result(timeout=10)
+            except Exception:
+                pass
+
+    def stop(self, wait=True):
+        """Cancel the stream and let the workers finish the messages they already hold."""
+        self._cancel_stream()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def run(self, subscription_path, timeout=None, report_interval=REPORT_INTERVAL):
+        """Process messages until the stream fails or `timeout` seconds pass, printing metrics periodically."""
+        future = self.start(subscription_path)
+        print(f"Listening for messages on {subscription_path}")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                wait = report_interval if deadline is None else min(report_interval, deadline - time.monotonic())
+                try:
+                    future.result(timeout=max(0, wait))
+                    break
+                except FutureTimeoutError:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                    print(self.metrics.format())
+        except Exception as e:
+            print(f"Stream error: {e}")
+        finally:
+            self.stop()
+            print(self.metrics.format())
+        return self.metrics.snapshot()
+
+
+class SeenSet:
+    """Thread-safe set of recently seen ids, bounded by size (LRU) and age (TTL)."""
+
+    def __init__(self, maxsize=SEEN_MAXSIZE, ttl=SEEN_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._expiry = OrderedDict()
+
+    def __contains__(self, key):
+        with self._lock:
+            expiry = self._expiry.get(key)
+            if expiry is None:
+                return False
+            if expiry < time.monotonic():
+                del self._expiry[key]
+                return False
+            return True
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def add(self, *keys):
+        with self._lock:
+            expiry = time.monotonic() + self.ttl
+            for key in keys:
+                self._expiry.pop(key, None)
+                self._expiry[key] = expiry
+            while len(self._expiry) > self.maxsize:
+                self._expiry.popitem(last=False)
+
+
+def meeting_key(data):
+    return data.get('meetingId') if isinstance(data, dict) else None
+
+
+class BatchingPipeline(MessagePipeline):
+    """MessagePipeline that hands coalesced, de-duplicated batches to `handler(events, messages)`.
+
+    Parsed messages are collected for up to `max_wait` seconds or `max_batch`
+    messages. Within a batch only the latest message per `key(data)` (e.g. per
+    meetingId, by publish time) is passed on; the ones it supersedes are acked
+    with it. Redeliveries of message ids that were already processed are
+    dropped via a SeenSet. If the handler raises, the batch's events are handed
+    to it again one at a time, and only the messages whose event still fails
+    are nacked or dead-lettered as in MessagePipeline.
+
+    Flow control must allow at least `max_batch` outstanding messages for batches
+    to fill; smaller batches are still flushed after `max_wait`.
+    """
+
+    def __init__(self, handler, key=meeting_key, max_batch=MAX_BATCH, max_wait=MAX_BATCH_WAIT, seen=None, **options):
+        super().__init__(handler, **options)
+        self.key = key
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.seen = seen if seen is not None else SeenSet()
+        self._condition = threading.Condition()
+        self._pending = OrderedDict()
+        # Messages replaced by a newer one for the same key, settled together with it
+        self._superseded = {}
+        self._size = 0
+        self._oldest = None
+        self._stopping = False
+        self._flusher = None
+
+    def _process(self, message, received):
+        if message.message_id in self.seen:
+            message.ack()
+            self.metrics.count("duplicates")
+            self.metrics.record_done("acked", time.monotonic() - received)
+            return
+        try:
+            data = self.parse(message)
+        except Exception as e:
+            self._fail(message, e, received)
+            return
+        key = self.key(data)
+        if key is None:
+            key = ("message", message.message_id)
+        with self._condition:
+            current = self._pending.get(key)
+            if current is not None and self._is_older(message, current[1]):
+                self._superseded.setdefault(key, []).append((message, received))
+            else:
+                if current is not None:
+                    self._superseded.setdefault(key, []).append(current[1:])
+                self._pending[key] = (data, message, received)
+            if self._oldest is None:
+                # First message of a batch: wake the flusher to start the max_wait clock
+                self._oldest = received
+                self._condition.notify()
+            self._size += 1
+            if self._size >= self.max_batch:
+                self._condition.notify()
+
+    @staticmethod
+    def _is_older(message, other):
+        published = getattr(message, "publish_time", None)
+        other_published = getattr(other, "publish_time", None)
+        return published is not None and other_published is not None and published < other_published
+
+    def _take_batch(self):
+        batch = [(key, data, message, received) for key, (data, message, received) in self._pending.items()]
+        superseded = self._superseded
+        self._pending, self._superseded = OrderedDict(), {}
+        self._size, self._oldest = 0, None
+        return batch, superseded
+
+    def _flush_loop(self):
+        while True:
+            with self._condition:
+                while not self._stopping and (
+                        self._oldest is None or
+                        (self._size < self.max_batch and time.monotonic() - self._oldest < self.max_wait)):
+                    timeout = None if self._oldest is None else self.max_wait - (time.monotonic() - self._oldest)
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+                batch, superseded = self._take_batch()
+            self._executor.submit(self._handle_batch, batch, superseded)
+
+    def _handle_batch(self, batch, superseded):
+        try:
+            with instrumentation.span("pubsub_batch"):
+                self.handler([data for _, data, _, _ in batch], [message for _, _, message, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                self._settle(batch, superseded, e)
+                return
+            # One bad event must not fail the whole batch; handle the events one at a time
+            # so only the ones that fail again are nacked or dead-lettered
+            print(f"Batch of {len(batch)} messages failed, retrying them one by one: {e}")
+            for item in batch:
+                _, data, message, _ = item
+                try:
+                    with instrumentation.span("pubsub_handler"):
+                        self.handler([data], [message])
+                except Exception as item_error:
+                    self._settle([item], superseded, item_error)
+                else:
+                    self._settle([item], superseded)
+        else:
+            self._settle(batch, superseded)
+        self.metrics.count("batches")
+
+    def _settle(self, batch, superseded, error=None):
+        """Ack the messages of `batch` and those they superseded, or fail them all with `error`."""
+        settled = [(message, received) for _, _, message, received in batch]
+        coalesced = [entry for key, _, _, _ in batch for entry in superseded.get(key, ())]
+        if error is not None:
+            for message, received in settled + coalesced:
+                self._fail(message, error, received)
+            return
+        now = time.monotonic()
+        for message, received in settled + coalesced:
+            message.ack()
+            self.metrics.record_done("acked", now - received)
+        self.seen.add(*(message.message_id for message, _ in settled + coalesced))
+        self.metrics.count("coalesced", len(coalesced))
+
+    def start(self, subscription_path):
+        self._stopping = False
+        future = super().start(subscription_path)
+        self._flusher = threading.Thread(target=self._flush_loop, name="pubsub-batcher", daemon=True)
+        self._flusher.start()
+        return future
+
+    def stop(self, wait=True):
+        """Cancel the stream, wait for the workers and handle the last partial batch."""
+        self._cancel_stream()
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+        if self._executor is not None:
+            # In-flight messages still join the batch, so always wait for them here
+            self._executor.shutdown(wait=True)
+        with self._condition:
+            batch, superseded = self._take_batch()
+        if batch:
+            self._handle_batch(batch, superseded)
@@ -1,106 +1,182 @@
 import os
-from dotenv import load_dotenv
-import speech_recognition as sr
-import pyttsx3
 import time
-import re
-import json
+import speech_recognition as sr
+import asyncio
+import uuid
 import webbrowser
 import requests
 from datetime import datetime, timedelta
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+from scheduler import ReminderScheduler
+from journal import Journal
+from dispatcher import CommandDispatcher, SpeechQueue
+from api_client import ApiClient, TTLCache
+from intent_router import IntentRouter
+from spoken_numbers import TIME_VOCABULARY, normalize_spoken_times
+from startup import Startup
+from calendar_outbox import CalendarOutbox
+from credentials import get_credential_manager
+from speech_io import MicrophoneSource, StreamingListener, WavFileSource
+from speech_backends import create_backend
+import instrumentation
+
+# Default API endpoints; set WEATHER_API_URL, CUSTOM_SEARCH_API_URL or NEWS_API_URL
+# to point the assistant at a local stub server
+DEFAULT_WEATHER_API_URL = 'http://api.openweathermap.org/data/2.5/weather'
+DEFAULT_CUSTOM_SEARCH_API_URL = 'https://www.googleapis.com/customsearch/v1'
+DEFAULT_NEWS_API_URL = 'https://newsapi.org/v2/top-headlines'
+
+# Per-endpoint response caches
+weather_cache = TTLCache(ttl=10 * 60, maxsize=128)
+news_cache = TTLCache(ttl=5 * 60, maxsize=8)
+search_cache = TTLCache(ttl=60 * 60, maxsize=256)
+
+# Reminder snapshot; mutations are appended to reminders.json.log
+REMINDER_FILE = "reminders.json"
+
+# Google Calendar API scope
+SCOPES = ['https://www.googleapis.com/auth/calendar']
 
-load_dotenv()
+voice_gender = 'male'  # Default voice gender
 
-WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
-CUSTOM_SEARCH_API_KEY = os.getenv('CUSTOM_SEARCH_API_KEY')
-SEARCH_ENGINE_ID = os.getenv('SEARCH_ENGINE_ID')
-NEWS_API_KEY = os.getenv('NEWS_API_KEY') 
+# Expensive resources are built on first use (or warmed in the background by
+# __main__) so that importing this module has no side effects
+startup = Startup()
 
-# Initialize recognizer and TTS engine
 recognizer = sr.Recognizer()
-engine = pyttsx3.init()
 
-# Initialize reminders list
-REMINDER_FILE = "reminders.json"
+def load_env():
+    """Load API keys and endpoint overrides from the .env file."""
+    from dotenv import load_dotenv
+    return load_dotenv()
 
-# Google Calendar API scope
-SCOPES = ['https://www.googleapis.com/auth/calendar']
+env = startup.resource("env", load_env)
 
-voice_gender = 'male'  # Default voice gender
-available_voices = engine.getProperty('voices')
+def setting(name, default=None):
+    """Return a configuration value from the environment or the .env file."""
+    env.get()
+    return os.getenv(name, default)
+
+def init_tts_engine():
+    """Initialize the TTS engine. Must run on the speech queue's thread."""
+    import pyttsx3
+    engine = pyttsx3.init()
+    # Called on the speech thread before every word, so barge-in takes effect within a word
+    engine.connect('started-word', lambda name, location, length: stop_if_interrupted(engine))
+    return engine
+
+def stop_if_interrupted(engine):
+    """Cut the current sentence short after a barge-in. Runs on the speech thread."""
+    if speech_queue.get().interrupted:
+        engine.stop()
+
+tts_engine = startup.resource("tts_engine", init_tts_engine)
+
+# Shared keep-alive session for the weather, search and news APIs
+api_client = startup.resource("api_client", ApiClient)
 
 def set_voice(gender):
     """Set the TTS engine voice based on gender."""
     global voice_gender
     voice_gender = gender.lower()
-    for voice in available_voices:
-        if (voice_gender == 'male' and 'male' in voice.name.lower()) or \
-           (voice_gender == 'female' and 'female' in voice.name.lower()):
+    # Voices are enumerated on the speech thread, which owns the engine
+    speech_queue.get().run(apply_voice, voice_gender)
+
+def apply_voice(gender):
+    """Switch the engine to the first voice matching `gender`."""
+    engine = tts_engine.get()
+    for voice in engine.getProperty('voices'):
+        if (gender == 'male' and 'male' in voice.name.lower()) or \
+           (gender == 'female' and 'female' in voice.name.lower()):
             engine.setProperty('voice', voice.id)
-            speak(f"Voice set to {voice.name}.")
+            say_and_wait(f"Voice set to {voice.name}.")
             return
-    speak("Sorry, the selected voice is not available. Default voice will be used.")
+    say_and_wait("Sorry, the selected voice is not available. Default voice will be used.")
     
 # Authenticate and build the Google Calendar service
 def authenticate_google_calendar():
     """Authenticate the user and return the Google Calendar service."""
-    creds = None
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+    from googleapiclient.discovery import build
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            # Log the refreshed access and refresh tokens
-            print("Refreshed Credentials:")
-            print(f"Access Token: {creds.token}")
-            print(f"Refresh Token: {creds.refresh_token}")
+    # Tokens are cached, saved and refreshed ahead of expiry by the shared credential manager;
+    # the consent flow asks for offline access so a refresh token is issued
+    creds = get_credential_manager().user_credentials(SCOPES, 'credentials.json', port=52760,
+                                                      access_type='offline', prompt='consent')
 
-            # Save the refreshed credentials back to token.json
-            with open('token.json', 'w') as token:
-                token.write(creds.to_json())
-        else:
-            # Create the flow with access_type='offline' to get a refresh token
-            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-            flow.run_local_server(port=52760, access_type='offline', prompt='consent')  # Request offline access
-            creds = flow.credentials  # Get the credentials from the flow
+    # Use the discovery document bundled with the client library instead of
+    # fetching it over the network on every start
+    return build('calendar', 'v3', credentials=creds, static_discovery=True, cache_discovery=False)
 
-            # Log the initial access and refresh tokens
-            print("Initial Credentials:")
-            print(f"Access Token: {creds.token}")
-            print(f"Refresh Token: {creds.refresh_token}")
 
-            # Save the credentials for the next run
-            with open('token.json', 'w') as token:
-                token.write(creds.to_json())
-
-    return build('calendar', 'v3', credentials=creds)
+calendar_service = startup.resource("calendar_service", authenticate_google_calendar)
 
+@instrumentation.timed("speak")
+def say_and_wait(text):
+    """Convert text to speech, blocking until it has been spoken."""
+    engine = tts_engine.get()
+    engine.say(text)
+    engine.runAndWait()
 
-calendar_service = authenticate_google_calendar()
+# The TTS engine is not thread-safe, so every engine call runs on this queue's thread
+speech_queue = startup.resource("speech_queue", lambda: SpeechQueue(say_and_wait))
 
 def speak(text):
-    """Convert text to speech."""
-    engine.say(text)
-    engine.runAndWait()
+    """Queue text to be spoken in order without waiting for it."""
+    speech_queue.get().say(text)
+
+def barge_in():
+    """Stop talking as soon as the user starts speaking over the assistant."""
+    if speech_queue.built and speech_queue.get().speaking:
+        speech_queue.get().interrupt()
+
+def load_speech_backend():
+    """Build the recognition backend named by SPEECH_BACKEND (google, vosk or vosk+google).
+
+    Local backends load VOSK_MODEL_PATH once; with VOSK_GRAMMAR=1 decoding is
+    limited to the words the intents and their slots listen for. Commands with
+    free text (a reminder, a search query) are decoded again without it.
+    """
+    kind = setting("SPEECH_BACKEND", "google")
+    grammar = intent_router.vocabulary() if setting("VOSK_GRAMMAR") == "1" else None
+    return create_backend(kind, model_path=setting("VOSK_MODEL_PATH"), grammar=grammar, recognizer=recognizer)
+
+speech_backend = startup.resource("speech_backend", load_speech_backend)
+
+def open_speech_listener():
+    """Open the audio input once and start capturing and recognizing in the background.
+
+    Set SPEECH_INPUT_WAV to a comma-separated list of WAV files to use them
+    instead of the microphone.
+    """
+    wav_files = setting("SPEECH_INPUT_WAV")
+    if wav_files:
+        source = WavFileSource(wav_files.split(","), realtime=True)
+    else:
+        source = MicrophoneSource()
+    return StreamingListener(source, speech_backend.get(), on_speech_start=barge_in,
+                             is_speaking=lambda: speech_queue.built and speech_queue.get().speaking).start()
+
+speech_listener = startup.resource("speech_listener", open_speech_listener)
 
 def listen():
-    """Capture voice input and return the recognized text."""
-    with sr.Microphone() as source:
-        print("Listening...")
-        audio = recognizer.listen(source)
-        try:
-            command = recognizer.recognize_google(audio)
-            print(f"You said: {command}")
-            return command.lower()
-        except sr.UnknownValueError:
-            speak("Sorry, I didn't catch that.")
-        except sr.RequestError:
-            speak("Sorry, my speech service is down.")
+    """Return the next recognized utterance, or None once the audio input has ended."""
+    print("Listening...")
+    utterance = speech_listener.get().next_utterance()
+    if utterance is None:
+        return None
+    # End of speech to recognized text, and outcome per backend
+    backend = utterance.backend or "default"
+    instrumentation.observe("listen", utterance.recognized_at - utterance.ended_at, backend=backend)
+    instrumentation.count("utterances", backend=backend,
+                          outcome=type(utterance.error).__name__ if utterance.error else "ok")
+    if isinstance(utterance.error, sr.UnknownValueError):
+        speak("Sorry, I didn't catch that.")
+    elif isinstance(utterance.error, sr.RequestError):
+        speak("Sorry, my speech service is down.")
+    elif utterance.error is not None:
+        print(f"Recognition error: {utterance.error}")
+    else:
+        print(f"You said: {utterance.text} ({utterance.backend}, confidence {utterance.confidence or 0:.2f})")
+        return utterance.text.lower()
     return ""
 
 def parse_time(time_str):
@@ -115,45 +191,58 @@ def parse_time(time_str):
             return None
     return parsed_time.strftime("%H:%M")
 
-def load_reminders():
-    """Load reminders from a JSON file."""
-    try:
-        with open(REMINDER_FILE, "r") as file:
-            return json.load(file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def save_reminders():
-    """Save reminders to a JSON file."""
-    with open(REMINDER_FILE, "w") as file:
-        json.dump(reminders, file)
-
-reminders = load_reminders()
+def next_occurrence(time_24_hour, now=None):
+    """Return the next datetime at which the given "HH:MM" time occurs."""
+    now = now or datetime.now()
+    hour, minute = map(int, time_24_hour.split(":"))
+    due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if due < now.replace(second=0, microsecond=0):
+        due += timedelta(days=1)
+    return due
 
-def add_google_calendar_event(reminder_text, reminder_time):
-    """Add an event to Google Calendar for the authenticated user."""
-    event_time = datetime.strptime(reminder_time, "%H:%M")
-    event_start = datetime.now().replace(hour=event_time.hour, minute=event_time.minute, second=0, microsecond=0)
-    event_end = event_start + timedelta(minutes=30)
+def load_reminders():
+    """Open the reminder journal, replaying its snapshot and log."""
+    store = Journal(REMINDER_FILE)
+    # Older files only stored "text" and "time"; give them a due date
+    for reminder in store.values():
+        if "due" not in reminder:
+            reminder["due"] = next_occurrence(reminder["time"]).isoformat()
+            store.put(reminder)
+    return store
+
+reminders = startup.resource("reminders", load_reminders)
+
+def open_calendar_outbox():
+    """Open the durable Calendar outbox and start its background sync."""
+    outbox = CalendarOutbox(calendar_service.get, on_inserted=lambda event: print(f"Event created: {event.get('htmlLink')}"))
+    outbox.start()
+    return outbox
+
+# Events are queued locally and inserted in batches by the outbox worker
+calendar_outbox = startup.resource("calendar_outbox", open_calendar_outbox)
+
+def add_google_calendar_event(reminder_text, due):
+    """Add an event at the reminder's `due` datetime to Google Calendar for the authenticated user."""
+    event_end = due + timedelta(minutes=30)
 
     event = {
         'summary': reminder_text,
-        'start': {'dateTime': event_start.isoformat(), 'timeZone': 'America/Los_Angeles'},
+        'start': {'dateTime': due.isoformat(), 'timeZone': 'America/Los_Angeles'},
         'end': {'dateTime': event_end.isoformat(), 'timeZone': 'America/Los_Angeles'},
     }
 
-    event = calendar_service.events().insert(calendarId='primary', body=event).execute()
-    print(f"Event created: {event.get('htmlLink')}")
-    speak(f"Google Calendar event created for {reminder_text} at {reminder_time}")
+    calendar_outbox.get().enqueue(event)
+    speak(f"Adding {reminder_text} at {due:%H:%M} to Google Calendar")
 
-def add_reminder(reminder_text, reminder_time):
+async def add_reminder(reminder_text, reminder_time):
     """Schedule a reminder and add it to persistent storage and Google Calendar."""
     reminder_24_hour = parse_time(reminder_time)
     if reminder_24_hour:
-        reminder = {"text": reminder_text, "time": reminder_24_hour}
-        reminders.append(reminder)
-        save_reminders()
-        add_google_calendar_event(reminder_text, reminder_24_hour)
+        due = next_occurrence(reminder_24_hour)
+        reminder = {"id": uuid.uuid4().hex, "text": reminder_text, "time": reminder_24_hour, "due": due.isoformat()}
+        reminders.get().put(reminder)
+        reminder_scheduler.schedule(reminder["id"], due, reminder)
+        add_google_calendar_event(reminder_text, due)
         speak(f"Reminder set for {reminder_24_hour} to {reminder_text}")
 
 def trigger_reminder(reminder_text):
@@ -161,15 +250,22 @@ def trigger_reminder(reminder_text):
     speak(f"Reminder: {reminder_text}")
     print(f"Reminder: {reminder_text}")
 
-def check_reminders():
-    """Check the system time to trigger reminders."""
-    current_time = datetime.now().strftime("%H:%M")
-    for reminder in reminders:
-        if reminder["time"] == current_time:
-            trigger_reminder(reminder["text"])
-            reminders.remove(reminder)
-            save_reminders()
-    time.sleep(60)
+@instrumentation.timed("fire_reminder")
+def fire_reminder(reminder):
+    """Trigger a due reminder and drop it from persistent storage."""
+    trigger_reminder(reminder["text"])
+    reminders.get().delete(reminder["id"])
+
+reminder_scheduler = ReminderScheduler(fire_reminder)
+
+def start_reminder_scheduler():
+    """Schedule the stored reminders and start the background scheduler."""
+    for reminder in reminders.get().values():
+        reminder_scheduler.schedule(reminder["id"], datetime.fromisoformat(reminder["due"]), reminder)
+    reminder_scheduler.start()
+    return reminder_scheduler
+
+scheduler_started = startup.resource("reminder_scheduler", start_reminder_scheduler)
 
 def play_music(song_name):
     """Play music on YouTube by searching for the song name."""
@@ -177,13 +273,13 @@ def play_music(song_name):
     webbrowser.open(search_url)
     speak(f"Playing {song_name} on YouTube.")
 
-def get_weather(city_name):
+async def get_weather(city_name):
     """Fetch weather data for a given city using OpenWeatherMap API."""
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={city_name}&appid={WEATHER_API_KEY}&units=metric"
+    params = {'q': city_name, 'appid': setting('WEATHER_API_KEY'), 'units': 'metric'}
+    url = setting('WEATHER_API_URL', DEFAULT_WEATHER_API_URL)
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        weather_data = response.json()
+        weather_data = await asyncio.to_thread(
+            api_client.get().get_json, url, params, weather_cache, city_name.strip().lower())
         main_weather = weather_data['weather'][0]['description']
         temp = weather_data['main']['temp']
         city = weather_data['name']
@@ -194,13 +290,18 @@ def get_weather(city_name):
         print("Error fetching weather data:", e)
         speak("Sorry, I couldn't fetch the weather data right now.")
 
-def google_custom_search(search_query):
-    url = f"https://www.googleapis.com/customsearch/v1?q={search_query}&key={CUSTOM_SEARCH_API_KEY}&cx={SEARCH_ENGINE_ID}"
-    response = requests.get(url)
-    results = response.json()
-    
-    # Print the full response for debugging
-    print(json.dumps(results, indent=4))
+async def google_custom_search(search_query):
+    """Search the web with Google Custom Search and speak the result snippets."""
+    normalized_query = " ".join(search_query.lower().split())
+    params = {'q': normalized_query, 'key': setting('CUSTOM_SEARCH_API_KEY'), 'cx': setting('SEARCH_ENGINE_ID')}
+    url = setting('CUSTOM_SEARCH_API_URL', DEFAULT_CUSTOM_SEARCH_API_URL)
+    try:
+        results = await asyncio.to_thread(
+            api_client.get().get_json, url, params, search_cache, normalized_query)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print("Error fetching search results:", e)
+        speak("Sorry, I couldn't search for that right now.")
+        return
 
     # Check if 'items' key exists in the response
     if 'items' in results and results['items']:
@@ -213,71 +314,120 @@ def google_custom_search(search_query):
         print(no_results_message)
         speak(no_results_message)  # Speak the no results message
 
-def fetch_news():
+async def fetch_news():
     """Fetch top headlines from News API and speak them."""
-    url = f"https://newsapi.org/v2/top-headlines?country=us&apiKey={NEWS_API_KEY}"
-    response = requests.get(url)
-    
-    # Print the full response for debugging
-    print(json.dumps(response.json(), indent=4))
-    
-    if response.status_code == 200:
-        news_data = response.json()
-        if news_data['articles']:
-            headlines = [article['title'] for article in news_data['articles']]
-            for headline in headlines:
-                print(f"Headline: {headline}")
-                speak(headline)
-        else:
-            speak("No news articles available at this time.")
-    else:
+    params = {'country': 'us', 'apiKey': setting('NEWS_API_KEY')}
+    url = setting('NEWS_API_URL', DEFAULT_NEWS_API_URL)
+    try:
+        news_data = await asyncio.to_thread(api_client.get().get_json, url, params, news_cache)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print("Error fetching news:", e)
         speak("Failed to fetch news. Please try again later.")
+        return
 
-def read_news():
+    if news_data['articles']:
+        headlines = [article['title'] for article in news_data['articles']]
+        for headline in headlines:
+            print(f"Headline: {headline}")
+            speak(headline)
+    else:
+        speak("No news articles available at this time.")
+
+async def read_news():
     """Read the latest news headlines."""
     speak("Fetching the latest news for you.")
-    fetch_news()
+    await fetch_news()
                 
-def process_command(command):
-    """Process the voice command and trigger appropriate actions."""
-    match = re.search(r"(?:set|schedule|remind me to|create a reminder for|add a reminder to) (.+?) at (\d{1,2}:\d{2}(?:\s?[ap]m)?)", command)
-
-    if match:
-        reminder_text = match.group(1)
-        reminder_time = match.group(2)
-        add_reminder(reminder_text, reminder_time)
-    elif "set voice" in command:
-        if "male" in command:
-            set_voice('male')
-        elif "female" in command:
-            set_voice('female')
-        else:
-            speak("Please specify if you want a male or female voice.")
-    elif "weather" in command:
-        # Extract city name from command if possible; otherwise, use a default city
-        city_match = re.search(r"weather in (\w+)", command)
-        city_name = city_match.group(1) if city_match else "your location"  # Default city if none specified
-        get_weather(city_name)
-    elif "search" in command or "find" in command:
-        search_query = command.replace("search", "").replace("find", "").strip()
-        if search_query:
-            google_custom_search(search_query)
-        else:
-            speak("Please specify what you would like to search for.")
-    elif "play" in command and "music" in command:
-        song_name = command.replace("play music", "").strip()
-        play_music(song_name)
-    elif "news" in command:
-        read_news()
+# Intent registry; each handler declares its keywords and the slots it needs
+intent_router = IntentRouter()
+
+@intent_router.intent(
+    "reminder",
+    keywords={"set": 1, "schedule": 2, "remind me to": 4, "create a reminder for": 4, "add a reminder to": 4},
+    slots=r"(?:set|schedule|remind me to|create a reminder for|add a reminder to) (?P<text>.+?) at (?P<time>\d{1,2}:\d{2}(?:\s?[ap]m)?)",
+    slots_required=True,
+    priority=2,
+    vocabulary=TIME_VOCABULARY,
+)
+async def handle_reminder(text, time):
+    await add_reminder(text, time)
+
+@intent_router.intent("voice", keywords={"set voice": 3}, slots=r"\b(?P<gender>female|male)\b",
+                      vocabulary=("female", "male"))
+def handle_voice(gender=None):
+    if gender:
+        set_voice(gender)
     else:
+        speak("Please specify if you want a male or female voice.")
+
+@intent_router.intent("weather", keywords={"weather": 3}, slots=r"weather in (?P<city>\w+)")
+async def handle_weather(city="your location"):
+    await get_weather(city)
+
+@intent_router.intent(
+    "search",
+    keywords={"search": 2, "find": 1, "look up": 2},
+    slots=r"(?:search(?: for)?|find|look up)\s+(?P<query>.+)",
+    priority=1,
+)
+async def handle_search(query=None):
+    if query and query.strip():
+        await google_custom_search(query.strip())
+    else:
+        speak("Please specify what you would like to search for.")
+
+@intent_router.intent("music", keywords={"play music": 3, "play": 1, "music": 1}, slots=r"play music\s*(?P<song>.*)", min_score=2)
+def handle_music(song=""):
+    play_music(song.strip())
+
+@intent_router.intent("news", keywords={"news": 2, "headlines": 2})
+async def handle_news():
+    await read_news()
+
+async def process_command(command):
+    """Process the voice command and trigger appropriate actions."""
+    start = time.perf_counter()
+    # Local recognizers spell times out ("seven thirty p m"); the slots expect "7:30 pm"
+    match = await intent_router.dispatch(normalize_spoken_times(command))
+    if match is None:
         speak("Please specify the reminder and time, or ask me to play music on YouTube.")
+    instrumentation.observe("process_command", time.perf_counter() - start,
+                            intent=match.intent if match else "none")
 
 if __name__ == "__main__":
-    speak("Hello, I am your assistant. How can I help you today?")
-    while True:
-        command = listen()
-        if "exit" in command or "stop" in command:
-            speak("Goodbye!")
-            break
-        process_command(command)
-        check_reminders()
+    # JARVIS_PROFILE=<file> profiles the session with cProfile; it covers the threads
+    # started from here on (warm-up, dispatcher, speech, scheduler, outbox)
+    with instrumentation.profile_from_env():
+        # Build everything slow in parallel while the greeting is spoken
+        startup.warm("env", "speech_backend", "speech_listener", "reminders", "reminder_scheduler", "api_client", "calendar_outbox",
+                     "calendar_service", on_complete=lambda: print(startup.report()))
+        # The engine must be created on the speech thread, so warm it there
+        speech_queue.get().run(tts_engine.get)
+        command_dispatcher = CommandDispatcher(process_command)
+        command_dispatcher.start()
+        speak("Hello, I am your assistant. How can I help you today?")
+        startup.mark("listening")
+        while True:
+            command = listen()
+            if command is None or "exit" in command or "stop" in command:
+                speak("Goodbye!")
+                break
+            # Hand the command off and go straight back to listening
+            command_dispatcher.submit(command)
+        command_dispatcher.stop()
+        if speech_listener.built:
+            speech_listener.get().stop()
+        reminder_scheduler.stop()
+        speech_queue.get().stop()
+        if calendar_outbox.built:
+            # Give queued events a moment to sync; the rest are sent on the next run
+            calendar_outbox.get().flush(timeout=5)
+            calendar_outbox.get().stop()
+        if reminders.built:
+            reminders.get().close()
+        if api_client.built:
+            api_client.get().close()
+    metrics_file = setting("JARVIS_METRICS")
+    if metrics_file:
+        # Timings of this session as JSON (.json) or Prometheus text
+        instrumentation.write_metrics(metrics_file)
@@ -0,0 +1,184 @@
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import data
+from build_cache import ArtifactCache
+
+# Google Sheets allows 60 read requests per minute per user; stay just under it
+SHEETS_REQUESTS_PER_MINUTE = 57
+SHEETS_QUOTA_PERIOD = 60.0
+
+# One report to build: which worksheet to read and where its output goes
+ReportJob = namedtuple("ReportJob", "sheet_id worksheet output_prefix")
+
+
+class RateLimiter:
+    """Thread-safe sliding-window limiter: at most `limit` requests in any `period` seconds.
+
+    Unlike a token bucket that starts full, no window can ever see more than
+    `limit` requests, including the first minute of a run and the minute
+    after an idle spell, which is how the Sheets per-minute quota is counted.
+    """
+
+    def __init__(self, limit=SHEETS_REQUESTS_PER_MINUTE, period=SHEETS_QUOTA_PERIOD):
+        self.limit = limit
+        self.period = period
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be made."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._sent and self._sent[0] <= now - self.period:
+                    self._sent.popleft()
+                if len(self._sent) < self.limit:
+                    self._sent.append(now)
+                    return
+                wait = self._sent[0] + self.period - now
+            time.sleep(wait)
+
+
+class ThrottledClient:
+    """Wrap a gspread client so every API call first takes a token from a shared limiter.
+
+    Spreadsheets and worksheets returned by the client are wrapped too, since
+    their reads are API calls as well.
+    """
+
+    WRAPS_RESULT = {"open", "open_by_key", "open_by_url", "worksheet", "get_worksheet"}
+
+    def __init__(self, target, limiter):
+        self._target = target
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self._limiter.acquire()
+            result = attr(*args, **kwargs)
+            if name in self.WRAPS_RESULT:
+                return ThrottledClient(result, self._limiter)
+            return result
+        return call
+
+
+def load_manifest(path):
+    """Read report jobs from a JSON list of objects or a CSV with a header row.
+
+    Each job needs `sheet_id`, `worksheet` and `output_prefix`.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        if path.endswith('.csv'):
+            entries = list(csv.DictReader(file))
+        else:
+            entries = json.load(file)
+    return [ReportJob(entry['sheet_id'], entry['worksheet'], entry['output_prefix']) for entry in entries]
+
+
+def build_job(job_data, output_dir, state_key=None):
+    """Analysis and rendering stage of one job; runs in a worker process.
+
+    With the worksheet's `state_key` the saved aggregates are reused and only
+    rows synced since the previous run are folded in.
+    """
+    start = time.perf_counter()
+    try:
+        cache = ArtifactCache(os.path.join(output_dir, '.build_cache'))
+        aggregator = data.sync_ticket_aggregates(state_key, job_data) if state_key else None
+        # Jobs already run in parallel, so each one renders its charts serially
+        data.build_report(job_data, cache, workers=1, output_dir=output_dir, aggregator=aggregator)
+    except Exception:
+        # The traceback only exists in the worker; log it before the error is passed back
+        print(f"Building the report in {output_dir} failed:")
+        traceback.print_exc()
+        raise
+    return time.perf_counter() - start
+
+
+def run_reports(jobs, client=None, output_root=data.OUTPUT_DIR, fetch_workers=4, build_workers=None,
+                requests_per_minute=SHEETS_REQUESTS_PER_MINUTE, incremental=True):
+    """Fetch every job's worksheet concurrently and build the reports in a process pool.
+
+    All fetches share one authenticated client and one rate limiter. Each
+    job's output goes to `output_root/<output_prefix>/`. A job that fails is
+    logged and reported in its status; the other jobs carry on. Returns a
+    list of per-job metric dicts.
+    """
+    client = ThrottledClient(client or data.get_sheets_client(), RateLimiter(requests_per_minute))
+    run_start = time.perf_counter()
+    metrics = {job: {"job": job.output_prefix, "sheet_id": job.sheet_id, "worksheet": job.worksheet, "rows": 0}
+               for job in jobs}
+
+    def fetch(job):
+        start = time.perf_counter()
+        rows = data.fetch_google_sheet_data(job.sheet_id, job.worksheet, incremental=incremental, client=client)
+        metrics[job]["fetch_s"] = time.perf_counter() - start
+        return rows
+
+    with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="fetch") as fetchers, \
+            ProcessPoolExecutor(max_workers=build_workers) as builders:
+        fetches = {fetchers.submit(fetch, job): job for job in jobs}
+        builds = {}
+        # Start building each report as soon as its own fetch has finished
+        for future in as_completed(fetches):
+            job = fetches[future]
+            entry = metrics[job]
+            try:
+                rows = future.result()
+            except Exception as e:
+                print(f"Fetching {job.output_prefix} failed: {e}")
+                entry["status"] = f"fetch failed: {e}"
+                continue
+            entry["rows"] = len(rows) if rows else 0
+            if not rows:
+                entry["status"] = "fetch failed"
+                continue
+            output_dir = os.path.join(output_root, job.output_prefix)
+            state_key = data.sync_state_key(job.sheet_id, job.worksheet) if incremental else None
+            builds[job] = builders.submit(build_job, rows, output_dir, state_key)
+
+        for job, future in builds.items():
+            entry = metrics[job]
+            try:
+                entry["build_s"] = future.result()
+                entry["status"] = "ok"
+            except Exception as e:
+                print(f"Building {job.output_prefix} failed: {e}")
+                entry["status"] = f"build failed: {e}"
+
+    for entry in metrics.values():
+        entry["latency_s"] = entry.get("fetch_s", 0.0) + entry.get("build_s", 0.0)
+        entry["rows_per_s"] = entry["rows"] / entry["latency_s"] if entry["latency_s"] else 0.0
+    elapsed = time.perf_counter() - run_start
+    print(f"{len(jobs)} reports in {elapsed:.2f}s ({len(jobs) / elapsed if elapsed else 0:.2f} jobs/s)")
+    return list(metrics.values())
+
+
+def format_metrics(metrics):
+    lines = [f"{'job':<20} {'rows':>7} {'fetch s':>8} {'build s':>8} {'latency s':>10} {'rows/s':>9}  status"]
+    for entry in metrics:
+        lines.append(f"{entry['job']:<20} {entry['rows']:>7} {entry.get('fetch_s', 0):>8.2f} "
+                     f"{entry.get('build_s', 0):>8.2f} {entry['latency_s']:>10.2f} {entry['rows_per_s']:>9.1f}  {entry['status']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python report_runner.py <manifest.json|manifest.csv>")
+        sys.exit(1)
+    results = run_reports(load_manifest(sys.argv[1]))
+    print(format_metrics(results))
+    with open(os.path.join(data.OUTPUT_DIR, 'report_metrics.json'), 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
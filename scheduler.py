@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime
+
+import instrumentation
+
+# Upper bound on a single wait so wall-clock changes (NTP, suspend) are noticed
+MAX_SLEEP_SECONDS = 30
+
+
+class ReminderScheduler:
+    """Fire reminders at their due time from a dedicated background thread.
+
+    Pending reminders live in a min-heap keyed by their absolute due datetime.
+    Scheduling, cancelling and firing are O(log n), and the worker sleeps until
+    the earliest deadline instead of scanning every reminder on each tick.
+    """
+
+    def __init__(self, on_due):
+        self._on_due = on_due
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._cancelled = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def schedule(self, reminder_id, due, payload):
+        """Schedule `payload` to be passed to the callback at datetime `due`."""
+        with self._cond:
+            if reminder_id in self._entries:
+                self._cancel_locked(reminder_id)
+            # [due, tie-breaker, id, payload, active]
+            entry = [due, next(self._counter), reminder_id, payload, True]
+            self._entries[reminder_id] = entry
+            heapq.heappush(self._heap, entry)
+            # Only wake the worker if the new entry is the next one to fire
+            if self._heap[0] is entry:
+                self._cond.notify()
+
+    def cancel(self, reminder_id):
+        """Cancel a pending reminder. Returns True if it was pending."""
+        with self._cond:
+            return self._cancel_locked(reminder_id)
+
+    def _cancel_locked(self, reminder_id):
+        entry = self._entries.pop(reminder_id, None)
+        if entry is None:
+            return False
+        # Lazy deletion: mark the entry and let the worker skip it
+        entry[4] = False
+        self._cancelled += 1
+        if self._cancelled > len(self._heap) // 2:
+            self._heap = [e for e in self._heap if e[4]]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return True
+
+    def next_due(self):
+        """Return the due datetime of the earliest pending reminder, or None."""
+        with self._cond:
+            self._discard_cancelled_locked()
+            return self._heap[0][0] if self._heap else None
+
+    def _discard_cancelled_locked(self):
+        while self._heap and not self._heap[0][4]:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+    def start(self):
+        """Start the scheduler thread."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the scheduler thread, leaving pending reminders in place."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                entry = None
+                while self._running and entry is None:
+                    self._discard_cancelled_locked()
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = (self._heap[0][0] - datetime.now()).total_seconds()
+                    if delay > 0:
+                        self._cond.wait(min(delay, MAX_SLEEP_SECONDS))
+                        continue
+                    entry = heapq.heappop(self._heap)
+                    del self._entries[entry[2]]
+                if not self._running:
+                    return
+            # Run the callback outside the lock so it can schedule or cancel
+            instrumentation.observe("reminder_lag", max(0.0, (datetime.now() - entry[0]).total_seconds()))
+            try:
+                self._on_due(entry[3])
+            except Exception as e:
+                print(f"Error firing reminder {entry[2]}: {e}")
@@ -0,0 +1,83 @@
+import os
+import uuid
+
+# Default root of the columnar sheet snapshots
+SNAPSHOT_DIR = os.path.join('output_files', 'snapshots')
+
+# Column used to split snapshots into directories, e.g. WEEK=week%201/
+PARTITION_COLUMN = 'WEEK'
+
+FORMATS = {'arrow': 'ipc', 'parquet': 'parquet'}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.fs
+    except ImportError as e:
+        raise ImportError("Columnar snapshots need pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _dataset_format(fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown snapshot format '{fmt}'; expected one of {sorted(FORMATS)}")
+    return FORMATS[fmt]
+
+
+def save_snapshot(df, root=SNAPSHOT_DIR, partition_by=PARTITION_COLUMN, fmt='arrow', replace_partitions=True):
+    """Write a typed DataFrame as a hive-partitioned columnar dataset under `root`.
+
+    Arrow (Feather v2) files are written uncompressed so they can be memory-mapped
+    and read without copying; Parquet is smaller but has to be decoded. With
+    `replace_partitions` every partition present in `df` is rewritten and all
+    others are left alone, so re-saving a sheet is idempotent and new weeks are
+    appended. Without it, `df` is added as new files next to the existing ones.
+    """
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    partitioning = [partition_by] if partition_by and partition_by in df.columns else None
+    ext = 'arrow' if fmt == 'arrow' else 'parquet'
+    pa.dataset.write_dataset(
+        table,
+        root,
+        format=_dataset_format(fmt),
+        partitioning=partitioning,
+        partitioning_flavor='hive' if partitioning else None,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.{ext}",
+        existing_data_behavior='delete_matching' if replace_partitions else 'overwrite_or_ignore',
+    )
+    return root
+
+
+def open_snapshot(root=SNAPSHOT_DIR, fmt='arrow', memory_map=True):
+    """Return a pyarrow Dataset over the snapshot for column-wise scans."""
+    pa = _pyarrow()
+    filesystem = pa.fs.LocalFileSystem(use_mmap=memory_map)
+    return pa.dataset.dataset(root, format=_dataset_format(fmt), partitioning='hive', filesystem=filesystem)
+
+
+def load_snapshot(root=SNAPSHOT_DIR, columns=None, partitions=None, partition_by=PARTITION_COLUMN,
+                  fmt='arrow', memory_map=True):
+    """Load selected columns (and optionally only some partitions) as a DataFrame.
+
+    Only the requested columns and partitions are read; with Arrow files and
+    `memory_map` the column buffers are mapped straight from disk.
+    """
+    pa = _pyarrow()
+    dataset = open_snapshot(root, fmt, memory_map)
+    row_filter = None
+    if partitions is not None:
+        row_filter = pa.dataset.field(partition_by).isin(list(partitions))
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    return table.to_pandas()
+
+
+def list_partitions(root=SNAPSHOT_DIR, partition_by=PARTITION_COLUMN):
+    """Return the partition values present under `root`."""
+    from urllib.parse import unquote
+    prefix = f"{partition_by}="
+    if not os.path.isdir(root):
+        return []
+    return sorted(unquote(name[len(prefix):]) for name in os.listdir(root) if name.startswith(prefix))
@@ -0,0 +1,191 @@
+import json
+import threading
+from collections import namedtuple
+
+import speech_recognition as sr
+
+# Below this confidence a local result is re-checked with the cloud recognizer
+MIN_CONFIDENCE = 0.6
+
+# Bytes of audio fed to a streaming decoder at a time when decoding a whole clip
+FEED_BYTES = 8000
+
+# Vosk's token for speech it could not match to any word of its vocabulary or grammar
+UNKNOWN_WORD = "[unk]"
+
+# Outcome of one recognition; confidence is in [0, 1]
+RecognitionResult = namedtuple("RecognitionResult", "text confidence backend")
+
+
+class GoogleBackend:
+    """Cloud recognition through speech_recognition's Google Web Speech client."""
+
+    name = "google"
+
+    def __init__(self, recognizer=None, language="en-US"):
+        self.recognizer = recognizer or sr.Recognizer()
+        self.language = language
+
+    def recognize(self, audio):
+        """Return a RecognitionResult; raises sr.UnknownValueError or sr.RequestError like recognize_google."""
+        text, confidence = self.recognizer.recognize_google(audio, language=self.language, with_confidence=True)
+        return RecognitionResult(text, confidence, self.name)
+
+
+def _vosk():
+    try:
+        import vosk
+    except ImportError as e:
+        raise ImportError("Local speech recognition needs vosk: pip install vosk") from e
+    return vosk
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def load_vosk_model(model_path):
+    """Load a Vosk model once per process and return the shared instance."""
+    with _models_lock:
+        model = _models.get(model_path)
+        if model is None:
+            vosk = _vosk()
+            vosk.SetLogLevel(-1)
+            model = _models[model_path] = vosk.Model(model_path)
+        return model
+
+
+class VoskStream:
+    """Incremental decoder for one utterance: `accept` chunks as they arrive, then `finish(audio)`.
+
+    A result containing an unknown word gets confidence 0, even if the other
+    words were recognized, so a fallback backend re-checks it. With
+    `redecode`, such an utterance is instead decoded again by
+    `redecode(audio)`, e.g. without the grammar.
+    """
+
+    def __init__(self, recognizer, name, redecode=None):
+        self._recognizer = recognizer
+        self._name = name
+        self._redecode = redecode
+        self._segments = []
+
+    def accept(self, chunk):
+        if self._recognizer.AcceptWaveform(chunk):
+            self._segments.append(json.loads(self._recognizer.Result()))
+
+    def finish(self, audio=None):
+        self._segments.append(json.loads(self._recognizer.FinalResult()))
+        words = [word for segment in self._segments for word in segment.get("result", [])]
+        text = " ".join(segment.get("text", "") for segment in self._segments).split()
+        unknown = UNKNOWN_WORD in text
+        if unknown and self._redecode is not None and audio is not None:
+            return self._redecode(audio)
+        text = [word for word in text if word != UNKNOWN_WORD]
+        if not text:
+            raise sr.UnknownValueError()
+        if unknown:
+            # Part of the utterance is missing, whatever the confidence of the words that are left
+            confidence = 0.0
+        else:
+            confidence = sum(word.get("conf", 0.0) for word in words) / len(words) if words else 0.0
+        return RecognitionResult(" ".join(text), confidence, self._name)
+
+
+class VoskBackend:
+    """Offline, CPU-only recognition with a Vosk (Kaldi) model kept loaded in memory.
+
+    Decoding is streaming: `open_stream()` returns a VoskStream that decodes
+    audio while the user is still talking, so only the last chunk is left to
+    process when they stop. With a `grammar` (a list of words or phrases,
+    e.g. the intent vocabulary) the decoder only considers those words, which
+    is faster and more accurate for commands. Free text such as a reminder or
+    a search query comes out as unknown words; those utterances are decoded
+    again with the full vocabulary.
+    """
+
+    name = "vosk"
+
+    def __init__(self, model_path, sample_rate=16000, grammar=None):
+        self.model = load_vosk_model(model_path)
+        self.sample_rate = sample_rate
+        self.grammar = json.dumps(sorted(grammar) + ["[unk]"]) if grammar else None
+
+    def open_stream(self, sample_rate=None, grammar=True):
+        vosk = _vosk()
+        rate = sample_rate or self.sample_rate
+        if self.grammar and grammar:
+            recognizer = vosk.KaldiRecognizer(self.model, rate, self.grammar)
+            redecode = lambda audio: self.recognize(audio, grammar=False)
+        else:
+            recognizer = vosk.KaldiRecognizer(self.model, rate)
+            redecode = None
+        recognizer.SetWords(True)
+        return VoskStream(recognizer, self.name, redecode)
+
+    def recognize(self, audio, grammar=True):
+        frames = audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+        stream = self.open_stream(grammar=grammar)
+        for start in range(0, len(frames), FEED_BYTES):
+            stream.accept(frames[start:start + FEED_BYTES])
+        return stream.finish(audio)
+
+
+class FallbackStream:
+    def __init__(self, backend, stream):
+        self._backend = backend
+        self._stream = stream
+
+    def accept(self, chunk):
+        self._stream.accept(chunk)
+
+    def finish(self, audio):
+        try:
+            result = self._stream.finish(audio)
+        except sr.UnknownValueError:
+            result = None
+        return self._backend.resolve(result, audio)
+
+
+class FallbackBackend:
+    """Use `primary` (local) first and ask `fallback` (cloud) only when its confidence is low.
+
+    If the fallback is unreachable the low-confidence local result is kept.
+    Streams are supported when the primary backend supports them.
+    """
+
+    def __init__(self, primary, fallback, min_confidence=MIN_CONFIDENCE):
+        self.primary = primary
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        self.name = f"{primary.name}+{fallback.name}"
+        if hasattr(primary, "open_stream"):
+            self.open_stream = lambda sample_rate=None: FallbackStream(self, primary.open_stream(sample_rate))
+
+    def resolve(self, result, audio):
+        if result is not None and result.confidence >= self.min_confidence:
+            return result
+        try:
+            return self.fallback.recognize(audio)
+        except (sr.RequestError, sr.UnknownValueError):
+            if result is None:
+                raise
+            return result
+
+    def recognize(self, audio):
+        try:
+            result = self.primary.recognize(audio)
+        except sr.UnknownValueError:
+            result = None
+        return self.resolve(result, audio)
+
+
+def create_backend(kind="google", model_path=None, grammar=None, recognizer=None, min_confidence=MIN_CONFIDENCE):
+    """Build a backend by name: "google", "vosk", or "vosk+google" (local with cloud fallback)."""
+    if kind == "google":
+        return GoogleBackend(recognizer)
+    if kind == "vosk":
+        return VoskBackend(model_path, grammar=grammar)
+    if kind == "vosk+google":
+        return FallbackBackend(VoskBackend(model_path, grammar=grammar), GoogleBackend(recognizer), min_confidence)
+    raise ValueError(f"Unknown speech backend '{kind}'; expected google, vosk or vosk+google")
@@ -0,0 +1,303 @@
+import queue
+import threading
+import time
+import wave
+from collections import deque, namedtuple
+
+import numpy as np
+import speech_recognition as sr
+
+# Capture format: 16 kHz mono 16-bit, read in 30 ms chunks
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+CHUNK_SIZE = 480
+
+# Audio kept in the ring buffer, and how much of it is prepended to an utterance
+RING_SECONDS = 10
+PRE_ROLL_SECONDS = 0.3
+
+# Ambient noise measured at start-up to set the speech threshold
+CALIBRATE_SECONDS = 1.0
+
+# Speech is anything this many times louder than the noise floor (RMS), but never below MIN_ENERGY
+ENERGY_RATIO = 3.0
+MIN_ENERGY = 150
+
+# Voiced audio needed to start an utterance, silence that ends it, and the longest one allowed
+START_SECONDS = 0.09
+END_SILENCE_SECONDS = 0.5
+MAX_PHRASE_SECONDS = 10
+
+# While the assistant is talking its own voice reaches the mic, so barge-in needs louder speech
+BARGE_IN_FACTOR = 2.0
+
+# One recognized utterance; `error` is set instead of `text` if recognition failed.
+# ended_at/recognized_at are time.monotonic() values for latency measurements;
+# confidence and backend are filled in by speech_backends recognizers.
+Utterance = namedtuple("Utterance", "text error audio ended_at recognized_at confidence backend",
+                       defaults=(None, None))
+
+
+def rms(chunk):
+    samples = np.frombuffer(chunk, dtype='<i2').astype(np.float64)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+
+class MicrophoneSource:
+    """One persistent microphone stream (via speech_recognition/PyAudio) read chunk by chunk."""
+
+    def __init__(self, device_index=None, sample_rate=SAMPLE_RATE, chunk_size=CHUNK_SIZE):
+        self._microphone = sr.Microphone(device_index=device_index, sample_rate=sample_rate, chunk_size=chunk_size)
+        self._microphone.__enter__()
+        self.sample_rate = self._microphone.SAMPLE_RATE
+        self.sample_width = self._microphone.SAMPLE_WIDTH
+        self.chunk_size = self._microphone.CHUNK
+
+    def read(self):
+        return self._microphone.stream.read(self.chunk_size)
+
+    def close(self):
+        self._microphone.__exit__(None, None, None)
+
+
+class WavFileSource:
+    """Play 16-bit WAV files through the capture pipeline in place of a microphone.
+
+    Files are read back to back with `gap_seconds` of silence after each, plus
+    `lead_seconds` of silence up front for calibration. With `realtime` reads
+    are paced like a live stream; otherwise they return as fast as possible.
+    `read()` returns b"" once all files have been played.
+    """
+
+    def __init__(self, paths, chunk_size=CHUNK_SIZE, gap_seconds=1.0, lead_seconds=CALIBRATE_SECONDS, realtime=False):
+        if isinstance(paths, str):
+            paths = [paths]
+        self.chunk_size = chunk_size
+        self.sample_width = SAMPLE_WIDTH
+        self.sample_rate = None
+        self.realtime = realtime
+        segments = []
+        for path in paths:
+            frames, rate = self._read_wav(path)
+            if self.sample_rate is None:
+                self.sample_rate = rate
+                segments.append(np.zeros(int(lead_seconds * rate), dtype='<i2'))
+            elif rate != self.sample_rate:
+                raise ValueError(f"{path} is {rate} Hz; all files must share {self.sample_rate} Hz")
+            segments.append(frames)
+            segments.append(np.zeros(int(gap_seconds * rate), dtype='<i2'))
+        self._data = np.concatenate(segments).tobytes() if segments else b""
+        self._offset = 0
+        self._next_read = None
+
+    @staticmethod
+    def _read_wav(path):
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+            frames = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+            channels = wav.getnchannels()
+            if channels > 1:
+                frames = frames.reshape(-1, channels).mean(axis=1).astype('<i2')
+            return frames, wav.getframerate()
+
+    def read(self):
+        size = self.chunk_size * self.sample_width
+        chunk = self._data[self._offset:self._offset + size]
+        self._offset += len(chunk)
+        if self.realtime and chunk:
+            now = time.monotonic()
+            self._next_read = max(self._next_read or now, now - 1) + self.chunk_size / self.sample_rate
+            time.sleep(max(0.0, self._next_read - now))
+        return chunk
+
+    def close(self):
+        pass
+
+
+class EnergyVAD:
+    """Energy-based voice activity detection over fixed-size chunks.
+
+    The threshold follows the ambient noise floor (calibrated first, then
+    tracked while nobody is speaking). `feed` returns "start" when an
+    utterance begins, "end" when it ends, and None otherwise.
+    """
+
+    def __init__(self, chunk_seconds, ratio=ENERGY_RATIO, min_energy=MIN_ENERGY, start_seconds=START_SECONDS,
+                 end_silence=END_SILENCE_SECONDS, max_phrase=MAX_PHRASE_SECONDS, damping=0.95):
+        self.ratio = ratio
+        self.min_energy = min_energy
+        self.damping = damping
+        self.start_chunks = max(1, round(start_seconds / chunk_seconds))
+        self.end_chunks = max(1, round(end_silence / chunk_seconds))
+        self.max_chunks = max(1, round(max_phrase / chunk_seconds))
+        self.noise_floor = 0.0
+        self.in_speech = False
+        self._voiced = 0
+        self._silent = 0
+        self._length = 0
+
+    @property
+    def threshold(self):
+        return max(self.min_energy, self.noise_floor * self.ratio)
+
+    def calibrate(self, energies):
+        energies = list(energies)
+        if energies:
+            self.noise_floor = float(np.median(energies))
+
+    def feed(self, energy, boost=1.0):
+        voiced = energy > self.threshold * boost
+        if not self.in_speech:
+            if voiced:
+                self._voiced += 1
+                if self._voiced >= self.start_chunks:
+                    self.in_speech = True
+                    self._silent = 0
+                    self._length = self._voiced
+                    return "start"
+            else:
+                self._voiced = 0
+                self.noise_floor = self.damping * self.noise_floor + (1 - self.damping) * energy
+            return None
+        self._length += 1
+        self._silent = 0 if voiced else self._silent + 1
+        if self._silent >= self.end_chunks or self._length >= self.max_chunks:
+            self.in_speech = False
+            self._voiced = 0
+            return "end"
+        return None
+
+
+class StreamingListener:
+    """Always-on speech capture: one input stream, VAD-split utterances, background recognition.
+
+    A capture thread reads `source` continuously into a ring buffer and runs
+    the VAD on every chunk; the audio of each utterance (with a little
+    pre-roll from the ring) is passed on to a recognition thread. Capture
+    never pauses, so speech is heard while the previous utterance is being
+    recognized or answered.
+
+    `recognize` is either a function taking sr.AudioData and returning text,
+    or a speech_backends backend. Backends with `open_stream` decode while
+    the user is still speaking, so only the tail is left when they stop.
+
+    `on_speech_start` is called from the capture thread when speech begins,
+    e.g. to interrupt the assistant's own speech; while `is_speaking()` is
+    true the speech threshold is raised by `barge_in_factor` so the
+    assistant does not interrupt itself.
+    """
+
+    def __init__(self, source, recognize, vad=None, ring_seconds=RING_SECONDS, pre_roll=PRE_ROLL_SECONDS,
+                 calibrate_seconds=CALIBRATE_SECONDS, on_speech_start=None, is_speaking=None,
+                 barge_in_factor=BARGE_IN_FACTOR):
+        self.source = source
+        self.recognize = recognize
+        chunk_seconds = source.chunk_size / source.sample_rate
+        self.vad = vad or EnergyVAD(chunk_seconds)
+        self.ring = deque(maxlen=max(1, round(ring_seconds / chunk_seconds)))
+        self.pre_roll_chunks = round(pre_roll / chunk_seconds) + self.vad.start_chunks
+        self.calibrate_chunks = round(calibrate_seconds / chunk_seconds)
+        self.on_speech_start = on_speech_start
+        self.is_speaking = is_speaking
+        self.barge_in_factor = barge_in_factor
+        # ("start", pre-roll bytes), ("chunk", bytes) and ("end", time) events, then None
+        self._audio = queue.Queue()
+        self._results = queue.Queue()
+        self._stop = threading.Event()
+        self._capture_thread = threading.Thread(target=self._capture, name="speech-capture", daemon=True)
+        self._recognize_thread = threading.Thread(target=self._recognize_loop, name="speech-recognize", daemon=True)
+
+    def start(self):
+        self._capture_thread.start()
+        self._recognize_thread.start()
+        return self
+
+    def _capture(self):
+        try:
+            energies = []
+            while len(energies) < self.calibrate_chunks and not self._stop.is_set():
+                chunk = self.source.read()
+                if not chunk:
+                    break
+                self.ring.append(chunk)
+                energies.append(rms(chunk))
+            self.vad.calibrate(energies)
+
+            while not self._stop.is_set():
+                chunk = self.source.read()
+                if not chunk:
+                    break
+                self.ring.append(chunk)
+                boost = self.barge_in_factor if self.is_speaking and self.is_speaking() else 1.0
+                in_speech = self.vad.in_speech
+                event = self.vad.feed(rms(chunk), boost)
+                if event == "start":
+                    self._audio.put(("start", b"".join(list(self.ring)[-self.pre_roll_chunks:])))
+                    if self.on_speech_start:
+                        self.on_speech_start()
+                elif in_speech:
+                    self._audio.put(("chunk", chunk))
+                if event == "end":
+                    self._audio.put(("end", time.monotonic()))
+            if self.vad.in_speech:
+                self._audio.put(("end", time.monotonic()))
+        except Exception as e:
+            print(f"Audio capture error: {e}")
+        finally:
+            # Input is over (end of file, closed stream or stop()); let the recogniser drain
+            self._audio.put(None)
+
+    def _recognize_loop(self):
+        streaming = hasattr(self.recognize, "open_stream")
+        frames, stream = [], None
+        while True:
+            item = self._audio.get()
+            if item is None:
+                self._results.put(None)
+                return
+            kind, value = item
+            try:
+                if kind == "start":
+                    frames = [value]
+                    stream = self.recognize.open_stream(self.source.sample_rate) if streaming else None
+                    if stream is not None:
+                        stream.accept(value)
+                    continue
+                if kind == "chunk":
+                    frames.append(value)
+                    if stream is not None:
+                        stream.accept(value)
+                    continue
+            except Exception as e:
+                print(f"Streaming recognition error: {e}")
+                stream = None
+                continue
+            audio = sr.AudioData(b"".join(frames), self.source.sample_rate, self.source.sample_width)
+            self._results.put(self._finish(audio, stream, value))
+            frames, stream = [], None
+
+    def _finish(self, audio, stream, ended_at):
+        try:
+            if stream is not None:
+                result = stream.finish(audio)
+            elif hasattr(self.recognize, "recognize"):
+                result = self.recognize.recognize(audio)
+            else:
+                return Utterance(self.recognize(audio), None, audio, ended_at, time.monotonic())
+        except Exception as e:
+            return Utterance(None, e, audio, ended_at, time.monotonic())
+        return Utterance(result.text, None, audio, ended_at, time.monotonic(), result.confidence, result.backend)
+
+    def next_utterance(self, timeout=None):
+        """Return the next recognized Utterance, or None once the input has ended."""
+        result = self._results.get(timeout=timeout)
+        if result is None:
+            # Keep returning None to any further callers
+            self._results.put(None)
+        return result
+
+    def stop(self):
+        self._stop.set()
+        self._capture_thread.join()
+        self.source.close()
@@ -0,0 +1,129 @@
+import re
+
+# Number words up to nineteen, and the tens that can start a two-word number
+UNITS = {
+    "zero": 0, "oh": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50}
+
+# Minutes spoken as words in "half past four" / "quarter to five"
+FRACTIONS = {"half": 30, "quarter": 15}
+
+OCLOCK = ("o'clock", "oclock")
+
+# "a.m.", "p. m." and Vosk's "a m" / "p m", folded to "am" / "pm"
+MERIDIEM_PATTERN = re.compile(r"\b([ap])\.?\s?m\b\.?", re.IGNORECASE)
+
+# Times already written with digits
+CLOCK_PATTERN = re.compile(r"^\d{1,2}:\d{2}$")
+
+# Every word the normaliser understands, for a speech recognition grammar
+TIME_VOCABULARY = (*UNITS, *TENS, *FRACTIONS, "o'clock", "past", "to", "at", "a", "p", "m", "am", "pm")
+
+
+def _word(tokens, index):
+    return tokens[index].lower().strip(",.?!") if index < len(tokens) else None
+
+
+def parse_number(tokens, index):
+    """Parse a number of up to two words ("7", "seven", "forty five") at `index`.
+
+    Returns (value, next index), or None if there is no number there.
+    """
+    word = _word(tokens, index)
+    if word is None:
+        return None
+    if word.isdigit():
+        return int(word), index + 1
+    if word in TENS:
+        unit = UNITS.get(_word(tokens, index + 1))
+        if unit is not None and 0 < unit < 10 and _word(tokens, index + 1) != "oh":
+            return TENS[word] + unit, index + 2
+        return TENS[word], index + 1
+    if word in UNITS and word != "oh":
+        return UNITS[word], index + 1
+    return None
+
+
+def _meridiem(tokens, index):
+    word = _word(tokens, index)
+    return (word, index + 1) if word in ("am", "pm") else (None, index)
+
+
+def parse_time(tokens, index):
+    """Parse a spoken time at `index`.
+
+    Returns (text, next index, explicit): the time as "H:MM" (plus " am" or
+    " pm"), and whether the words alone mark it as a time (o'clock, am/pm,
+    past/to) rather than a plain number. Returns None if there is no time there.
+    """
+    word = _word(tokens, index)
+    if word is None:
+        return None
+    if CLOCK_PATTERN.match(word):
+        meridiem, end = _meridiem(tokens, index + 1)
+        return (f"{word} {meridiem}" if meridiem else word), end, True
+
+    # "half past four", "quarter to five", "ten past six"
+    if word in FRACTIONS:
+        minutes, end = FRACTIONS[word], index + 1
+    else:
+        number = parse_number(tokens, index)
+        minutes, end = number if number else (None, index)
+    relation = _word(tokens, end)
+    if minutes is not None and 0 < minutes < 60 and relation in ("past", "to"):
+        hour = parse_number(tokens, end + 1)
+        if hour is not None and 1 <= hour[0] <= 12:
+            hour, end = hour
+            if relation == "to":
+                hour, minutes = (hour - 2) % 12 + 1, 60 - minutes
+            meridiem, end = _meridiem(tokens, end)
+            return f"{hour}:{minutes:02d}" + (f" {meridiem}" if meridiem else ""), end, True
+
+    number = parse_number(tokens, index)
+    if number is None or number[0] > 23:
+        return None
+    hour, end = number
+    minutes, explicit = 0, False
+    if _word(tokens, end) in OCLOCK:
+        end, explicit = end + 1, True
+    elif _word(tokens, end) == "oh":
+        # "seven oh five"
+        number = parse_number(tokens, end + 1)
+        if number is not None and number[0] < 10:
+            minutes, end = number
+    else:
+        number = parse_number(tokens, end)
+        if number is not None and 10 <= number[0] < 60 and not _word(tokens, end).isdigit():
+            minutes, end = number
+    meridiem, end = _meridiem(tokens, end)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        explicit = True
+    return f"{hour}:{minutes:02d}" + (f" {meridiem}" if meridiem else ""), end, explicit
+
+
+def normalize_spoken_times(text):
+    """Rewrite spoken times as digits so time slots match: "at seven thirty p m" -> "at 7:30 pm".
+
+    A number becomes a time when it follows "at" or is marked as one
+    ("three o'clock", "eight pm", "quarter to five"); other numbers are left
+    alone, so the rest of the command keeps its words.
+    """
+    tokens = MERIDIEM_PATTERN.sub(lambda match: f"{match.group(1).lower()}m", text).split()
+    words = []
+    index = 0
+    while index < len(tokens):
+        time = parse_time(tokens, index)
+        if time is not None:
+            clock, end, explicit = time
+            if explicit or (words and _word(words, len(words) - 1) == "at"):
+                words.append(clock)
+                index = end
+                continue
+        words.append(tokens[index])
+        index += 1
+    return " ".join(words)
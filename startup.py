@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LazyResource:
+    """Value that is built by `factory` on first use, exactly once, from any thread."""
+
+    def __init__(self, name, factory, startup=None):
+        self.name = name
+        self._factory = factory
+        self._startup = startup
+        self._lock = threading.Lock()
+        self._built = False
+        self._value = None
+
+    @property
+    def built(self):
+        return self._built
+
+    def get(self):
+        """Return the value, building it first if needed."""
+        if self._built:
+            return self._value
+        with self._lock:
+            if not self._built:
+                start = time.perf_counter()
+                self._value = self._factory()
+                self._built = True
+                if self._startup is not None:
+                    self._startup.record(self.name, start, time.perf_counter())
+        return self._value
+
+    def peek(self):
+        """Return the value if it has been built, otherwise None."""
+        return self._value if self._built else None
+
+
+class Startup:
+    """Registry of lazily built resources with background warm-up and timing.
+
+    Nothing is built when a resource is registered. Resources are built on
+    first `get()`, or ahead of time by `warm()` on a small thread pool, and the
+    build time of each one is recorded for `report()`.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._resources = {}
+        self._timings = []
+        self._timings_lock = threading.Lock()
+
+    def resource(self, name, factory):
+        """Register and return a LazyResource."""
+        resource = LazyResource(name, factory, self)
+        self._resources[name] = resource
+        return resource
+
+    def record(self, label, start, end=None):
+        """Record a span (or, without `end`, a point in time) for the report."""
+        end = start if end is None else end
+        with self._timings_lock:
+            self._timings.append((label, start - self._origin, end - start, threading.current_thread().name))
+
+    def mark(self, label):
+        """Record that startup reached `label` now."""
+        self.record(label, time.perf_counter())
+
+    def warm(self, *names, max_workers=4, on_complete=None):
+        """Build the named resources in parallel in the background.
+
+        Returns immediately. `on_complete` is called once every resource has
+        been built or has failed.
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warm")
+        futures = [executor.submit(self._warm_one, self._resources[name]) for name in names]
+        executor.shutdown(wait=False)
+        if on_complete is not None:
+            def wait_for_all():
+                for future in futures:
+                    future.exception()
+                on_complete()
+            threading.Thread(target=wait_for_all, name="warm-wait", daemon=True).start()
+        return futures
+
+    def _warm_one(self, resource):
+        try:
+            resource.get()
+        except Exception as e:
+            self.mark(f"{resource.name} failed: {e}")
+            raise
+
+    def report(self):
+        """Return the recorded timings as a human-readable table."""
+        with self._timings_lock:
+            timings = sorted(self._timings, key=lambda timing: timing[1])
+        lines = ["Startup timings (start ms, duration ms, step):"]
+        for label, offset, duration, thread in timings:
+            lines.append(f"  {offset * 1000:8.1f}  {duration * 1000:8.1f}  {label} [{thread}]")
+        return "\n".join(lines)
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+import requests
+
+import api_client
+from api_client import ApiClient, TTLCache
+from benchmarks.fakes import StubHTTPServer
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(api_client.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def server():
+    with StubHTTPServer() as server:
+        yield server
+
+
+@pytest.fixture
+def client():
+    client = ApiClient(retries=0)
+    yield client
+    client.close()
+
+
+def test_cache_entry_goes_stale_then_expires(clock):
+    cache = TTLCache(ttl=10, stale_ttl=5)
+    cache.set("paris", 1)
+    assert cache.get("paris") == (1, True)
+    clock[0] += 11
+    assert cache.get("paris") == (1, False)
+    clock[0] += 5
+    assert cache.get("paris") is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == (1, True)
+    assert cache.get("c") == (3, True)
+
+
+def test_fresh_hit_makes_no_request(server, client):
+    cache = TTLCache(ttl=60)
+    first = client.get_json(server.url("/weather"), {"q": "paris"}, cache, "paris")
+    second = client.get_json(server.url("/weather"), {"q": "paris"}, cache, "paris")
+    assert first == second
+    assert first["name"] == "Paris"
+    assert server.requests == 1
+
+
+def test_stale_hit_is_served_and_revalidated(server, client):
+    cache = TTLCache(ttl=60)
+    cache._data["paris"] = ({"name": "Old"}, time.monotonic() - 61)
+    assert client.get_json(server.url("/weather"), {"q": "paris"}, cache, "paris") == {"name": "Old"}
+    deadline = time.monotonic() + 5
+    while cache.get("paris")[0] == {"name": "Old"} and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get("paris") == (client.get_json(server.url("/weather"), {"q": "paris"}), True)
+
+
+def test_errors_are_not_cached(server, client):
+    cache = TTLCache(ttl=60)
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(server.url("/missing"), cache=cache)
+    assert len(cache) == 0
@@ -0,0 +1,127 @@
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from calendar_outbox import CalendarOutbox
+
+
+def http_error(status, reason=None):
+    content = {"error": {"code": status, "message": "error", "errors": [{"reason": reason}] if reason else []}}
+    return HttpError(httplib2.Response({"status": status}), json.dumps(content).encode())
+
+
+class FakeCalendar:
+    """Calendar service whose batch requests answer each insert with the next scripted outcome."""
+
+    def __init__(self, outcomes=()):
+        # Outcomes are applied in order; an exception fails that insert, anything else succeeds
+        self.outcomes = list(outcomes)
+        self.inserted = {}
+        self.batches = 0
+
+    def events(self):
+        return self
+
+    def insert(self, calendarId, body):
+        return body
+
+    def new_batch_http_request(self, callback):
+        calendar = self
+
+        class Batch:
+            def __init__(self):
+                self.requests = []
+
+            def add(self, body, request_id):
+                self.requests.append((request_id, body))
+
+            def execute(self):
+                calendar.batches += 1
+                for request_id, body in self.requests:
+                    outcome = calendar.outcomes.pop(0) if calendar.outcomes else None
+                    if isinstance(outcome, Exception):
+                        callback(request_id, None, outcome)
+                    elif request_id in calendar.inserted:
+                        callback(request_id, None, http_error(409))
+                    else:
+                        calendar.inserted[request_id] = body
+                        callback(request_id, dict(body, htmlLink=f"link/{request_id}"), None)
+
+        return Batch()
+
+
+@pytest.fixture
+def make_outbox(tmp_path):
+    outboxes = []
+
+    def make(calendar, start=True, **options):
+        outbox = CalendarOutbox(lambda: calendar, path=str(tmp_path / "outbox.json"),
+                                base_delay=0.001, max_delay=0.01, **options)
+        outboxes.append(outbox)
+        if start:
+            outbox.start()
+        return outbox
+
+    yield make
+    for outbox in outboxes:
+        outbox.stop()
+
+
+def test_events_are_inserted_in_batches(make_outbox):
+    calendar = FakeCalendar()
+    outbox = make_outbox(calendar, start=False, batch_size=10)
+    ids = [outbox.enqueue({"summary": f"event {index}"}) for index in range(25)]
+    outbox.start()
+    assert outbox.flush(timeout=5)
+    assert sorted(calendar.inserted) == sorted(ids)
+    assert calendar.batches == 3
+
+
+def test_transient_errors_are_retried(make_outbox):
+    calendar = FakeCalendar([http_error(503), http_error(429), http_error(403, "userRateLimitExceeded")])
+    outbox = make_outbox(calendar)
+    event_id = outbox.enqueue({"summary": "retried"})
+    assert outbox.flush(timeout=5)
+    assert event_id in calendar.inserted
+    assert outbox.failed() == []
+
+
+def test_permission_error_is_not_retried(make_outbox):
+    calendar = FakeCalendar([http_error(403, "forbidden")])
+    outbox = make_outbox(calendar)
+    outbox.enqueue({"summary": "forbidden"})
+    assert outbox.flush(timeout=5)
+    assert calendar.inserted == {}
+    [failed] = outbox.failed()
+    assert failed["status"] == 403
+    assert failed["attempts"] == 1
+
+
+def test_gives_up_after_max_attempts(make_outbox):
+    calendar = FakeCalendar([http_error(503)] * 10)
+    outbox = make_outbox(calendar, max_attempts=3)
+    outbox.enqueue({"summary": "always failing"})
+    assert outbox.flush(timeout=5)
+    assert calendar.batches == 3
+    [failed] = outbox.failed()
+    assert failed["attempts"] == 3
+    assert failed["event"]["summary"] == "always failing"
+
+
+def test_pending_events_survive_a_restart(tmp_path):
+    path = str(tmp_path / "outbox.json")
+    outbox = CalendarOutbox(lambda: FakeCalendar(), path=path)
+    event_id = outbox.enqueue({"summary": "offline"})
+    outbox.stop()
+
+    calendar = FakeCalendar()
+    outbox = CalendarOutbox(lambda: calendar, path=path)
+    assert len(outbox) == 1
+    outbox.start()
+    try:
+        assert outbox.flush(timeout=5)
+        assert event_id in calendar.inserted
+    finally:
+        outbox.stop()
@@ -0,0 +1,70 @@
+import time
+from datetime import timedelta
+
+import credentials
+from credentials import CredentialManager
+
+
+class FakeCredentials:
+    """google-auth credentials whose refresh fails while `failing` is set."""
+
+    def __init__(self, lifetime=3600):
+        self.lifetime = lifetime
+        self.failing = False
+        self.refreshes = 0
+        self.refresh_token = "refresh"
+        self.expiry = credentials._utcnow() + timedelta(seconds=lifetime)
+
+    @property
+    def valid(self):
+        return self.expiry > credentials._utcnow()
+
+    def refresh(self, request):
+        if self.failing:
+            raise RuntimeError("token endpoint unavailable")
+        self.refreshes += 1
+        self.expiry = credentials._utcnow() + timedelta(seconds=self.lifetime)
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_retry_is_cleared_when_the_token_was_refreshed_elsewhere(monkeypatch):
+    monkeypatch.setattr(CredentialManager, "request", lambda self: None)
+    manager = CredentialManager(refresh_margin=60)
+    creds = FakeCredentials()
+    manager._get(("service_account", "test"), lambda: creds)
+    [entry] = manager._entries.values()
+    try:
+        # A background refresh failed earlier and the retry is now due...
+        entry.retry_at = time.monotonic() - 1
+        # ...but the token was meanwhile refreshed inline, so there is nothing to do
+        with manager._wakeup:
+            manager._wakeup.notify()
+        assert wait_for(lambda: entry.retry_at is None)
+        assert creds.refreshes == 0
+        # The loop now sleeps until the next refresh is due instead of spinning
+        assert manager._next_wait(time.monotonic()) > 3000
+    finally:
+        manager.stop()
+
+
+def test_failed_background_refresh_is_retried(monkeypatch):
+    monkeypatch.setattr(CredentialManager, "request", lambda self: None)
+    monkeypatch.setattr(credentials, "RETRY_DELAY", 0.05)
+    manager = CredentialManager(refresh_margin=60)
+    # Still valid, but inside the refresh margin, so the background thread refreshes it
+    creds = FakeCredentials(lifetime=30)
+    creds.failing = True
+    manager._get(("service_account", "test"), lambda: creds)
+    [entry] = manager._entries.values()
+    try:
+        assert wait_for(lambda: entry.retry_at is not None)
+        creds.lifetime, creds.failing = 3600, False
+        assert wait_for(lambda: creds.refreshes == 1 and entry.retry_at is None)
+    finally:
+        manager.stop()
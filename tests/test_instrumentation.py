@@ -0,0 +1,21 @@
+import pstats
+import threading
+
+import instrumentation
+
+
+def busy_worker_task():
+    return sum(range(1000))
+
+
+def test_profile_merges_threads_started_inside_the_block(tmp_path):
+    output = tmp_path / "session.prof"
+    with instrumentation.profile(str(output)):
+        worker = threading.Thread(target=busy_worker_task)
+        worker.start()
+        worker.join()
+
+    functions = {name for _, _, name in pstats.Stats(str(output)).stats}
+    # Thread.start runs on the calling thread, busy_worker_task only on the worker
+    assert "start" in functions
+    assert "busy_worker_task" in functions
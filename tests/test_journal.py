@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+import journal
+from journal import Journal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "reminders.json")
+
+
+def ids(store):
+    return sorted(record["id"] for record in store.values())
+
+
+def reopen(path):
+    """Open the journal as after a restart and return its record ids."""
+    store = Journal(path)
+    try:
+        return ids(store)
+    finally:
+        store.close()
+
+
+def test_torn_last_record_is_discarded(path):
+    store = Journal(path)
+    store.put({"id": "a"})
+    store.put({"id": "b"})
+    store.close()
+    with open(f"{path}.log", "a", encoding="utf-8") as log:
+        log.write('{"op": "put", "record": {"id": "c"')
+
+    store = Journal(path)
+    assert ids(store) == ["a", "b"]
+    # The torn tail is cut off, so the next record starts on a clean line
+    store.put({"id": "d"})
+    store.close()
+    assert reopen(path) == ["a", "b", "d"]
+
+
+def test_deletes_are_replayed(path):
+    store = Journal(path)
+    store.put({"id": "a"})
+    store.put({"id": "b"})
+    store.delete("a")
+    store.close()
+    assert reopen(path) == ["b"]
+
+
+def test_retired_log_is_folded_in_at_startup(path):
+    log_path, retired_path = f"{path}.log", f"{path}.log.compacting"
+    with open(retired_path, "w", encoding="utf-8") as retired:
+        retired.write(json.dumps({"op": "put", "record": {"id": "a"}}) + "\n")
+        retired.write(json.dumps({"op": "put", "record": {"id": "b"}}) + "\n")
+        retired.write('{"op": "put", "rec')
+    with open(log_path, "w", encoding="utf-8") as log:
+        log.write(json.dumps({"op": "delete", "id": "b"}) + "\n")
+        log.write(json.dumps({"op": "put", "record": {"id": "c"}}) + "\n")
+
+    store = Journal(path)
+    assert ids(store) == ["a", "c"]
+    assert not os.path.exists(retired_path)
+    with open(path, encoding="utf-8") as snapshot:
+        assert sorted(record["id"] for record in json.load(snapshot)) == ["a", "c"]
+    store.close()
+
+
+def test_crash_while_compacting_after_a_recovery_loses_nothing(path, monkeypatch):
+    store = Journal(path)
+    store.put({"id": "a"})
+    store.close()
+    # A compaction that rotated the log and crashed before writing the snapshot
+    os.replace(f"{path}.log", f"{path}.log.compacting")
+
+    store = Journal(path)
+    assert ids(store) == ["a"]
+    store.put({"id": "b"})
+
+    def crash(path, data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(journal, "_write_json_atomic", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    store.flush()
+    monkeypatch.undo()
+
+    assert reopen(path) == ["a", "b"]
+
+
+def test_compaction_folds_the_log_into_the_snapshot(path):
+    store = Journal(path, compact_threshold=10 ** 6)
+    for index in range(5):
+        store.put({"id": f"r{index}"})
+    store.compact()
+    store.put({"id": "late"})
+    store.close()
+    with open(path, encoding="utf-8") as snapshot:
+        assert len(json.load(snapshot)) == 5
+    assert reopen(path) == ["late", "r0", "r1", "r2", "r3", "r4"]
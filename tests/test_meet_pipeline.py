@@ -0,0 +1,156 @@
+from benchmarks.fakes import FakeSubscriber
+from meet_pipeline import BatchingPipeline, MessagePipeline
+
+SUBSCRIPTION = "projects/test/subscriptions/meetings"
+
+
+class Message:
+    """A message from a subscription without a dead-letter policy: delivery_attempt is None."""
+
+    def __init__(self, data=b'{"meetingId": "m1"}', message_id="id-1"):
+        self.data = data
+        self.message_id = message_id
+        self.delivery_attempt = None
+        self.attributes = {}
+        self.settled = []
+
+    def ack(self):
+        self.settled.append("ack")
+
+    def nack(self):
+        self.settled.append("nack")
+
+
+def run(pipeline, subscriber, acked):
+    pipeline.start(SUBSCRIPTION)
+    try:
+        assert subscriber.wait_acked(acked, timeout=10)
+    finally:
+        pipeline.stop()
+    return pipeline.metrics.snapshot()
+
+
+def test_failed_message_is_nacked_and_acked_once_it_succeeds():
+    failures = []
+
+    def handler(data, message):
+        if len(failures) < 2:
+            failures.append(message.delivery_attempt)
+            raise RuntimeError("calendar unavailable")
+
+    subscriber = FakeSubscriber()
+    subscriber.publish({"meetingId": "m1"})
+    snapshot = run(MessagePipeline(handler, subscriber=subscriber), subscriber, 1)
+    assert failures == [1, 2]
+    assert (subscriber.nacked, subscriber.acked) == (2, 1)
+    assert (snapshot["nacked"], snapshot["acked"]) == (2, 1)
+
+
+def test_permanent_error_goes_to_the_dead_letter_sink():
+    dead = []
+    subscriber = FakeSubscriber()
+    subscriber.publish(b"not json")
+    pipeline = MessagePipeline(lambda data, message: None, subscriber=subscriber,
+                               dead_letter=lambda message, error: dead.append((message.data, str(error))))
+    snapshot = run(pipeline, subscriber, 1)
+    [(data, error)] = dead
+    assert data == b"not json" and "Invalid JSON" in error
+    assert subscriber.nacked == 0
+    assert snapshot["dead_lettered"] == 1
+
+
+def test_without_dead_letter_sink_a_failing_message_is_dropped_after_max_attempts(capsys):
+    def handler(data, message):
+        raise RuntimeError("always fails")
+
+    subscriber = FakeSubscriber()
+    subscriber.publish({"meetingId": "m1"})
+    snapshot = run(MessagePipeline(handler, subscriber=subscriber, max_attempts=3), subscriber, 1)
+    assert (subscriber.nacked, subscriber.acked) == (2, 1)
+    assert snapshot["dropped"] == 1 and snapshot["queue_depth"] == 0
+    assert "Dropped message" in capsys.readouterr().out
+
+
+def test_without_dead_letter_sink_a_permanent_error_is_acked_at_once():
+    message = Message(data=b"{broken")
+    MessagePipeline(lambda data, message: None)._process(message, 0.0)
+    assert message.settled == ["ack"]
+
+
+def test_attempts_are_counted_locally_when_delivery_attempt_is_unset():
+    def handler(data, message):
+        raise RuntimeError("always fails")
+
+    pipeline = MessagePipeline(handler, max_attempts=3)
+    message = Message()
+    for _ in range(3):
+        pipeline._process(message, 0.0)
+    assert message.settled == ["nack", "nack", "ack"]
+    assert pipeline.metrics.dropped == 1
+    # The count starts over for a new message
+    other = Message(message_id="id-2")
+    pipeline._process(other, 0.0)
+    assert other.settled == ["nack"]
+
+
+def test_batching_coalesces_updates_and_drops_redeliveries():
+    batches = []
+    subscriber = FakeSubscriber()
+    subscriber.publish({"meetingId": "m1", "seq": 1}, message_id="a")
+    subscriber.publish({"meetingId": "m1", "seq": 2}, message_id="b")
+    subscriber.publish({"meetingId": "m2", "seq": 3}, message_id="c")
+    pipeline = BatchingPipeline(lambda events, messages: batches.append(events), subscriber=subscriber,
+                                max_wait=0.5)
+    pipeline.start(SUBSCRIPTION)
+    try:
+        assert subscriber.wait_acked(3, timeout=10)
+        subscriber.publish({"meetingId": "m1", "seq": 2}, message_id="b")
+        assert subscriber.wait_acked(4, timeout=10)
+    finally:
+        pipeline.stop()
+    handled = sorted(event["seq"] for batch in batches for event in batch)
+    assert handled == [2, 3]
+    snapshot = pipeline.metrics.snapshot()
+    assert (snapshot["coalesced"], snapshot["duplicates"]) == (1, 1)
+
+
+def publish_mixed_batch(subscriber):
+    for index in range(5):
+        subscriber.publish({"meetingId": f"good{index}"}, message_id=f"good{index}")
+    subscriber.publish([1, 2, 3], message_id="bad")
+
+
+def test_bad_event_fails_only_its_own_message(capsys):
+    import meet
+
+    handled = []
+
+    def handler(events, messages):
+        for data, message in zip(events, messages):
+            meet.handle_meeting_event(data, message)
+        handled.extend(message.message_id for message in messages)
+
+    subscriber = FakeSubscriber()
+    publish_mixed_batch(subscriber)
+    pipeline = BatchingPipeline(handler, subscriber=subscriber, max_wait=0.5, max_attempts=3)
+    snapshot = run(pipeline, subscriber, 6)
+    assert sorted(handled) == [f"good{index}" for index in range(5)]
+    # Only the bad message is retried and finally dropped
+    assert subscriber.nacked == 2
+    assert (snapshot["acked"], snapshot["dropped"]) == (5, 1)
+    dropped = [line for line in capsys.readouterr().out.splitlines() if line.startswith("Dropped")]
+    assert len(dropped) == 1 and "bad" in dropped[0]
+
+
+def test_non_object_meeting_event_is_rejected_when_parsed():
+    import meet
+
+    handled = []
+    subscriber = FakeSubscriber()
+    publish_mixed_batch(subscriber)
+    pipeline = BatchingPipeline(lambda events, messages: handled.extend(events), subscriber=subscriber,
+                                parse=meet.parse_meeting_event, max_wait=0.5)
+    snapshot = run(pipeline, subscriber, 6)
+    assert len(handled) == 5
+    assert subscriber.nacked == 0
+    assert (snapshot["acked"], snapshot["dropped"]) == (5, 1)
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import remiander
+
+
+class RecordingOutbox:
+    def __init__(self):
+        self.events = []
+
+    def get(self):
+        return self
+
+    def enqueue(self, event):
+        self.events.append(event)
+
+
+def test_calendar_event_for_a_time_already_passed_is_booked_tomorrow(monkeypatch):
+    outbox = RecordingOutbox()
+    monkeypatch.setattr(remiander, "calendar_outbox", outbox)
+    monkeypatch.setattr(remiander, "speak", lambda text: None)
+    due = remiander.next_occurrence("07:30", now=datetime(2024, 3, 10, 21, 0))
+
+    remiander.add_google_calendar_event("Walk the dog", due)
+
+    [event] = outbox.events
+    assert event["start"]["dateTime"] == "2024-03-11T07:30:00"
+    assert event["end"]["dateTime"] == "2024-03-11T08:00:00"
@@ -0,0 +1,76 @@
+import pytest
+
+import data
+import report_runner
+from benchmarks.fakes import FakeSheetsClient, FakeSpreadsheet, FakeWorksheet, ticket_rows
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(report_runner.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(report_runner.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_limiter_never_exceeds_the_limit_in_any_window(clock):
+    limiter = report_runner.RateLimiter(limit=5, period=60.0)
+    sent = []
+    for _ in range(17):
+        limiter.acquire()
+        sent.append(clock.now)
+        clock.now += 1.0
+    # The first `limit` go straight out; after that each waits for the oldest to leave the window
+    assert sent[:5] == [1000.0, 1001.0, 1002.0, 1003.0, 1004.0]
+    assert sent[5] == 1060.0
+    for start in sent:
+        assert sum(start <= t < start + 60.0 for t in sent) <= 5
+
+
+def test_limiter_starts_within_quota_after_an_idle_spell(clock):
+    limiter = report_runner.RateLimiter(limit=3, period=60.0)
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.sleeps == []
+    clock.now += 600.0
+    for _ in range(4):
+        limiter.acquire()
+    # A token bucket would allow a burst on top of the refill; the window allows only the limit
+    assert len(clock.sleeps) == 1
+    assert clock.sleeps[0] == pytest.approx(60.0)
+
+
+def test_failed_job_is_logged_and_the_rest_still_run(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    client = FakeSheetsClient({"good": FakeSpreadsheet([FakeWorksheet(ticket_rows(30))])})
+    fetch = data.fetch_google_sheet_data
+
+    def flaky_fetch(sheet_id, worksheet, **options):
+        if sheet_id == "broken":
+            raise RuntimeError("connection reset")
+        return fetch(sheet_id, worksheet, **options)
+
+    monkeypatch.setattr(data, "fetch_google_sheet_data", flaky_fetch)
+    jobs = [report_runner.ReportJob("broken", "Sheet1", "broken"),
+            report_runner.ReportJob("missing", "Sheet1", "missing"),
+            report_runner.ReportJob("good", "Sheet1", "good")]
+    metrics = {entry["job"]: entry for entry in
+               report_runner.run_reports(jobs, client=client, output_root=str(tmp_path), build_workers=1)}
+    assert metrics["broken"]["status"] == "fetch failed: connection reset"
+    assert metrics["missing"]["status"] == "fetch failed"
+    assert metrics["good"]["status"] == "ok"
+    assert metrics["good"]["rows"] == 30
+    assert "Fetching broken failed: connection reset" in capsys.readouterr().out
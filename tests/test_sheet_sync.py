@@ -0,0 +1,148 @@
+import os
+
+import pandas as pd
+import pytest
+
+import data
+from benchmarks.fakes import FakeSheetsClient, FakeSpreadsheet, FakeWorksheet, ticket_rows
+
+
+@pytest.fixture
+def state_file(tmp_path, monkeypatch):
+    # Sync state and row caches go under the relative OUTPUT_DIR
+    monkeypatch.chdir(tmp_path)
+    return data.SYNC_STATE_FILE
+
+
+def sync(sheet, state_file, **options):
+    return data.fetch_new_rows(sheet, "sheet/Sheet1", state_file=state_file, chunk_size=7, **options)
+
+
+def cached(state_key="sheet/Sheet1"):
+    return data.load_row_cache(data.row_cache_file(state_key))
+
+
+def test_streams_rows_in_windows_as_typed_records():
+    rows = ticket_rows(30)
+    sheet = FakeWorksheet(rows)
+    batches = list(data.iter_sheet_batches(sheet, chunk_size=7))
+    assert [len(batch) for batch in batches] == [7, 7, 7, 7, 2]
+    first = batches[0][0]
+    assert first["DATE"] == rows[1][1]
+    assert first["Tickets raised"] == int(rows[1][2])
+
+
+def test_blank_row_at_the_end_of_a_window_does_not_end_the_read(state_file):
+    rows = ticket_rows(14)
+    # Sheet row 10 is the last row of the first 9-row window
+    rows.insert(9, [""] * len(rows[0]))
+    windowed = [record for batch in data.iter_sheet_batches(FakeWorksheet(rows), chunk_size=9) for record in batch]
+    whole = [record for batch in data.iter_sheet_batches(FakeWorksheet(rows), chunk_size=1000) for record in batch]
+    assert len(windowed) == 15
+    assert windowed == whole
+    assert windowed[8]["DATE"] == "" and windowed[-1]["DATE"] == rows[-1][1]
+
+    sheet = FakeWorksheet(rows)
+    records, _, _ = data.fetch_new_rows(sheet, "sheet/Sheet1", state_file=state_file, chunk_size=9)
+    assert len(records) == 15
+    assert data.load_sync_state(state_file)["sheet/Sheet1"]["last_row"] == 16
+
+
+def test_first_sync_fetches_everything_then_only_new_rows(state_file):
+    rows = ticket_rows(20)
+    sheet = FakeWorksheet(rows)
+    records, changed, full_resync = sync(sheet, state_file)
+    assert (len(records), changed, full_resync) == (20, [], True)
+
+    rows.extend(ticket_rows(4, seed=1)[1:])
+    calls = sheet.calls
+    records, changed, full_resync = sync(sheet, state_file)
+    assert (len(records), changed, full_resync) == (4, [], False)
+    assert len(cached()) == 24
+    # Header, tail check, the windows after the last synced row and the empty one that ends the read
+    assert sheet.calls - calls <= 4
+
+
+def test_edited_row_is_found_by_the_full_check(state_file):
+    rows = ticket_rows(20)
+    sheet = FakeWorksheet(rows)
+    sync(sheet, state_file)
+
+    rows[5][2] = "999"
+    records, changed, full_resync = sync(sheet, state_file, full_check=False)
+    assert (records, changed) == ([], [])
+    assert cached()[4]["Tickets raised"] != 999
+
+    records, changed, full_resync = sync(sheet, state_file, full_check=True)
+    assert records == [] and not full_resync
+    [(old, new)] = changed
+    assert new["Tickets raised"] == 999 and old["Tickets raised"] != 999
+    assert cached()[4]["Tickets raised"] == 999
+
+
+def test_full_check_runs_once_the_interval_has_passed(state_file, monkeypatch):
+    rows = ticket_rows(10)
+    sheet = FakeWorksheet(rows)
+    sync(sheet, state_file)
+    rows[3][4] = "0"
+    assert sync(sheet, state_file)[1] == []
+
+    now = data.time.time()
+    monkeypatch.setattr(data.time, "time", lambda: now + data.FULL_CHECK_INTERVAL + 1)
+    assert len(sync(sheet, state_file)[1]) == 1
+
+
+def test_edited_last_row_forces_a_full_resync(state_file):
+    rows = ticket_rows(10)
+    sheet = FakeWorksheet(rows)
+    sync(sheet, state_file)
+    rows[-1][2] = "1"
+    records, changed, full_resync = sync(sheet, state_file)
+    assert full_resync and len(records) == 10
+    assert cached()[-1]["Tickets raised"] == 1
+
+
+def test_fetch_reads_from_the_row_cache_incrementally(state_file):
+    rows = ticket_rows(12)
+    client = FakeSheetsClient({"sheet": FakeSpreadsheet([FakeWorksheet(rows)])})
+    assert len(data.fetch_google_sheet_data("sheet", "Sheet1", incremental=True, client=client)) == 12
+    rows.extend(ticket_rows(2, seed=2)[1:])
+    assert len(data.fetch_google_sheet_data("sheet", "Sheet1", incremental=True, client=client)) == 14
+
+
+def aggregates(data_rows):
+    return data.sync_ticket_aggregates("sheet/Sheet1", data_rows)
+
+
+def test_saved_aggregates_fold_only_new_rows(state_file, monkeypatch):
+    rows = ticket_rows(20)
+    sheet = FakeWorksheet(rows)
+    sync(sheet, state_file)
+    assert aggregates(cached()).source_rows == 20
+
+    rows.extend(ticket_rows(4, seed=1)[1:])
+    sync(sheet, state_file)
+    parsed = []
+    parse = data.parse_ticket_metrics
+    monkeypatch.setattr(data, "parse_ticket_metrics", lambda df: parsed.append(len(df)) or parse(df))
+    aggregator = aggregates(cached())
+    assert parsed == [4]
+    assert aggregator.source_rows == 24
+
+    expected = data.aggregate_ticket_metrics(cached())
+    pd.testing.assert_frame_equal(aggregator.mean('week'), expected.mean('week'))
+    pd.testing.assert_frame_equal(aggregator.stat('max', 'month'), expected.stat('max', 'month'))
+
+
+def test_edited_rows_rebuild_the_saved_aggregates(state_file):
+    rows = ticket_rows(20)
+    sheet = FakeWorksheet(rows)
+    sync(sheet, state_file)
+    aggregates(cached())
+
+    rows[5][2] = "999"
+    sync(sheet, state_file, full_check=True)
+    assert not os.path.exists(data.aggregator_file("sheet/Sheet1"))
+    aggregator = aggregates(cached())
+    assert aggregator.stat('max', 'month')["Tickets raised"].max() == 999
+    assert aggregator.source_rows == 20
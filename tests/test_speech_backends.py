@@ -0,0 +1,81 @@
+import json
+
+import pytest
+import speech_recognition as sr
+
+from speech_backends import FallbackBackend, RecognitionResult, VoskStream
+
+
+class KaldiRecognizer:
+    """Stand-in for vosk.KaldiRecognizer that returns a canned final result."""
+
+    def __init__(self, words):
+        self.words = words
+
+    def AcceptWaveform(self, chunk):
+        return False
+
+    def FinalResult(self):
+        return json.dumps({"text": " ".join(word for word, _ in self.words),
+                           "result": [{"word": word, "conf": conf} for word, conf in self.words]})
+
+
+class Local:
+    name = "vosk"
+
+
+class Cloud:
+    name = "cloud"
+
+    def __init__(self):
+        self.calls = 0
+
+    def recognize(self, audio):
+        self.calls += 1
+        return RecognitionResult("remind me to call the dentist at 7:30", 0.95, self.name)
+
+
+AUDIO = sr.AudioData(b"\0\0" * 1600, 16000, 2)
+
+
+def stream(words, redecode=None):
+    return VoskStream(KaldiRecognizer(words), "vosk", redecode)
+
+
+def test_confident_words_keep_their_confidence():
+    result = stream([("what", 1.0), ("time", 0.8)]).finish(AUDIO)
+    assert result == RecognitionResult("what time", pytest.approx(0.9), "vosk")
+
+
+def test_any_unknown_word_means_low_confidence():
+    result = stream([("remind", 1.0), ("me", 1.0), ("to", 1.0), ("[unk]", 1.0), ("at", 1.0)]).finish(AUDIO)
+    assert result.text == "remind me to at"
+    assert result.confidence == 0.0
+
+
+def test_only_unknown_words_is_not_recognized():
+    with pytest.raises(sr.UnknownValueError):
+        stream([("[unk]", 1.0)]).finish(AUDIO)
+
+
+def test_unknown_word_is_decoded_again_without_the_grammar():
+    redecoded = []
+
+    def redecode(audio):
+        redecoded.append(audio)
+        return RecognitionResult("remind me to call the dentist at seven thirty", 0.85, "vosk")
+
+    result = stream([("remind", 1.0), ("[unk]", 1.0)], redecode).finish(AUDIO)
+    assert redecoded == [AUDIO]
+    assert result.text.endswith("seven thirty")
+    # Results without unknown words are not decoded twice
+    stream([("news", 1.0)], redecode).finish(AUDIO)
+    assert len(redecoded) == 1
+
+
+def test_unknown_word_sends_the_utterance_to_the_cloud():
+    cloud = Cloud()
+    backend = FallbackBackend(Local(), cloud)
+    local = stream([("remind", 0.99), ("me", 0.99), ("[unk]", 1.0)]).finish(AUDIO)
+    assert backend.resolve(local, AUDIO).backend == "cloud"
+    assert cloud.calls == 1
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from benchmarks.fakes import FakeRecognizer, NullTTS, write_command_wav
+from dispatcher import SpeechQueue
+from speech_io import StreamingListener, WavFileSource
+
+
+def listen(paths, recognizer):
+    listener = StreamingListener(WavFileSource(paths, gap_seconds=0.8), recognizer).start()
+    utterances = []
+    try:
+        while True:
+            utterance = listener.next_utterance(timeout=10)
+            if utterance is None:
+                return utterances
+            utterances.append(utterance)
+    finally:
+        listener.stop()
+
+
+def commands(tmp_path, seconds):
+    return [write_command_wav(str(tmp_path / f"command{index}.wav"), length, seed=index)
+            for index, length in enumerate(seconds)]
+
+
+def test_each_wav_command_becomes_one_utterance(tmp_path):
+    recognizer = FakeRecognizer(["what time is it", "weather in paris", "tell me a joke"])
+    utterances = listen(commands(tmp_path, [0.6, 1.5, 0.9]), recognizer)
+    assert [utterance.text for utterance in utterances] == recognizer.transcripts
+    assert [utterance.error for utterance in utterances] == [None] * 3
+    # Each utterance holds about its command's audio, plus pre-roll and the trailing silence
+    durations = [len(u.audio.frame_data) / (u.audio.sample_rate * u.audio.sample_width) for u in utterances]
+    assert durations[0] < durations[2] < durations[1]
+    assert 1.5 <= durations[1] < 2.5
+
+
+def test_streaming_backend_gets_the_same_segments(tmp_path):
+    recognizer = FakeRecognizer(["one", "two"], streaming=True)
+    utterances = listen(commands(tmp_path, [0.7, 0.7]), recognizer)
+    assert [utterance.text for utterance in utterances] == ["one", "two"]
+    assert recognizer.calls == 2
+
+
+def test_silence_yields_no_utterances(tmp_path):
+    silent = write_command_wav(str(tmp_path / "silent.wav"), 1.0, amplitude=0)
+    assert listen([silent], FakeRecognizer(["unused"])) == []
+
+
+def test_interrupt_stops_the_engine_on_the_speech_thread():
+    engine = NullTTS(seconds_per_word=0.02)
+    stopped_on = []
+
+    def say_and_wait(text):
+        engine.say(text)
+        engine.runAndWait()
+
+    def on_word(name, location, length):
+        if speech.interrupted:
+            stopped_on.append(threading.current_thread().name)
+            engine.stop()
+
+    engine.connect("started-word", on_word)
+    speech = SpeechQueue(say_and_wait)
+    try:
+        speech.say("This is a long answer with many words in it. And a second sentence.")
+        deadline = time.monotonic() + 5
+        while not speech.speaking and time.monotonic() < deadline:
+            time.sleep(0.005)
+        speech.interrupt()
+        speech.say("Okay.")
+        speech.join()
+    finally:
+        speech.stop()
+    assert stopped_on == ["speech-queue"]
+    assert engine.spoken == ["Okay."]
+    assert not speech.interrupted
@@ -0,0 +1,43 @@
+import pytest
+
+from intent_router import IntentRouter
+from spoken_numbers import TIME_VOCABULARY, normalize_spoken_times
+
+
+@pytest.mark.parametrize("spoken, written", [
+    ("remind me to call mom at seven thirty p m", "remind me to call mom at 7:30 pm"),
+    ("set standup at nine o'clock", "set standup at 9:00"),
+    ("schedule lunch at twelve fifteen", "schedule lunch at 12:15"),
+    ("remind me to leave at seven oh five am", "remind me to leave at 7:05 am"),
+    ("remind me to stretch at quarter to five", "remind me to stretch at 4:45"),
+    ("remind me to eat at half past twelve", "remind me to eat at 12:30"),
+    ("remind me to pay rent at twenty one forty five", "remind me to pay rent at 21:45"),
+    ("call the office at eight", "call the office at 8:00"),
+    ("wake me at 7 p.m.", "wake me at 7:00 pm"),
+    ("remind me to call at 7:30 p.m.", "remind me to call at 7:30 pm"),
+    ("meet ten past six", "meet 6:10"),
+])
+def test_spoken_times_become_digits(spoken, written):
+    assert normalize_spoken_times(spoken) == written
+
+
+@pytest.mark.parametrize("text", [
+    "remind me to buy two apples at 18:00",
+    "look up the one ring",
+    "play music seven nation army",
+    "what is the weather in paris",
+])
+def test_other_numbers_are_left_alone(text):
+    assert normalize_spoken_times(text) == text
+
+
+def test_normalized_reminder_fills_the_time_slot():
+    router = IntentRouter()
+    router.register("reminder", lambda text, time: None, {"remind me to": 4},
+                    slots=r"remind me to (?P<text>.+?) at (?P<time>\d{1,2}:\d{2}(?:\s?[ap]m)?)",
+                    slots_required=True, vocabulary=TIME_VOCABULARY)
+    spoken = "remind me to water the plants at six forty five p m"
+    assert router.route(spoken) is None
+    match = router.route(normalize_spoken_times(spoken))
+    assert match.slots == {"text": "water the plants", "time": "6:45 pm"}
+    assert {"six", "forty", "five", "p", "m", "o'clock"} <= router.vocabulary()
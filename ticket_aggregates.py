@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# Running statistics kept per bucket and metric; everything else is derived from them
+STATS = ('count', 'sum', 'sumsq', 'min', 'max')
+
+
+class TicketAggregator:
+    """Incremental per-day, per-week and per-month statistics for ticket metrics.
+
+    For every bucket and numeric metric the aggregator keeps count, sum, sum of
+    squares, min and max. `update` folds a batch of new rows into that state
+    with one vectorized groupby over the batch, so adding rows costs O(batch)
+    rather than a rescan of the full history. Means, standard deviations,
+    rolling windows and week-over-week deltas are computed from the state.
+
+    Weeks are keyed by the sheet's WEEK column when present (ordered by their
+    first date), otherwise by calendar week. `source_rows` counts every row
+    passed to `update`, including rows without a date, so a saved aggregator
+    knows where to resume in the source.
+    """
+
+    def __init__(self, date_column='DATE', week_column='WEEK'):
+        self.date_column = date_column
+        self.week_column = week_column
+        self.metrics = None
+        self.rows = 0
+        self.source_rows = 0
+        self._state = {granularity: None for granularity in GRANULARITIES}
+        # First date seen in each week bucket, used to order week labels
+        self._week_start = pd.Series(dtype='datetime64[ns]')
+
+    def _bucket_keys(self, df):
+        dates = df[self.date_column]
+        keys = {'day': dates.dt.normalize(), 'month': dates.dt.to_period('M').dt.to_timestamp()}
+        if self.week_column in df.columns:
+            keys['week'] = df[self.week_column].astype('string')
+        else:
+            keys['week'] = dates.dt.to_period('W').dt.start_time
+        return keys
+
+    def update(self, df):
+        """Fold a DataFrame of new, already typed rows into the running state."""
+        self.source_rows += len(df)
+        df = df[df[self.date_column].notna()]
+        if df.empty:
+            return self
+        if self.metrics is None:
+            self.metrics = [column for column in df.select_dtypes('number').columns]
+        # Later batches are typed on their own; keep the metrics of the first one
+        values = df.reindex(columns=self.metrics).apply(pd.to_numeric, errors='coerce').astype('float64')
+        squares = values * values
+        keys = self._bucket_keys(df)
+
+        for granularity in GRANULARITIES:
+            key = keys[granularity]
+            grouped = values.groupby(key, observed=True, sort=False)
+            counts = grouped.count()
+            delta = {
+                'count': counts.to_numpy(),
+                'sum': grouped.sum().to_numpy(),
+                'sumsq': squares.groupby(key, observed=True, sort=False).sum().to_numpy(),
+                'min': grouped.min().to_numpy(),
+                'max': grouped.max().to_numpy(),
+            }
+            self._state[granularity] = self._merge(self._state[granularity], counts.index, delta)
+
+        week_start = df[self.date_column].groupby(keys['week'], observed=True).min()
+        self._week_start = pd.concat([self._week_start, week_start]).groupby(level=0).min()
+        self.rows += len(df)
+        return self
+
+    @staticmethod
+    def _merge(state, index, delta):
+        """Fold per-bucket `delta` arrays into `state`, touching only the buckets in `index`."""
+        if state is None:
+            return {'index': index, **delta}
+        positions = state['index'].get_indexer(index)
+        known = positions >= 0
+        rows = positions[known]
+        for stat in ('count', 'sum', 'sumsq'):
+            state[stat][rows] += delta[stat][known]
+        state['min'][rows] = np.fmin(state['min'][rows], delta['min'][known])
+        state['max'][rows] = np.fmax(state['max'][rows], delta['max'][known])
+        if not known.all():
+            state['index'] = state['index'].append(index[~known])
+            for stat in STATS:
+                state[stat] = np.concatenate([state[stat], delta[stat][~known]])
+        return state
+
+    def _frame(self, granularity, stat):
+        state = self._state[granularity]
+        if state is None:
+            raise ValueError("No rows have been aggregated yet.")
+        frame = pd.DataFrame(state[stat], index=state['index'], columns=self.metrics)
+        if granularity == 'week' and not isinstance(frame.index, pd.DatetimeIndex):
+            return frame.loc[self._week_start.reindex(frame.index).sort_values(kind='stable').index]
+        return frame.sort_index()
+
+    def stat(self, stat, granularity='day'):
+        """Return one running statistic (count/sum/sumsq/min/max) per bucket and metric."""
+        if stat not in STATS:
+            raise ValueError(f"Unknown statistic '{stat}'; expected one of {STATS}")
+        return self._frame(granularity, stat)
+
+    def mean(self, granularity='day'):
+        return self.stat('sum', granularity) / self.stat('count', granularity)
+
+    def std(self, granularity='day'):
+        """Sample standard deviation per bucket, from the running sums."""
+        count = self.stat('count', granularity)
+        total = self.stat('sum', granularity)
+        variance = (self.stat('sumsq', granularity) - total ** 2 / count) / (count - 1)
+        return np.sqrt(variance.clip(lower=0))
+
+    def rolling_mean(self, window=7, granularity='day'):
+        """Mean over a trailing window of `window` buckets, weighted by row count.
+
+        For days the window is in calendar days, so gaps in the data are not
+        stretched over.
+        """
+        span = f'{window}D' if granularity == 'day' else window
+        sums = self.stat('sum', granularity).rolling(span, min_periods=1).sum()
+        counts = self.stat('count', granularity).rolling(span, min_periods=1).sum()
+        return sums / counts
+
+    def week_over_week(self, pct=False):
+        """Change of each weekly mean against the previous week (absolute, or relative with pct=True)."""
+        weekly = self.mean('week')
+        return weekly.pct_change() if pct else weekly.diff()
+
+    def save(self, path):
+        """Persist the running state so later runs only need to fold new rows."""
+        pd.to_pickle({'date_column': self.date_column, 'week_column': self.week_column,
+                      'metrics': self.metrics, 'rows': self.rows, 'source_rows': self.source_rows,
+                      'state': self._state,
+                      'week_start': self._week_start}, path)
+
+    @classmethod
+    def load(cls, path):
+        saved = pd.read_pickle(path)
+        aggregator = cls(saved['date_column'], saved['week_column'])
+        aggregator.metrics = saved['metrics']
+        aggregator.rows = saved['rows']
+        # None if saved before source_rows was kept; such state cannot be resumed
+        aggregator.source_rows = saved.get('source_rows')
+        aggregator._state = saved['state']
+        aggregator._week_start = saved['week_start']
+        return aggregator